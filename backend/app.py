@@ -1,13 +1,8 @@
 from flask import Flask, render_template, redirect, url_for
 from flask_login import LoginManager, login_required, current_user
 from flask_wtf.csrf import CSRFProtect
-from flask_bcrypt import Bcrypt
-from flask_jwt_extended import JWTManager
 from config import Config
-from models import db, User, Servico
-import os
-import logging
-from logging.handlers import RotatingFileHandler
+from models import db
 
 def validate_config(app):
     """Valida as configurações críticas da aplicação"""
@@ -21,10 +16,37 @@ def validate_config(app):
     if not app.config['SQLALCHEMY_DATABASE_URI']:
         errors.append("DATABASE_URL não foi configurada")
     
-    if not app.config['JWT_SECRET_KEY']:
-        errors.append("JWT_SECRET_KEY não foi configurada")
-    elif app.config['JWT_SECRET_KEY'] == 'sua-chave-jwt-aqui-mude-em-producao':
-        errors.append("JWT_SECRET_KEY está usando o valor padrão - altere no arquivo .env")
+    # Só exigido com JWT_ENABLED: sem ele o JWTManager nem é carregado
+    if app.config['JWT_ENABLED']:
+        if not app.config['JWT_SECRET_KEY']:
+            errors.append("JWT_SECRET_KEY não foi configurada")
+        elif app.config['JWT_SECRET_KEY'] == 'sua-chave-jwt-aqui-mude-em-producao':
+            errors.append("JWT_SECRET_KEY está usando o valor padrão - altere no arquivo .env")
+    
+    try:
+        from utils.passwords import normalize_method
+        normalize_method(app.config['PASSWORD_HASH_METHOD'])
+    except ValueError as e:
+        errors.append(str(e))
+    
+    if app.config['LOG_ROTATE_INTERVAL'] not in ('hourly', 'daily', 'off'):
+        errors.append("LOG_ROTATE_INTERVAL deve ser hourly, daily ou off")
+    
+    if app.config['LOG_STDERR'] not in ('text', 'json', 'off'):
+        errors.append("LOG_STDERR deve ser text, json ou off")
+    
+    if app.config['QUERY_BUDGET_MODE'] not in ('off', 'warn', 'raise'):
+        errors.append("QUERY_BUDGET_MODE deve ser off, warn ou raise")
+    
+    if app.config['TRUSTED_PROXIES'] < 0:
+        errors.append("TRUSTED_PROXIES deve ser 0 ou mais")
+    
+    if app.config['CLINIC_TIMEZONE']:
+        from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+        try:
+            ZoneInfo(app.config['CLINIC_TIMEZONE'])
+        except (ZoneInfoNotFoundError, ValueError):
+            errors.append(f"CLINIC_TIMEZONE desconhecido: {app.config['CLINIC_TIMEZONE']}")
     
     if errors:
         error_msg = "Erros de configuração encontrados:\n"
@@ -35,20 +57,10 @@ def validate_config(app):
 
 def setup_logging(app):
     """Configura o sistema de logging"""
+    # Fila + listener em segundo plano: nenhuma escrita ou rotação no caminho da requisição
+    from utils.logs import init_logging
+    init_logging(app)
     if not app.debug and not app.testing:
-        # Criar diretório de logs se não existir
-        if not os.path.exists('logs'):
-            os.mkdir('logs')
-        
-        # Configurar handler de arquivo com rotação
-        file_handler = RotatingFileHandler('logs/clinica.log', maxBytes=10240, backupCount=10)
-        file_handler.setFormatter(logging.Formatter(
-            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-        ))
-        file_handler.setLevel(logging.INFO)
-        app.logger.addHandler(file_handler)
-        
-        app.logger.setLevel(logging.INFO)
         app.logger.info('🏥 Sistema Clínica Estética iniciado')
 
 def create_app():
@@ -68,14 +80,49 @@ def create_app():
     # Configurar logging
     setup_logging(app)
     
-    # Inicializar extensões
+    # Atrás de proxy reverso: IP e esquema do cliente vêm dos X-Forwarded-* dos proxies confiáveis
+    if app.config['TRUSTED_PROXIES']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        proxies = app.config['TRUSTED_PROXIES']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
+    
+    # Inicializar extensões (opções de pool e réplica precisam estar na config antes do init)
+    from utils.db_routing import configure_database, init_replica_routing
+    configure_database(app)
     db.init_app(app)
     
+    # Métricas por processo (latência, status, SQL e pool) publicadas em /metrics
+    from utils.metrics import init_metrics
+    init_metrics(app)
+    
+    # Orçamento de consultas por rota e detecção de N+1 (desenvolvimento e CI)
+    from utils.query_budget import init_query_budget
+    init_query_budget(app)
+    
+    init_replica_routing(app)
+    
+    # Encoder JSON (orjson quando instalado), compressão e assets estáticos com hash
+    from utils.serialization import init_json
+    from utils.compression import init_compression
+    from utils.assets import init_assets
+    init_json(app)
+    init_compression(app)
+    init_assets(app)
+    
+    # Limite de requisições com baldes compartilhados entre os workers
+    from utils.ratelimit import init_rate_limiting
+    init_rate_limiting(app)
+    
+    # Eventos do ORM que mantêm os agregados do dashboard
+    import utils.rollups  # noqa: F401
+    
     # Configurar CSRF com exceções para API
     csrf = CSRFProtect(app)
     
-    bcrypt = Bcrypt(app)
-    jwt = JWTManager(app)
+    # Nenhuma rota usa JWT hoje: a extensão (e o import de ~18 ms) só com JWT_ENABLED
+    if app.config['JWT_ENABLED']:
+        from flask_jwt_extended import JWTManager
+        JWTManager(app)
     
     # Configurar Login Manager
     login_manager = LoginManager()
@@ -83,9 +130,9 @@ def create_app():
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Por favor, faça login para acessar esta página.'
     
-    @login_manager.user_loader
-    def load_user(user_id):
-        return db.session.get(User, int(user_id))
+    # Identidade em cache (utils.identity): requisições autenticadas sem consultar users
+    from utils.identity import load_principal
+    login_manager.user_loader(load_principal)
     
     # Registrar blueprints
     from routes.auth_routes import auth_bp
@@ -93,12 +140,20 @@ def create_app():
     from routes.professional_routes import professionals_bp
     from routes.service_routes import services_bp
     from routes.atendimento_routes import atendimento_bp
+    from routes.dashboard_routes import dashboard_bp
+    from routes.appointment_routes import appointments_bp
     
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(patient_bp, url_prefix='/patients')
     app.register_blueprint(professionals_bp, url_prefix='/professionals')
     app.register_blueprint(services_bp, url_prefix='/services')
     app.register_blueprint(atendimento_bp, url_prefix='/atendimentos')
+    app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+    app.register_blueprint(appointments_bp, url_prefix='/appointments')
+    
+    # Comandos de linha de comando (flask <comando>)
+    from commands import register_commands
+    register_commands(app)
     
     # Rotas principais
     @app.route('/')
@@ -131,7 +186,7 @@ def create_app():
     # Tratamento de erros melhorado
     @app.errorhandler(400)
     def bad_request(error):
-        app.logger.warning(f'Bad request: {error}')
+        app.logger.warning(f'Bad request: {error}', extra={'sample': 'http_400'})
         if 'application/json' in str(error):
             return {'error': 'Requisição inválida'}, 400
         return render_template('errors/400.html'), 400
@@ -152,7 +207,7 @@ def create_app():
     
     @app.errorhandler(404)
     def not_found(error):
-        app.logger.info(f'Page not found: {error}')
+        app.logger.info(f'Page not found: {error}', extra={'sample': 'http_404'})
         if 'application/json' in str(error):
             return {'error': 'Recurso não encontrado'}, 404
         return render_template('errors/404.html'), 404
@@ -165,33 +220,21 @@ def create_app():
             return {'error': 'Erro interno do servidor'}, 500
         return render_template('errors/500.html'), 500
     
-    # Criar tabelas do banco e dados iniciais
+    return app
+
+def bootstrap_database(app):
+    """Cria tabelas, aplica migrações e o admin padrão (flask init-db + flask seed-admin).
+
+    Fica fora de create_app: os workers sobem sem refletir o esquema nem
+    consultar users; em produção rode os comandos uma vez a cada deploy.
+    """
+    from migrations import init_db
+    from utils.seed import seed_admin
+    
     with app.app_context():
         try:
-            db.create_all()
-            
-            # Criar usuário admin padrão se não existir
-            if not User.query.filter_by(username='admin').first():
-                # Usar senha do ambiente ou padrão
-                admin_password = os.environ.get('ADMIN_DEFAULT_PASSWORD', 'admin123')
-                
-                admin = User(
-                    username='admin',
-                    email='admin@clinica.com',
-                    full_name='Administrador',
-                    role='admin'
-                )
-                admin.set_password(admin_password)
-                db.session.add(admin)
-                
-                app.logger.info("✅ Usuário admin criado com sucesso!")
-                print("✅ Usuário admin criado com sucesso!")
-                print("   Username: admin")
-                print(f"   Password: {admin_password}")
-                if admin_password == 'admin123':
-                    print("   ⚠️  ALTERE ESTA SENHA EM PRODUÇÃO!")
-            
-            db.session.commit()
+            init_db(log=app.logger.info)
+            seed_admin(log=print)
             app.logger.info("✅ Banco de dados inicializado com sucesso!")
             print("✅ Banco de dados inicializado com sucesso!")
             
@@ -200,12 +243,11 @@ def create_app():
             print(f"❌ Erro ao inicializar banco de dados: {e}")
             print("   Verifique se o PostgreSQL está rodando e as configurações no .env estão corretas")
             raise
-    
-    return app
 
 if __name__ == '__main__':
     try:
         app = create_app()
+        bootstrap_database(app)
         print("🏥 Sistema Clínica Estética")
         print("=" * 50)
         print("🚀 Servidor iniciando...")
@@ -215,6 +257,7 @@ if __name__ == '__main__':
         print("   • Pacientes")
         print("   • Profissionais")
         print("   • Serviços")
+        print("⚠️  Servidor de desenvolvimento; em produção: gunicorn -c gunicorn.conf.py wsgi:app")
         print("=" * 50)
         
         app.run(debug=True, host='0.0.0.0', port=5000)
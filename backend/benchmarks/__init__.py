@@ -0,0 +1,55 @@
+# backend/benchmarks
+# Benchmarks em processo: cada módulo roda com `python -m benchmarks.<nome>`
+# a partir de backend/, sobre um banco SQLite temporário (ou BENCH_DATABASE_URL).
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_ADMIN_PASSWORD = 'bench-admin-123'
+
+
+def bench_app(**config):
+    """Cria a aplicação sobre um banco descartável e devolve (app, client logado como admin)"""
+    database_url = os.environ.get('BENCH_DATABASE_URL')
+    if not database_url:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('SECRET_KEY', 'bench-secret-key-' + 'x' * 32)
+    os.environ.setdefault('JWT_SECRET_KEY', 'bench-jwt-key-' + 'y' * 32)
+    os.environ.setdefault('ADMIN_DEFAULT_PASSWORD', BENCH_ADMIN_PASSWORD)
+    os.environ['FLASK_ENV'] = 'development'
+    # Os benchmarks repetem a mesma rota centenas de vezes: sem limite de requisições
+    os.environ.setdefault('RATELIMIT_ENABLED', 'false')
+
+    from app import bootstrap_database, create_app
+    app = create_app()
+    bootstrap_database(app)
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, **config)
+
+    client = app.test_client()
+    response = client.post('/auth/login', data={
+        'username': 'admin', 'password': os.environ['ADMIN_DEFAULT_PASSWORD']
+    })
+    if response.status_code != 302:
+        sys.exit('❌ Não foi possível autenticar o admin no banco do benchmark')
+    return app, client
+
+
+def measure(fn, iterations, warmup=3):
+    """Executa fn repetidamente e devolve as latências em ms (p50, p95, média)"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'p50_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(samples[max(0, int(len(samples) * 0.95) - 1)], 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'iterations': iterations,
+    }
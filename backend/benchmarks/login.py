@@ -0,0 +1,104 @@
+"""Vazão de login por política de hash de senha, com uma rajada de logins concorrentes.
+
+Mede logins/s, latência do login (p50/p95), respostas 503 (pool de hash cheio) e a
+latência de uma rota da API executada durante a rajada.
+
+Uso (a partir de backend/):
+    python -m benchmarks.login [--logins 40] [--concurrency 8] [--policies scrypt,pbkdf2:sha256:600000,bcrypt:12]
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import bench_app
+
+DEFAULT_POLICIES = 'scrypt:32768:8:1,pbkdf2:sha256:600000,pbkdf2:sha256:100000,bcrypt:12,bcrypt:10'
+PASSWORD = 'senha-benchmark-123'
+
+
+def _percentile(samples, fraction):
+    samples = sorted(samples)
+    return round(samples[max(0, int(len(samples) * fraction) - 1)], 2) if samples else None
+
+
+def _create_user(app, username, policy):
+    from models import db, User
+    from utils.passwords import hash_password
+    with app.app_context():
+        user = User.query.filter_by(username=username).first()
+        if user is None:
+            user = User(username=username, email=f'{username}@bench.local', full_name=username, role='receptionist')
+            db.session.add(user)
+        user.password_hash = hash_password(PASSWORD, policy)
+        db.session.commit()
+
+
+def run_policy(app, policy, logins, concurrency):
+    username = 'bench_' + policy.replace(':', '_')
+    app.config['PASSWORD_HASH_METHOD'] = policy
+    _create_user(app, username, policy)
+
+    def login_once(_):
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.post('/auth/login', data={'username': username, 'password': PASSWORD})
+        return response.status_code, (time.perf_counter() - start) * 1000
+
+    # Sonda da API em paralelo à rajada, com uma sessão já autenticada
+    probe = app.test_client()
+    probe.post('/auth/login', data={'username': username, 'password': PASSWORD})
+    probe_samples, stop = [], threading.Event()
+
+    def probe_api():
+        while not stop.is_set():
+            start = time.perf_counter()
+            probe.get('/services/api/list?count=none')
+            probe_samples.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.01)
+
+    prober = threading.Thread(target=probe_api)
+    prober.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(login_once, range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    prober.join()
+
+    ok = [ms for status, ms in results if status == 302]
+    return {
+        'policy': policy,
+        'logins': logins,
+        'concurrency': concurrency,
+        'ok': len(ok),
+        'busy_503': sum(1 for status, _ in results if status == 503),
+        'logins_per_s': round(len(ok) / elapsed, 2),
+        'login_p50_ms': round(statistics.median(ok), 2) if ok else None,
+        'login_p95_ms': _percentile(ok, 0.95),
+        'api_p50_ms_during_burst': round(statistics.median(probe_samples), 2) if probe_samples else None,
+        'api_p95_ms_during_burst': _percentile(probe_samples, 0.95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--policies', default=DEFAULT_POLICIES)
+    args = parser.parse_args()
+
+    app, _ = bench_app(COMPRESS_ENABLED=False)
+    results = [run_policy(app, policy, args.logins, args.concurrency) for policy in args.policies.split(',')]
+
+    print(f"{'política':24} {'logins/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'503':>5} {'API p50':>8} {'API p95':>8}")
+    for r in results:
+        print(f"{r['policy']:24} {r['logins_per_s']:9.2f} {r['login_p50_ms'] or 0:9.1f} {r['login_p95_ms'] or 0:9.1f} "
+              f"{r['busy_503']:5d} {r['api_p50_ms_during_burst'] or 0:8.1f} {r['api_p95_ms_during_burst'] or 0:8.1f}")
+    print(json.dumps({'benchmark': 'login', 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
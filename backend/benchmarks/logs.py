@@ -0,0 +1,124 @@
+"""Custo do log na thread da requisição: arquivo síncrono com rotação x fila + listener.
+
+Compara µs por chamada de logger.warning com o RotatingFileHandler antigo
+(maxBytes=10240, rotação a cada ~80 linhas) e com o RequestQueueHandler de
+utils.logs, dentro de um contexto de requisição. Depois confere a rotação por
+tamanho e por horário e a amostragem de uma rajada de avisos de 404.
+
+Uso (a partir de backend/):
+    python -m benchmarks.logs [--iterations 20000]
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import statistics
+import tempfile
+import time
+from logging.handlers import QueueListener, RotatingFileHandler
+
+from flask import Flask
+
+from utils.logs import JsonFormatter, RequestQueueHandler, SamplingFilter, SizeAndTimeRotatingFileHandler
+
+
+def _logger(name, handler):
+    logger = logging.getLogger(f'bench.logs.{name}')
+    logger.handlers[:] = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def _time_calls(app, logger, iterations):
+    """µs por chamada (p50, p99 e máximo) vistos pela thread da requisição"""
+    samples = []
+    with app.test_request_context('/patients/api/list', headers={'X-Request-ID': 'bench'}):
+        for i in range(iterations):
+            start = time.perf_counter()
+            logger.warning('Bad request: %s', i, extra={'endpoint': 'patients.api_list_patients'})
+            samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {'p50_us': round(statistics.median(samples), 2),
+            'p99_us': round(samples[int(len(samples) * 0.99) - 1], 2),
+            'max_us': round(samples[-1], 2)}
+
+
+def bench_request_path(app, iterations):
+    directory = tempfile.mkdtemp(prefix='bench-logs-')
+    legacy = RotatingFileHandler(os.path.join(directory, 'legacy.log'), maxBytes=10240, backupCount=10)
+    legacy.setFormatter(logging.Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'))
+    results = {'sync_rotating_10k': _time_calls(app, _logger('legacy', legacy), iterations)}
+    legacy.close()
+
+    output = SizeAndTimeRotatingFileHandler(os.path.join(directory, 'clinica.log'), 50 * 1024 * 1024, 'daily', 14)
+    output.setFormatter(JsonFormatter())
+    handler = RequestQueueHandler(queue.SimpleQueue(), 100000)
+    listener = QueueListener(handler.queue, output)
+    listener.start()
+    results['queue_listener'] = _time_calls(app, _logger('queue', handler), iterations)
+    start = time.perf_counter()
+    listener.stop()
+    results['queue_listener']['drain_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    results['queue_listener']['dropped'] = handler.dropped
+    with open(os.path.join(directory, 'clinica.log'), encoding='utf-8') as f:
+        results['queue_listener']['lines_written'] = sum(1 for _ in f)
+    output.close()
+    return results
+
+
+def check_rotation():
+    directory = tempfile.mkdtemp(prefix='bench-logs-')
+    path = os.path.join(directory, 'clinica.log')
+    handler = SizeAndTimeRotatingFileHandler(path, 4096, 'daily', 3)
+    handler.setFormatter(JsonFormatter())
+    logger = _logger('rotation', handler)
+    for i in range(200):
+        logger.info('linha %s', i)
+    by_size = sorted(name for name in os.listdir(directory))
+    # Simula a virada do dia: o próximo registro abre um arquivo novo mesmo pequeno
+    handler.rollover_at = time.time() - 1
+    logger.info('depois da meia-noite')
+    with open(path, encoding='utf-8') as f:
+        fresh = f.read().count('\n')
+    handler.close()
+    return {'files_after_size_rotation': by_size, 'lines_after_time_rotation': fresh,
+            'ok': len(by_size) == 4 and fresh == 1 and handler.rollover_at > time.time()}
+
+
+def check_sampling(app, burst=20, requests_=5000):
+    sink = queue.SimpleQueue()
+    handler = RequestQueueHandler(sink, 100000)
+    handler.addFilter(SamplingFilter(burst, window=60))
+    logger = _logger('sampling', handler)
+    with app.test_request_context('/nao-existe'):
+        for _ in range(requests_):
+            logger.info('Page not found: /nao-existe', extra={'sample': 'http_404'})
+    return {'logged': sink.qsize(), 'requests': requests_, 'ok': sink.qsize() == burst}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['REQUEST_ID_HEADER'] = 'X-Request-ID'
+    request_path = bench_request_path(app, args.iterations)
+    rotation = check_rotation()
+    sampling = check_sampling(app)
+
+    for name, r in request_path.items():
+        print(f"{name:18} p50 {r['p50_us']:7.2f} µs   p99 {r['p99_us']:8.2f} µs   máx {r['max_us']:9.1f} µs")
+    print(f"{'✅' if rotation['ok'] else '❌'} rotação: {len(rotation['files_after_size_rotation'])} arquivos por "
+          f"tamanho, {rotation['lines_after_time_rotation']} linha(s) após a virada do dia")
+    print(f"{'✅' if sampling['ok'] else '❌'} amostragem: {sampling['logged']} de {sampling['requests']} avisos de 404")
+    print(json.dumps({'benchmark': 'logs', 'request_path': request_path, 'rotation': rotation,
+                      'sampling': sampling}, indent=2))
+    if not (rotation['ok'] and sampling['ok']):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Custo das métricas por requisição e da coleta de /metrics com vários workers.
+
+Mede µs por requisição registrada (contador + três histogramas no mmap do
+processo) e o custo de uma requisição real com e sem METRICS_ENABLED. Em
+seguida, N processos registram requisições em arquivos próprios e a coleta
+deve somar exatamente o total enviado.
+
+Uso (a partir de backend/):
+    python -m benchmarks.metrics [--iterations 100000] [--processes 4]
+"""
+import argparse
+import json
+import multiprocessing
+import tempfile
+import time
+
+from utils.metrics import ProcessValues, _histogram, collect, render
+
+ENDPOINTS = [f'bench.endpoint_{i}' for i in range(40)]
+
+
+def _record(store, i):
+    labels = (('endpoint', ENDPOINTS[i % len(ENDPOINTS)]), ('method', 'GET'))
+    store.update(
+        [(('http_requests_total', labels + (('status', '200'),)), 1)]
+        + _histogram('http_request_duration_seconds', labels, (i % 100) / 1000)
+        + _histogram('http_request_db_statements', labels, i % 7)
+        + _histogram('http_request_db_duration_seconds', labels, (i % 10) / 1000)
+    )
+
+
+def bench_record(iterations):
+    store = ProcessValues(tempfile.mkdtemp(prefix='bench-metrics-'))
+    _record(store, 0)
+    start = time.perf_counter()
+    for i in range(iterations):
+        _record(store, i)
+    return round((time.perf_counter() - start) / iterations * 1e6, 3)
+
+
+def _worker(directory, requests_, done, release):
+    store = ProcessValues(directory)
+    for i in range(requests_):
+        _record(store, i)
+    done.set()
+    release.wait()
+
+
+def check_cross_process(processes, requests_=5000):
+    """Coleta com os workers vivos e de novo depois que terminam (valores arquivados)"""
+    directory = tempfile.mkdtemp(prefix='bench-metrics-')
+    release = multiprocessing.Event()
+    done = [multiprocessing.Event() for _ in range(processes)]
+    workers = [multiprocessing.Process(target=_worker, args=(directory, requests_, event, release))
+               for event in done]
+    for worker in workers:
+        worker.start()
+    for event in done:
+        event.wait()
+
+    start = time.perf_counter()
+    totals = collect(directory)
+    text = render(totals)
+    collect_ms = round((time.perf_counter() - start) * 1000, 3)
+    live = sum(v for (name, _), v in totals.items() if name == 'http_requests_total')
+
+    release.set()
+    for worker in workers:
+        worker.join()
+    archived = sum(v for (name, _), v in collect(directory).items() if name == 'http_requests_total')
+    expected = processes * requests_
+    return {'processes': processes, 'expected': expected, 'live_total': live, 'archived_total': archived,
+            'collect_render_ms': collect_ms, 'exposition_bytes': len(text),
+            'ok': live == archived == expected}
+
+
+def bench_request(iterations):
+    """Latência de uma rota com as métricas ligadas e desligadas (mesmo processo)"""
+    from benchmarks import bench_app, measure
+    import utils.metrics
+    app, client = bench_app()
+    store = utils.metrics._store
+    results = {}
+    # Alterna as duas medições para que aquecimento e ruído pesem igual nos dois lados
+    for _ in range(3):
+        for name, value in (('disabled', None), ('enabled', store)):
+            utils.metrics._store = value
+            r = measure(lambda: client.get('/services/api/list'), iterations)
+            if name not in results or r['p50_ms'] < results[name]['p50_ms']:
+                results[name] = r
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=100000)
+    parser.add_argument('--processes', type=int, default=4)
+    args = parser.parse_args()
+
+    record_us = bench_record(args.iterations)
+    request = bench_request(max(args.iterations // 100, 100))
+    cross = check_cross_process(args.processes)
+
+    print(f'registro de uma requisição: {record_us:.2f} µs')
+    for name in ('enabled', 'disabled'):
+        r = request[name]
+        print(f"rota /services/api/list, métricas {name:8}  p50 {r['p50_ms']:7.3f} ms   p95 {r['p95_ms']:7.3f} ms")
+    status = '✅' if cross['ok'] else '❌'
+    print(f"{status} {cross['processes']} processos: {cross['live_total']:.0f} vivos / {cross['archived_total']:.0f} "
+          f"arquivados de {cross['expected']} (coleta + render {cross['collect_render_ms']} ms, "
+          f"{cross['exposition_bytes']} bytes)")
+    print(json.dumps({'benchmark': 'metrics', 'record_us': record_us, 'request': request,
+                      'cross_process': cross}, indent=2))
+    if not cross['ok']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
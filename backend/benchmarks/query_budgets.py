@@ -0,0 +1,223 @@
+"""Orçamento de consultas de todas as rotas /api/* sobre um banco SQLite com dados.
+
+Popula pacientes, profissionais (com e sem conta), serviços, atendimentos e
+agendamentos, chama cada rota /api/* com QUERY_BUDGET_MODE=raise e confere o
+número de statements (cabeçalho X-Query-Count) contra o orçamento declarado com
+@query_budget ou QUERY_BUDGET_DEFAULT. Sai com código 1 se alguma rota estoura o
+orçamento, repete a mesma consulta em laço (N+1), falha ou não tem caso aqui:
+rotas novas precisam ganhar um caso em CASES. Os mesmos casos rodam no pytest
+(tests/test_query_budgets.py).
+
+Uso (a partir de backend/):
+    python -m benchmarks.query_budgets [--patients 30] [--json]
+"""
+import argparse
+import io
+import json
+import os
+from datetime import date, datetime, time, timedelta
+
+from benchmarks import bench_app
+from utils.seed import cpf_from_number as cpf
+
+
+def _next_weekday(days_ahead, hour):
+    day = date.today() + timedelta(days=days_ahead)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return datetime.combine(day, time(hour))
+
+
+def seed(patients):
+    """Dados suficientes para que laços por item apareçam como statements repetidos"""
+    from models import (db, User, Patient, Professional, Servico, Atendimento, WorkingHours,
+                        Appointment)
+    admin = User.query.filter_by(username='admin').one()
+    services = [Servico(name=f'Serviço {i}', duration_minutes=30, price=100 + i) for i in range(6)]
+    db.session.add_all(services)
+
+    professionals = []
+    for i in range(5):
+        professional = Professional(full_name=f'Profissional {i}', cpf=cpf(900000 + i),
+                                    phone='(11) 98888-0000', email=f'prof{i}@clinica.test',
+                                    services=services[:5], created_by=admin.id)
+        professionals.append(professional)
+    db.session.add_all(professionals)
+    db.session.flush()
+    for professional in professionals:
+        db.session.add_all(WorkingHours(professional_id=professional.id, weekday=weekday,
+                                        start_time=time(8), end_time=time(18)) for weekday in range(5))
+    for professional in professionals[:3]:
+        account = User(username=f'prof{professional.id}', email=professional.email,
+                       full_name=professional.full_name, role='professional', professional_id=professional.id)
+        account.set_password('senha-segura-123')
+        db.session.add(account)
+
+    people = [Patient(full_name=f'Paciente {i:04d}', cpf=cpf(100000 + i), phone=f'(11) 9{i:04d}-0000',
+                      created_by=admin.id) for i in range(patients)]
+    db.session.add_all(people)
+    db.session.flush()
+
+    # O primeiro paciente tem histórico longo: mais de uma página de atendimentos
+    for index, patient in enumerate(people):
+        for visit in range(25 if index == 0 else 2):
+            db.session.add(Atendimento(
+                patient_id=patient.id, professional_id=professionals[visit % 5].id,
+                data_atendimento=datetime.now() - timedelta(days=visit + 1),
+                valor_cobrado=150, servicos=services[:2]
+            ))
+        db.session.add(Appointment(
+            patient_id=patient.id, professional_id=professionals[index % 5].id, service_id=services[0].id,
+            start_at=_next_weekday(3 + index // 10, 8) + timedelta(minutes=30 * (index % 10)),
+            end_at=_next_weekday(3 + index // 10, 8) + timedelta(minutes=30 * (index % 10 + 1)),
+            created_by=admin.id
+        ))
+    # Sem histórico: a exclusão não esbarra nas chaves estrangeiras dos atendimentos
+    patient_delete = Patient(full_name='Paciente Excluído', cpf=cpf(199999), phone='(11) 90000-9999')
+    professional_delete = Professional(full_name='Profissional Excluído', cpf=cpf(909999), phone='(11) 98888-9999',
+                                       services=services[:1])
+    db.session.add_all([patient_delete, professional_delete])
+    db.session.commit()
+
+    return {
+        'patient': people[0].id, 'patient_quiet': people[-1].id, 'patient_delete': patient_delete.id,
+        'professional': professionals[0].id, 'professional_no_account': professionals[3].id,
+        'professional_delete': professional_delete.id,
+        'service': services[0].id, 'services': [s.id for s in services[:2]], 'service_delete': services[5].id,
+        'appointment': Appointment.query.first().id,
+    }
+
+
+# (endpoint, método) -> função(ids) que devolve (valores da URL, argumentos do client.open)
+CASES = {
+    ('auth.check_auth', 'GET'): lambda ids: ({}, {}),
+    ('dashboard_api.api_summary', 'GET'): lambda ids: ({}, {}),
+    ('patients.api_list_patients', 'GET'): lambda ids: ({}, {}),
+    ('patients.api_get_patient', 'GET'): lambda ids: ({'patient_id': ids['patient']}, {}),
+    ('patients.api_patients_by_phone', 'GET'): lambda ids: ({'digits': '+5511900000000'}, {}),
+    ('patients.api_export_patients', 'GET'): lambda ids: ({'format': 'csv'}, {}),
+    ('professionals.api_list_professionals', 'GET'): lambda ids: ({}, {}),
+    ('professionals.api_get_professional', 'GET'): lambda ids: ({'professional_id': ids['professional']}, {}),
+    ('services.api_list_services', 'GET'): lambda ids: ({}, {}),
+    ('services.api_catalog', 'GET'): lambda ids: ({}, {}),
+    ('services.api_get_service', 'GET'): lambda ids: ({'service_id': ids['service']}, {}),
+    ('atendimento.api_get_atendimentos_by_patient', 'GET'): lambda ids: ({'patient_id': ids['patient']}, {}),
+    ('atendimento.api_export_atendimentos', 'GET'): lambda ids: ({'format': 'csv'}, {}),
+    ('appointments.api_list_appointments', 'GET'): lambda ids: (
+        {'start': date.today().isoformat(), 'end': (date.today() + timedelta(days=30)).isoformat()}, {}),
+    ('appointments.api_first_free_slot', 'GET'): lambda ids: ({'service_id': ids['service']}, {}),
+    ('appointments.api_get_working_hours', 'GET'): lambda ids: ({'professional_id': ids['professional']}, {}),
+
+    ('patients.api_create_patient', 'POST'): lambda ids: ({}, {'json': {
+        'full_name': 'Paciente Novo', 'cpf': cpf(555000), 'phone': '(11) 97777-0000'}}),
+    ('patients.api_update_patient', 'PUT'): lambda ids: ({'patient_id': ids['patient_quiet']}, {'json': {
+        'full_name': 'Paciente Alterado', 'cpf': cpf(555001), 'phone': '(11) 97777-0001'}}),
+    ('patients.api_import_patients', 'POST'): lambda ids: ({}, {'data': {'file': (io.BytesIO(
+        ('full_name,cpf,phone\n' + ''.join(f'Importado {i},{cpf(556000 + i)},(11) 96666-{i:04d}\n'
+                                           for i in range(50))).encode()
+    ), 'pacientes.csv')}}),
+    ('professionals.api_create_professional', 'POST'): lambda ids: ({}, {'json': {
+        'full_name': 'Profissional Novo', 'cpf': cpf(557000), 'phone': '(11) 95555-0000',
+        'service_ids': ids['services']}}),
+    ('professionals.api_update_professional', 'PUT'): lambda ids: ({'professional_id': ids['professional']}, {
+        'json': {'full_name': 'Profissional Alterado', 'cpf': cpf(900000), 'phone': '(11) 95555-0001',
+                 'service_ids': ids['services']}}),
+    ('professionals.api_create_user_account', 'POST'): lambda ids: (
+        {'professional_id': ids['professional_no_account']},
+        {'json': {'username': 'nova.conta', 'password': 'senha-segura-456'}}),
+    ('professionals.api_reset_password', 'POST'): lambda ids: (
+        {'professional_id': ids['professional']}, {'json': {'password': 'senha-segura-789'}}),
+    ('services.api_create_service', 'POST'): lambda ids: ({}, {'json': {
+        'name': 'Serviço Novo', 'duration_minutes': 45, 'price': 180}}),
+    ('services.api_update_service', 'PUT'): lambda ids: ({'service_id': ids['service']}, {'json': {
+        'name': 'Serviço Alterado', 'duration_minutes': 30, 'price': 120}}),
+    ('atendimento.api_create_atendimento', 'POST'): lambda ids: ({}, {'json': {
+        'patient_id': ids['patient'], 'professional_id': ids['professional'], 'service_ids': ids['services'],
+        'data_atendimento': datetime.now().replace(microsecond=0).isoformat(), 'valor_cobrado': 200}}),
+    ('appointments.api_create_appointment', 'POST'): lambda ids: ({}, {'json': {
+        'patient_id': ids['patient_quiet'], 'professional_id': ids['professional'],
+        'service_id': ids['service'], 'start_at': _next_weekday(30, 15).isoformat()}}),
+    ('appointments.api_cancel_appointment', 'POST'): lambda ids: ({'appointment_id': ids['appointment']}, {}),
+    ('appointments.api_set_working_hours', 'PUT'): lambda ids: ({'professional_id': ids['professional']}, {
+        'json': {'working_hours': [{'weekday': d, 'start_time': '09:00', 'end_time': '17:00'}
+                                   for d in range(6)]}}),
+
+    ('patients.api_delete_patient', 'DELETE'): lambda ids: ({'patient_id': ids['patient_delete']}, {}),
+    ('professionals.api_delete_professional', 'DELETE'): lambda ids: (
+        {'professional_id': ids['professional_delete']}, {}),
+    ('services.api_delete_service', 'DELETE'): lambda ids: ({'service_id': ids['service_delete']}, {}),
+}
+
+
+def api_routes(app):
+    """(endpoint, método) de todas as rotas /api/*"""
+    routes = set()
+    for rule in app.url_map.iter_rules():
+        if '/api/' in rule.rule:
+            routes.update((rule.endpoint, method) for method in rule.methods - {'HEAD', 'OPTIONS'})
+    return routes
+
+
+def run_case(app, client, endpoint, method, ids):
+    from flask import url_for
+    from utils.query_budget import QueryBudgetExceeded
+
+    values, kwargs = CASES[(endpoint, method)](ids)
+    with app.test_request_context():
+        url = url_for(endpoint, **values)
+    view = app.view_functions[endpoint]
+    budget = getattr(view, 'query_budget', (app.config['QUERY_BUDGET_DEFAULT'], None))[0]
+    result = {'endpoint': endpoint, 'method': method, 'budget': budget}
+    try:
+        response = client.open(url, method=method, **kwargs)
+        # Exportações geram o corpo sob demanda: o orçamento vale até o fim do stream
+        response.get_data()
+    except QueryBudgetExceeded as e:
+        return {**result, 'status': 500, 'queries': None, 'ok': False, 'error': str(e)}
+
+    count = response.headers.get('X-Query-Count')
+    result.update(status=response.status_code, queries=None if count is None else int(count))
+    error = None
+    if response.status_code >= 300:
+        error = (response.get_json(silent=True) or {}).get('error') or response.status
+    result.update(ok=error is None, error=error)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=30)
+    parser.add_argument('--json', action='store_true', help='Relatório em JSON')
+    args = parser.parse_args()
+
+    # Cada statement além do orçamento (ou N+1) vira exceção na própria rota
+    os.environ['QUERY_BUDGET_MODE'] = 'raise'
+    app, client = bench_app()
+    with app.app_context():
+        ids = seed(args.patients)
+
+    routes = api_routes(app)
+    results = [run_case(app, client, endpoint, method, ids) for endpoint, method in CASES
+               if (endpoint, method) in routes]
+    results += [{'endpoint': endpoint, 'method': method, 'ok': False, 'error': 'rota sem caso em CASES'}
+                for endpoint, method in sorted(routes - set(CASES))]
+
+    if args.json:
+        print(json.dumps({'benchmark': 'query_budgets', 'results': results}, indent=2))
+    else:
+        for r in results:
+            status = '✅' if r['ok'] else '❌'
+            if 'budget' not in r:
+                queries = ''
+            elif r.get('queries') is None:
+                queries = f"  -/{r['budget']:<3d}"
+            else:
+                queries = f"{r['queries']:3d}/{r['budget']:<3d}"
+            print(f"{status} {r['method']:6} {r['endpoint']:48} {queries:8} {r.get('error') or ''}")
+    failures = [r for r in results if not r['ok']]
+    if failures:
+        raise SystemExit(f'{len(failures)} rota(s) fora do orçamento ou com falha')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Custo por requisição do limitador (token bucket) e verificação entre processos.
+
+Mede µs por take() em cada armazenamento e o custo de hit() dentro de uma
+requisição. Em seguida, N processos disputam o mesmo balde no arquivo mmap: o
+total de requisições permitidas deve ser igual à capacidade do balde.
+
+Uso (a partir de backend/):
+    python -m benchmarks.ratelimit [--iterations 200000] [--processes 4]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+from utils.ratelimit import MemoryBucketStore, MmapBucketStore
+
+
+def _per_call_us(fn, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    return round((time.perf_counter() - start) / iterations * 1e6, 3)
+
+
+def bench_stores(iterations):
+    path = os.path.join(tempfile.mkdtemp(prefix='bench-rl-'), 'ratelimit.bin')
+    stores = {'memory': MemoryBucketStore(), 'mmap': MmapBucketStore(path)}
+    results = []
+    for name, store in stores.items():
+        # Uma chave quente (mesmo cliente) e chaves espalhadas (muitos clientes)
+        hot = _per_call_us(lambda i: store.take('route:u1', 1e9, 1e9), iterations)
+        spread = _per_call_us(lambda i: store.take(f'route:u{i % 5000}', 1e9, 1e9), iterations)
+        results.append({'store': name, 'hot_key_us': hot, 'spread_keys_us': spread})
+    return results
+
+
+def _contend(path, key, capacity, attempts, queue):
+    store = MmapBucketStore(path)
+    allowed = sum(store.take(key, capacity, 1e-6)[0] for _ in range(attempts))
+    queue.put(allowed)
+
+
+def check_cross_process(processes, capacity=500, attempts=2000):
+    path = os.path.join(tempfile.mkdtemp(prefix='bench-rl-'), 'ratelimit.bin')
+    MmapBucketStore(path).take('warmup', 1, 1)
+    queue = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_contend, args=(path, 'shared', capacity, attempts, queue))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    allowed = sum(queue.get() for _ in workers)
+    return {'processes': processes, 'capacity': capacity, 'attempts': processes * attempts,
+            'allowed': allowed, 'ok': allowed == capacity}
+
+
+def bench_request_hit(iterations):
+    """Custo de hit() (identidade do cliente + take no mmap) dentro de uma requisição"""
+    from benchmarks import bench_app
+    from utils.ratelimit import hit
+    app, _ = bench_app()
+    app.extensions['rate_limiter'] = MmapBucketStore(os.path.join(tempfile.mkdtemp(), 'rl.bin'))
+    with app.test_request_context('/patients/api/list', environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+        return _per_call_us(lambda i: hit('bench', 10 ** 9, 1), iterations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=200000)
+    parser.add_argument('--processes', type=int, default=4)
+    args = parser.parse_args()
+
+    stores = bench_stores(args.iterations)
+    request_hit = bench_request_hit(args.iterations // 4)
+    cross = check_cross_process(args.processes)
+
+    for r in stores:
+        print(f"{r['store']:7} chave quente {r['hot_key_us']:7.2f} µs   chaves espalhadas {r['spread_keys_us']:7.2f} µs")
+    print(f"hit() em requisição (mmap, por IP): {request_hit:.2f} µs")
+    status = '✅' if cross['ok'] else '❌'
+    print(f"{status} {cross['processes']} processos, capacidade {cross['capacity']}: {cross['allowed']} permitidas "
+          f"de {cross['attempts']} tentativas")
+    print(json.dumps({'benchmark': 'ratelimit', 'stores': stores, 'request_hit_us': request_hit,
+                      'cross_process': cross}, indent=2))
+    if not cross['ok']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Busca do primeiro horário livre sobre agendas sintéticas com anos de agendamentos.
+
+Cada profissional atende de segunda a sexta (08-12 e 13-18) com a agenda cheia
+de agendamentos de 30 minutos: dois anos para trás e um para frente. Cenários:
+vaga única daqui a ~20 dias em um só profissional, e nenhuma vaga em 30 dias.
+
+Uso (a partir de backend/):
+    python -m benchmarks.scheduling [--professionals 20] [--years-back 2] [--years-ahead 1]
+"""
+import argparse
+import json
+import time as clock
+from datetime import datetime, date, time, timedelta
+
+from benchmarks import bench_app, measure
+
+WINDOWS = [(time(8), time(12)), (time(13), time(18))]
+SLOT = timedelta(minutes=30)
+
+
+def _seed(professionals, years_back, years_ahead):
+    from models import db, Patient, Professional, Servico, WorkingHours, Appointment, professional_services
+
+    now = datetime.utcnow()
+    patient = Patient(full_name='Paciente Agenda', cpf='000.000.001-91', phone='(11) 90000-0000')
+    service = Servico(name='Consulta 60 min', duration_minutes=60, price=100)
+    db.session.add_all([patient, service])
+    db.session.flush()
+
+    ids = []
+    for i in range(professionals):
+        professional = Professional(full_name=f'Profissional {i:03d}', cpf=f'{i:03d}.000.000-00',
+                                    phone='(11) 90000-0000')
+        db.session.add(professional)
+        db.session.flush()
+        ids.append(professional.id)
+        db.session.add_all(WorkingHours(professional_id=professional.id, weekday=weekday, start_time=start,
+                                        end_time=end) for weekday in range(5) for start, end in WINDOWS)
+    db.session.execute(db.insert(professional_services),
+                       [{'professional_id': pid, 'service_id': service.id} for pid in ids])
+
+    today = date.today()
+    first_day, last_day = today - timedelta(days=365 * years_back), today + timedelta(days=365 * years_ahead)
+    rows, total = [], 0
+    day = first_day
+    while day <= last_day:
+        if day.weekday() < 5:
+            for pid in ids:
+                for start, end in WINDOWS:
+                    moment, limit = datetime.combine(day, start), datetime.combine(day, end)
+                    while moment < limit:
+                        rows.append({'patient_id': patient.id, 'professional_id': pid, 'service_id': service.id,
+                                     'start_at': moment, 'end_at': moment + SLOT, 'status': 'scheduled',
+                                     'created_at': now, 'updated_at': now})
+                        moment += SLOT
+        if len(rows) >= 20000 or day == last_day:
+            db.session.execute(db.insert(Appointment), rows)
+            total += len(rows)
+            rows = []
+        day += timedelta(days=1)
+    db.session.commit()
+    return service.id, ids, total
+
+
+def _open_gap(professional_id, days_ahead):
+    """Cancela uma hora da agenda de um profissional daqui a ~days_ahead dias úteis"""
+    from models import db, Appointment
+    day = date.today() + timedelta(days=days_ahead)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    start = datetime.combine(day, time(15))
+    # Pelo ORM, como na rota de cancelamento: o evento invalida o índice do profissional
+    for appointment in Appointment.query.filter(
+            Appointment.professional_id == professional_id,
+            Appointment.start_at >= start, Appointment.start_at < start + timedelta(hours=1)):
+        appointment.status = 'cancelled'
+    db.session.commit()
+    return start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--professionals', type=int, default=20)
+    parser.add_argument('--years-back', type=int, default=2)
+    parser.add_argument('--years-ahead', type=int, default=1)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    app, client = bench_app()
+    from models import db, Servico
+    from utils.scheduling import first_free_slot, _agendas
+
+    results = {'benchmark': 'scheduling', 'professionals': args.professionals}
+    with app.app_context():
+        started = clock.perf_counter()
+        service_id, ids, total = _seed(args.professionals, args.years_back, args.years_ahead)
+        results.update(appointments=total, seed_seconds=round(clock.perf_counter() - started, 1))
+        service = db.session.get(Servico, service_id)
+
+        full = first_free_slot(service)
+        results['no_slot_30_days'] = {'found': full is not None, **measure(lambda: first_free_slot(service),
+                                                                             args.iterations)}
+
+        expected = _open_gap(ids[-1], 20)
+        found = first_free_slot(service)
+        assert found and found[1] == expected, (found, expected)
+        results['slot_in_20_days'] = {'found': found[1].isoformat(), **measure(lambda: first_free_slot(service),
+                                                                                 args.iterations)}
+
+        # Sem os índices em memória (primeira busca do processo ou agendas alteradas)
+        def cold_search():
+            _agendas.clear()
+            return first_free_slot(service)
+        results['slot_in_20_days_cold'] = measure(cold_search, args.iterations)
+
+    url = f'/appointments/api/first-free-slot?service_id={service_id}'
+    results['api_slot_in_20_days'] = measure(lambda: client.get(url), args.iterations)
+
+    print(f"{results['appointments']} agendamentos, {args.professionals} profissionais "
+          f"(carga em {results['seed_seconds']} s)")
+    for name in ('no_slot_30_days', 'slot_in_20_days', 'slot_in_20_days_cold', 'api_slot_in_20_days'):
+        r = results[name]
+        print(f"{name:22} p50 {r['p50_ms']:8.2f} ms   p95 {r['p95_ms']:8.2f} ms")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Bytes e latência de uma página de 100 pacientes: encoder stdlib x orjson, completo x ?fields=.
+
+Uso (a partir de backend/):
+    python -m benchmarks.serialization [--rows 100] [--iterations 200] [--fields id,full_name,phone]
+"""
+import argparse
+import json
+from datetime import datetime, date
+
+from benchmarks import bench_app, measure
+
+
+def _seed_patients(rows):
+    from models import db, Patient
+    from utils.normalize import normalize_name
+
+    missing = rows - db.session.query(Patient).count()
+    now = datetime.utcnow()
+    records = []
+    for i in range(missing):
+        cpf = i * 100 + i % 97
+        name = f'Paciente Benchmark {i:05d}'
+        records.append({
+            'full_name': name, 'cpf_number': cpf, 'phone': '(11) 98765-4321',
+            'birth_date': date(1980 + i % 30, 1 + i % 12, 1 + i % 28),
+            'musical_preference': 'MPB',
+            'observations': 'Observação clínica de exemplo com texto longo. ' * 20,
+            'name_normalized': normalize_name(name),
+            'phone_digits': '11987654321', 'phone_suffix': '87654321', 'created_at': now, 'updated_at': now,
+        })
+    if records:
+        db.session.execute(db.insert(Patient), records)
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--fields', default='id,full_name,cpf,phone,created_at')
+    args = parser.parse_args()
+
+    app, client = bench_app(COMPRESS_ENABLED=False)
+    from utils.serialization import FastJSONProvider, orjson
+
+    with app.app_context():
+        _seed_patients(args.rows)
+
+    variants = [('completo', f'/patients/api/list?per_page={args.rows}&count=none'),
+                (f'fields={args.fields}', f'/patients/api/list?per_page={args.rows}&count=none&fields={args.fields}')]
+    encoders = ['stdlib'] + (['orjson'] if orjson is not None else [])
+
+    results = []
+    for encoder in encoders:
+        app.json = FastJSONProvider(app, encoder)
+        for label, url in variants:
+            response = client.get(url)
+            assert response.status_code == 200, response.get_data(as_text=True)
+            timing = measure(lambda: client.get(url), args.iterations)
+            results.append({'encoder': encoder, 'variant': label, 'bytes': len(response.data), **timing})
+
+    baseline = results[0]
+    print(f"{'encoder':8} {'variante':45} {'bytes':>8} {'p50 ms':>8} {'p95 ms':>8} {'bytes %':>8} {'p50 %':>7}")
+    for r in results:
+        print(f"{r['encoder']:8} {r['variant']:45} {r['bytes']:8d} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} "
+              f"{100 * r['bytes'] / baseline['bytes']:7.1f}% {100 * r['p50_ms'] / baseline['p50_ms']:6.1f}%")
+    print(json.dumps({'benchmark': 'serialization', 'rows': args.rows, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
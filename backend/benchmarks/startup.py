@@ -0,0 +1,152 @@
+"""Tempo de partida: import, create_app e primeira resposta, com orçamento.
+
+Cada medição roda em um processo Python novo com `-X importtime`:
+  - frio: import de app + create_app() + primeira requisição (worker sem preload);
+  - worker: depois do create_app, um fork faz o que o post_fork do gunicorn faz
+    (descarta o pool herdado) e responde a primeira requisição (worker com preload).
+Reporta os módulos do projeto e os pacotes com maior custo de import e os
+statements SQL executados por create_app (devem ser zero: o esquema e o admin
+ficam com `flask init-db` / `flask seed-admin`). Sai com erro se o worker com
+preload passar de --budget-ms.
+
+Uso (a partir de backend/):
+    python -m benchmarks.startup [--runs 5] [--budget-ms 300] [--top 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_MODULES = ('app', 'config', 'models', 'commands', 'migrations', 'wsgi', 'routes', 'utils')
+
+# Executado no processo medido; escreve um JSON na última linha do stdout
+_PROBE = r'''
+import json, os, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+statements = []
+event.listen(Engine, 'before_cursor_execute', lambda *args: statements.append(1))
+
+app = create_app()
+created = time.perf_counter()
+
+def first_request():
+    with app.test_client() as client:
+        return client.get('/auth/login').status_code
+
+first_request()
+served = time.perf_counter()
+
+read_fd, write_fd = os.pipe()
+forked = time.perf_counter()
+pid = os.fork()
+if pid == 0:
+    from models import db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    first_request()
+    os.write(write_fd, str(time.perf_counter() - forked).encode())
+    os._exit(0)
+os.close(write_fd)
+worker_seconds = float(os.read(read_fd, 64))
+os.waitpid(pid, 0)
+
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (served - created) * 1000,
+    'worker_ready_ms': worker_seconds * 1000,
+    'create_app_statements': len(statements),
+}))
+'''
+
+
+def _environment():
+    scratch = tempfile.mkdtemp(prefix='bench-startup-')
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(scratch, 'startup.db'))
+    env.setdefault('SECRET_KEY', 'bench-secret-key-' + 'x' * 32)
+    env.setdefault('JWT_SECRET_KEY', 'bench-jwt-key-' + 'y' * 32)
+    env.update(LOG_FILE='', LOG_STDERR='off', METRICS_DIR=os.path.join(scratch, 'metrics'))
+    return env
+
+
+def parse_importtime(stderr):
+    """{módulo: (próprio µs, acumulado µs)} a partir da saída de -X importtime"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line.split(':', 1)[1].split('|')
+        modules[name.strip()] = (int(own), int(cumulative))
+    return modules
+
+
+def _is_project(name):
+    return name.split('.', 1)[0] in PROJECT_MODULES
+
+
+def measure_once(env):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', _PROBE], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f'❌ Falha ao medir a partida:\n{result.stderr[-2000:]}')
+    return json.loads(result.stdout.strip().splitlines()[-1]), parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=300)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    env = _environment()
+    runs, imports = [], None
+    for _ in range(args.runs):
+        timings, modules = measure_once(env)
+        runs.append(timings)
+        imports = imports or modules
+
+    summary = {key: round(statistics.median(r[key] for r in runs), 1)
+               for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'worker_ready_ms')}
+    summary['cold_start_ms'] = round(summary['import_ms'] + summary['create_app_ms'] + summary['first_request_ms'], 1)
+    summary['create_app_statements'] = max(r['create_app_statements'] for r in runs)
+
+    # Pacotes de topo (terceiros e stdlib): o acumulado inclui os submódulos
+    packages = {name: cumulative for name, (_, cumulative) in imports.items()
+                if '.' not in name and not _is_project(name)}
+    project = sorted(((own, name) for name, (own, _) in imports.items() if _is_project(name)), reverse=True)
+    third_party = sorted(((us, name) for name, us in packages.items()), reverse=True)
+
+    print(f"import {summary['import_ms']} ms   create_app {summary['create_app_ms']} ms   "
+          f"primeira requisição {summary['first_request_ms']} ms   (frio: {summary['cold_start_ms']} ms)")
+    print(f"statements SQL em create_app: {summary['create_app_statements']}")
+    print('módulos do projeto (import próprio):')
+    for us, name in project[:args.top]:
+        print(f'  {us / 1000:7.1f} ms  {name}')
+    print('pacotes (import acumulado):')
+    for us, name in third_party[:args.top]:
+        print(f'  {us / 1000:7.1f} ms  {name}')
+    ok = summary['worker_ready_ms'] <= args.budget_ms
+    status = '✅' if ok else '❌'
+    print(f"{status} worker com preload pronto em {summary['worker_ready_ms']} ms (orçamento {args.budget_ms:g} ms)")
+    print(json.dumps({'benchmark': 'startup', 'runs': args.runs, 'budget_ms': args.budget_ms, **summary,
+                      'project_modules_ms': {name: round(us / 1000, 2) for us, name in project[:args.top]},
+                      'packages_ms': {name: round(us / 1000, 2) for us, name in third_party[:args.top]}},
+                     indent=2))
+    if not ok or summary['create_app_statements']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""Suíte de latência das rotas reais com 10 mil, 100 mil e 1 milhão de pacientes.
+
+Para cada tamanho, um subprocesso popula um banco SQLite descartável com
+`utils.seed` (CPFs válidos, profissionais com serviços, anos de atendimentos)
+e chama as rotas pelo test client: listagem e busca de pacientes, detalhe,
+histórico de atendimentos, cadastro, listagem de profissionais, resumo do
+dashboard e login. Reporta p50/p95 e statements por chamada (X-Query-Count) e
+grava tudo em JSON; --compare mostra a variação do p50 contra uma execução
+anterior.
+
+Uso (a partir de backend/):
+    python -m benchmarks.suite [--sizes 10000,100000,1000000] [--atendimentos-per-patient 3]
+                               [--iterations 200] [--output arquivo.json] [--compare anterior.json]
+                               [--keep-databases DIR]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from importlib.metadata import version
+
+from benchmarks import BENCH_ADMIN_PASSWORD, bench_app, measure
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+# Faixa de números de CPF fora das usadas por utils.seed (pacientes e profissionais)
+_CREATE_CPF_BASE = 800_000_000
+
+
+def _log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def prepare(app, patients, atendimentos_per_patient):
+    """Popula o banco se estiver vazio e escolhe os alvos dos cenários"""
+    from models import db, Patient, Atendimento
+    from utils.cpf import cpf_digits
+    from utils.seed import seed_database
+
+    with app.app_context():
+        seed_seconds = None
+        if not db.session.execute(db.select(Patient.id).limit(1)).first():
+            start = time.perf_counter()
+            seed_database(patients=patients, atendimentos=patients * atendimentos_per_patient,
+                          random_seed=patients, log=_log)
+            seed_seconds = round(time.perf_counter() - start, 1)
+
+        first_id, last_id, total = db.session.execute(
+            db.select(db.func.min(Patient.id), db.func.max(Patient.id), db.func.count(Patient.id))
+        ).one()
+        busiest = db.session.execute(
+            db.select(Atendimento.patient_id).group_by(Atendimento.patient_id)
+            .order_by(db.func.count().desc()).limit(1)
+        ).scalar()
+        rng = random.Random(patients)
+        sample = [rng.randint(first_id, last_id) for _ in range(100)]
+        cpf_prefix = cpf_digits(db.session.execute(
+            db.select(Patient.cpf_number).where(Patient.id == sample[0])).scalar())[:6]
+        phone = db.session.execute(db.select(Patient.phone_digits).where(Patient.id == sample[1])).scalar()
+        return {
+            'patients': total,
+            'atendimentos': db.session.execute(db.select(db.func.count(Atendimento.id))).scalar(),
+            'seed_seconds': seed_seconds,
+            'sample': sample,
+            'busiest': busiest,
+            'cpf_prefix': cpf_prefix,
+            'phone': phone,
+            'dialect': db.engine.dialect.name,
+        }
+
+
+def scenarios(app, client, targets):
+    """(nome, função que faz uma chamada, status esperado, iterações relativas)"""
+    from utils.seed import cpf_from_number
+
+    sample = targets['sample']
+    state = {'detail': 0, 'created': 0}
+
+    def detail():
+        state['detail'] += 1
+        return client.get(f"/patients/api/{sample[state['detail'] % len(sample)]}")
+
+    def create():
+        state['created'] += 1
+        n = state['created']
+        return client.post('/patients/api/create', json={
+            'full_name': f'Paciente Benchmark {n}',
+            'cpf': cpf_from_number(_CREATE_CPF_BASE + targets['patients'] + n),
+            'phone': f'(11) 9{n % 10000:04d}-{n // 10000 % 10000:04d}',
+        })
+
+    def login():
+        # Cliente novo a cada chamada: sem sessão, o login verifica a senha de verdade
+        return app.test_client().post('/auth/login', data={'username': 'admin', 'password': BENCH_ADMIN_PASSWORD})
+
+    return [
+        ('patients_list', lambda: client.get('/patients/api/list'), 200, 1),
+        ('patients_search_name', lambda: client.get('/patients/api/list?search=silva'), 200, 1),
+        ('patients_search_cpf', lambda: client.get(f"/patients/api/list?search={targets['cpf_prefix']}"), 200, 1),
+        ('patients_by_phone', lambda: client.get(f"/patients/api/by-phone/{targets['phone']}"), 200, 1),
+        ('patient_detail', detail, 200, 1),
+        ('patient_history', lambda: client.get(f"/atendimentos/api/patient/{targets['busiest']}"), 200, 1),
+        ('professionals_list', lambda: client.get('/professionals/api/list'), 200, 1),
+        ('dashboard_summary', lambda: client.get('/api/dashboard/summary'), 200, 1),
+        ('patient_create', create, 201, 1),
+        # Derivação de senha domina o login: poucas iterações bastam
+        ('login', login, 302, 0.1),
+    ]
+
+
+def run_size(patients, atendimentos_per_patient, iterations):
+    """Executa a suíte num único tamanho (chamado no subprocesso)"""
+    # Sem orçamento estourando em exceção, mas com o cabeçalho X-Query-Count
+    os.environ['QUERY_BUDGET_MODE'] = 'warn'
+    app, client = bench_app(METRICS_ENABLED=False)
+    app.logger.disabled = True
+    targets = prepare(app, patients, atendimentos_per_patient)
+    _log(f"→ {targets['patients']} pacientes, {targets['atendimentos']} atendimentos")
+
+    results = []
+    for name, call, expected, weight in scenarios(app, client, targets):
+        response = call()
+        if response.status_code != expected:
+            raise SystemExit(f'❌ {name}: status {response.status_code} (esperado {expected})')
+        counts = []
+
+        def timed():
+            counts.append(int(call().headers.get('X-Query-Count', 0)))
+
+        r = measure(timed, max(int(iterations * weight), 10))
+        r.update(name=name, queries_per_call=round(sum(counts) / len(counts), 2))
+        results.append(r)
+        _log(f"  {name:22} p50 {r['p50_ms']:8.2f} ms  p95 {r['p95_ms']:8.2f} ms  {r['queries_per_call']:5.1f} stmts")
+
+    return {
+        'patients': targets['patients'],
+        'atendimentos': targets['atendimentos'],
+        'seed_seconds': targets['seed_seconds'],
+        'dialect': targets['dialect'],
+        'scenarios': results,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(current, previous):
+    """Variação do p50 por tamanho e cenário"""
+    before = {(run['patients'], s['name']): s for run in previous['runs'] for s in run['scenarios']}
+    print(f"\n{'pacientes':>10} {'cenário':22} {'p50 antes':>10} {'p50 agora':>10} {'variação':>9}")
+    for run in current['runs']:
+        for s in run['scenarios']:
+            old = before.get((run['patients'], s['name']))
+            if old is None:
+                continue
+            delta = (s['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0
+            print(f"{run['patients']:>10} {s['name']:22} {old['p50_ms']:10.2f} {s['p50_ms']:10.2f} {delta:+8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000,1000000', help='Quantidades de pacientes')
+    parser.add_argument('--atendimentos-per-patient', type=int, default=3)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--output', help='Padrão: benchmarks/results/suite-<data>.json')
+    parser.add_argument('--compare', type=argparse.FileType('r'), help='JSON de uma execução anterior')
+    parser.add_argument('--keep-databases', metavar='DIR',
+                        help='Guarda (e reaproveita) o banco de cada tamanho em DIR')
+    parser.add_argument('--run-size', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_size:
+        print(json.dumps(run_size(args.run_size, args.atendimentos_per_patient, args.iterations)))
+        return
+
+    runs = []
+    for size in [int(s) for s in args.sizes.split(',')]:
+        _log(f'=== {size} pacientes ===')
+        # Um processo por tamanho: memória, caches e engine começam do zero
+        env = dict(os.environ)
+        workdir = None
+        if args.keep_databases:
+            os.makedirs(args.keep_databases, exist_ok=True)
+            env['BENCH_DATABASE_URL'] = 'sqlite:///' + os.path.abspath(
+                os.path.join(args.keep_databases, f'suite-{size}.db'))
+        else:
+            workdir = tempfile.mkdtemp(prefix='bench-suite-')
+            env['BENCH_DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+        try:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.suite', '--run-size', str(size),
+                 '--atendimentos-per-patient', str(args.atendimentos_per_patient),
+                 '--iterations', str(args.iterations)],
+                env=env, stdout=subprocess.PIPE, text=True, check=True
+            ).stdout
+        finally:
+            if workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    report = {
+        'benchmark': 'suite',
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'flask': version('flask'),
+        'sqlalchemy': version('sqlalchemy'),
+        'platform': platform.platform(),
+        'iterations': args.iterations,
+        'atendimentos_per_patient': args.atendimentos_per_patient,
+        'runs': runs,
+    }
+
+    output_path = args.output
+    if not output_path:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output_path = os.path.join(RESULTS_DIR, f"suite-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'pacientes':>10} {'cenário':22} {'p50 ms':>9} {'p95 ms':>9} {'stmts':>6}")
+    for run in runs:
+        for s in run['scenarios']:
+            print(f"{run['patients']:>10} {s['name']:22} {s['p50_ms']:9.2f} {s['p95_ms']:9.2f} "
+                  f"{s['queries_per_call']:6.1f}")
+    if args.compare:
+        compare(report, json.load(args.compare))
+    print(f'\nResultados em {output_path}')
+
+
+if __name__ == '__main__':
+    main()
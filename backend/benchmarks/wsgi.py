@@ -0,0 +1,181 @@
+"""Vazão do servidor de desenvolvimento (python app.py) x gunicorn com preload.
+
+Popula um banco SQLite descartável, sobe cada servidor em um subprocesso e
+dispara requisições autenticadas a /patients/api/list a partir de vários
+processos clientes (conexões keep-alive) por alguns segundos. Reporta
+requisições por segundo, p50/p99 e erros de cada configuração.
+
+Uso (a partir de backend/):
+    python -m benchmarks.wsgi [--patients 5000] [--clients 16] [--seconds 10]
+                              [--workers 4] [--threads 4] [--worker-class gthread]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+
+from benchmarks import BENCH_ADMIN_PASSWORD, bench_app
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGET = '/patients/api/list?limit=20'
+# Mesmo app.run() de `python app.py`, sem o reloader (que dobraria os processos)
+DEV_SERVER = 'from app import create_app; create_app().run(debug=True, use_reloader=False, port={port})'
+_CSRF = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def prepare_database(patients):
+    """Banco populado compartilhado pelos servidores; devolve o ambiente dos subprocessos"""
+    from utils.seed import seed_database
+
+    app, _ = bench_app()
+    with app.app_context():
+        seed_database(patients=patients, atendimentos=patients * 2, random_seed=patients, log=lambda _: None)
+    scratch = tempfile.mkdtemp(prefix='bench-wsgi-')
+    return dict(
+        os.environ,
+        LOG_FILE=os.path.join(scratch, 'clinica.log'),
+        LOG_STDERR='off',
+        METRICS_DIR=os.path.join(scratch, 'metrics'),
+        QUERY_BUDGET_MODE='off',
+        RATELIMIT_ENABLED='false',
+    ), scratch
+
+
+def _wait_ready(port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'servidor encerrou com código {process.returncode}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('servidor não respondeu a tempo')
+
+
+def _login(port):
+    """Cookie de sessão do admin (formulário com CSRF, como no navegador)"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    conn.request('GET', '/auth/login')
+    response = conn.getresponse()
+    token = _CSRF.search(response.read().decode()).group(1)
+    cookie = response.getheader('Set-Cookie').split(';', 1)[0]
+    body = urllib.parse.urlencode({'csrf_token': token, 'username': 'admin', 'password': BENCH_ADMIN_PASSWORD})
+    conn.request('POST', '/auth/login', body, {'Cookie': cookie, 'Content-Type': 'application/x-www-form-urlencoded'})
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    if response.status != 302:
+        raise RuntimeError(f'login falhou ({response.status})')
+    return '; '.join(c.split(';', 1)[0] for c in response.headers.get_all('Set-Cookie'))
+
+
+def _client(port, cookie, seconds, results):
+    latencies, errors = [], 0
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    deadline = time.perf_counter() + seconds
+    while (start := time.perf_counter()) < deadline:
+        try:
+            conn.request('GET', TARGET, headers={'Cookie': cookie})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+            if response.will_close:
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    results.put((latencies, errors))
+
+
+def load(port, clients, seconds):
+    cookie = _login(port)
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_client, args=(port, cookie, seconds, results))
+                 for _ in range(clients)]
+    for p in processes:
+        p.start()
+    latencies, errors = [], 0
+    for _ in processes:
+        samples, failed = results.get()
+        latencies.extend(samples)
+        errors += failed
+    for p in processes:
+        p.join()
+    latencies.sort()
+    return {
+        'requests_per_second': round(len(latencies) / seconds, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        'errors': errors,
+        'requests': len(latencies),
+    }
+
+
+def run_server(name, command, env, clients, seconds):
+    port = _free_port()
+    env = dict(env, WEB_BIND=f'127.0.0.1:{port}')
+    command = [arg.format(port=port) for arg in command]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_ready(port, process)
+        result = load(port, clients, seconds)
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+    return {'server': name, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=5000)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--worker-class', default='gthread', choices=('gthread', 'gevent'))
+    args = parser.parse_args()
+
+    env, scratch = prepare_database(args.patients)
+    gunicorn_env = dict(env, WEB_CONCURRENCY=str(args.workers), WEB_THREADS=str(args.threads),
+                        WEB_WORKER_CLASS=args.worker_class)
+    gunicorn_name = f'gunicorn {args.worker_class} {args.workers}x{args.threads}'
+    try:
+        results = [
+            run_server('python app.py', [sys.executable, '-c', DEV_SERVER], env, args.clients, args.seconds),
+            run_server(gunicorn_name, [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                       gunicorn_env, args.clients, args.seconds),
+        ]
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    for r in results:
+        print(f"{r['server']:24} {r['requests_per_second']:8.1f} req/s   p50 {r['p50_ms']:7.2f} ms   "
+              f"p99 {r['p99_ms']:7.2f} ms   erros {r['errors']}")
+    print(json.dumps({'benchmark': 'wsgi', 'target': TARGET, 'clients': args.clients, 'seconds': args.seconds,
+                      'cpus': os.cpu_count(), 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+import os
+
+import click
+
+
+def register_commands(app):
+    """Registra os comandos de linha de comando (flask <comando>)"""
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Cria as tabelas ausentes e aplica as migrações pendentes."""
+        from migrations import init_db
+        applied = init_db(log=click.echo)
+        click.echo(f'✅ Banco de dados inicializado ({len(applied)} migração(ões) aplicada(s)).')
+
+    @app.cli.command('seed-admin')
+    @click.option('--password', help='Padrão: ADMIN_DEFAULT_PASSWORD ou admin123.')
+    def seed_admin_command(password):
+        """Cria o usuário admin padrão se ainda não existir."""
+        from utils.seed import seed_admin
+        if not seed_admin(password, log=click.echo):
+            click.echo('Usuário admin já existe; nada a fazer.')
+
+    @app.cli.command('rebuild-stats')
+    def rebuild_stats_command():
+        """Recalcula os agregados do dashboard a partir das tabelas de origem."""
+        from utils.rollups import rebuild_rollups
+        rebuild_rollups()
+        click.echo('✅ Agregados do dashboard recalculados.')
+
+    @app.cli.command('import-patients')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='Padrão: pela extensão do arquivo.')
+    @click.option('--chunk-size', default=1000, show_default=True, help='Registros por lote/commit.')
+    def import_patients_command(path, fmt, chunk_size):
+        """Importa pacientes em lote de um arquivo CSV ou NDJSON."""
+        from utils.patient_import import detect_format, import_patients_from_stream
+        with open(path, 'rb') as f:
+            report = import_patients_from_stream(f, fmt or detect_format(path), chunk_size=chunk_size)
+        for error in report['errors']:
+            click.echo(f"  linha {error['row']}: {error['error']}", err=True)
+        click.echo(f"✅ {report['imported']} pacientes importados, {report['failed']} rejeitados de {report['total']}.")
+
+    @app.cli.command('seed')
+    @click.option('--patients', default=0, show_default=True, help='Pacientes a gerar.')
+    @click.option('--atendimentos', default=0, show_default=True, help='Atendimentos a gerar.')
+    @click.option('--professionals', type=int, help='Padrão: 1 a cada 2000 pacientes (mínimo 5).')
+    @click.option('--years', default=3, show_default=True, help='Anos de histórico até hoje.')
+    @click.option('--batch-size', default=5000, show_default=True, help='Registros por lote/commit.')
+    @click.option('--seed', 'random_seed', type=int, help='Semente do gerador (dados reproduzíveis).')
+    @click.option('--yes', is_flag=True, help='Não pede confirmação fora do ambiente de desenvolvimento.')
+    def seed_command(patients, atendimentos, professionals, years, batch_size, random_seed, yes):
+        """Popula o banco com dados sintéticos (CPFs válidos) para testes de carga."""
+        if os.environ.get('FLASK_ENV') != 'development' and not yes:
+            click.confirm(f"Gerar dados sintéticos em {app.config['SQLALCHEMY_DATABASE_URI']}?", abort=True)
+        from models import User
+        from utils.seed import seed_database
+        admin = User.query.filter_by(username='admin').first()
+        try:
+            counts = seed_database(patients, atendimentos, professionals, years, batch_size,
+                                   random_seed, admin.id if admin else None, log=click.echo)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"✅ {counts['professionals']} profissionais, {counts['patients']} pacientes e "
+                   f"{counts['atendimentos']} atendimentos gerados.")
+
+    @app.cli.command('export')
+    @click.argument('entity', type=click.Choice(['patients', 'atendimentos']))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default='csv', show_default=True)
+    @click.option('--output', '-o', type=click.File('w', encoding='utf-8'), default='-', help='Padrão: saída padrão.')
+    @click.option('--start', help='Data inicial (YYYY-MM-DD).')
+    @click.option('--end', help='Data final (YYYY-MM-DD).')
+    @click.option('--professional-id', type=int, help='Somente atendimentos deste profissional.')
+    def export_command(entity, fmt, output, start, end, professional_id):
+        """Exporta pacientes ou atendimentos em CSV/NDJSON, em streaming."""
+        from utils.export import (PATIENT_FIELDS, ATENDIMENTO_FIELDS, parse_date_range,
+                                  patient_rows, atendimento_rows, iter_export)
+        try:
+            start, end = parse_date_range(start, end)
+        except ValueError:
+            raise click.BadParameter('use o formato YYYY-MM-DD', param_hint='--start/--end')
+
+        if entity == 'patients':
+            chunks = iter_export(patient_rows(start, end), PATIENT_FIELDS, fmt)
+        else:
+            chunks = iter_export(atendimento_rows(start, end, professional_id), ATENDIMENTO_FIELDS, fmt)
+        for chunk in chunks:
+            output.write(chunk)
+
+    @app.cli.group('assets')
+    def assets_group():
+        """Pipeline dos arquivos estáticos."""
+
+    @assets_group.command('build')
+    def assets_build_command():
+        """Gera cópias com hash e pré-comprimidas de frontend/static."""
+        from utils.assets import assets_folder, build_assets
+        output = assets_folder()
+        manifest = build_assets(app.static_folder, output)
+        click.echo(f'✅ {len(manifest)} arquivo(s) gerado(s) em {os.path.normpath(output)}.')
+
+    @app.cli.group('db')
+    def db_group():
+        """Migrações e verificação do esquema do banco."""
+
+    @db_group.command('upgrade')
+    def db_upgrade_command():
+        """Aplica as migrações pendentes."""
+        from migrations import upgrade
+        applied = upgrade(log=click.echo)
+        click.echo(f'✅ {len(applied)} migração(ões) aplicada(s).')
+
+    @db_group.command('current')
+    def db_current_command():
+        """Mostra as migrações aplicadas e pendentes."""
+        from migrations import MIGRATIONS, applied_versions
+        applied = applied_versions()
+        for version, description, _ in MIGRATIONS:
+            status = 'aplicada' if version in applied else 'PENDENTE'
+            click.echo(f'{version:04d}  {status:9}  {description}')
+
+    @db_group.command('check')
+    def db_check_command():
+        """Verifica se tabelas, colunas e índices declarados existem no banco."""
+        from migrations import check_schema
+        problems = check_schema()
+        for problem in problems:
+            click.echo(f'❌ {problem}', err=True)
+        if problems:
+            raise SystemExit(1)
+        click.echo('✅ Esquema do banco confere com o declarado.')
@@ -12,6 +12,19 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Pool de conexões e timeout por statement (ms, apenas PostgreSQL; 0 desativa)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 15000))
+    
+    # Réplica de leitura opcional para os GETs de listagem/detalhe
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    # Após uma escrita, o usuário lê do primário por este tempo (read-your-writes)
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+    
     # Configurações de segurança
     WTF_CSRF_TIME_LIMIT = None
     SESSION_COOKIE_SECURE = os.environ.get('FLASK_ENV') != 'development'
@@ -19,10 +32,99 @@ class Config:
     SESSION_COOKIE_SAMESITE = 'Lax'
     PERMANENT_SESSION_LIFETIME = timedelta(hours=2)
     
-    # JWT Config
+    # JWT Config (JWTManager só é carregado com JWT_ENABLED=true)
+    JWT_ENABLED = os.environ.get('JWT_ENABLED', 'false').lower() == 'true'
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=2)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     
+    # Paginação: validade (s) e número máximo de chaves do cache de contagens aproximadas (?count=estimate)
+    COUNT_CACHE_TTL = int(os.environ.get('COUNT_CACHE_TTL', 60))
+    COUNT_CACHE_SIZE = int(os.environ.get('COUNT_CACHE_SIZE', 1024))
+    
+    # Intervalo (s) entre verificações da versão do catálogo de serviços em cache
+    CATALOG_CHECK_SECONDS = float(os.environ.get('CATALOG_CHECK_SECONDS', 2))
+    
+    # Compressão (gzip/brotli) de respostas JSON e HTML acima de COMPRESS_MIN_SIZE bytes
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BR_LEVEL = int(os.environ.get('COMPRESS_BR_LEVEL', 5))
+    
+    # Saída de `flask assets build` (relativa a backend/): cópias com hash e pré-comprimidas
+    ASSETS_FOLDER = os.environ.get('ASSETS_FOLDER', '../frontend/dist')
+    
+    # Encoder JSON das respostas: auto (orjson se instalado), orjson ou stdlib
+    JSON_ENCODER = os.environ.get('JSON_ENCODER', 'auto')
+    
+    # Validade (s) da identidade autenticada em cache por processo (usuário, papel, permissões)
+    IDENTITY_CACHE_TTL = float(os.environ.get('IDENTITY_CACHE_TTL', 30))
+    
+    # Política de hash de senhas (scrypt:N:r:p, pbkdf2:sha256:iterações ou bcrypt:custo).
+    # Hashes antigos são refeitos com a política atual no próximo login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    # Pool dedicado ao KDF: threads, logins em espera e tempo máximo de espera (s).
+    # No gthread cada login em espera segura uma thread de requisição: a fila é limitada
+    # a WEB_THREADS - 1 chamadas por processo (o mesmo valor lido pelo gunicorn.conf.py)
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 4))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    
+    # Limite de requisições (token bucket): padrão por cliente (usuário ou IP) em todas as
+    # rotas, "requisições/segundos"; rotas sensíveis têm orçamento próprio (@rate_limit).
+    # Armazenamento: mmap:// (arquivo compartilhado entre workers), memory:// ou redis://
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    RATELIMIT_DEFAULT = os.environ.get('RATELIMIT_DEFAULT', '600/60')
+    RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL', 'mmap://')
+    
+    # Proxies reversos confiáveis à frente da aplicação (nginx, balanceador): com N > 0 o IP
+    # do cliente (limite por IP, /metrics, logs) vem do N-ésimo valor de X-Forwarded-For,
+    # contado da direita. Com 0 (padrão) os cabeçalhos X-Forwarded-* são ignorados; nunca
+    # configure mais proxies do que os que de fato existem, ou o cliente forja o próprio IP.
+    TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+    
+    # Métricas no formato do Prometheus em /metrics. Cada processo grava os próprios valores
+    # em METRICS_DIR (padrão: instance/metrics) e a coleta soma todos os workers.
+    # Com METRICS_TOKEN, o coletor envia "Authorization: Bearer <token>"; sem ele, a coleta é
+    # negada, exceto de 127.0.0.1 com METRICS_ALLOW_LOCAL=true (atrás de proxy no mesmo host,
+    # só com TRUSTED_PROXIES: senão toda requisição externa parece vir de 127.0.0.1)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_DIR = os.environ.get('METRICS_DIR', '')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_ALLOW_LOCAL = os.environ.get('METRICS_ALLOW_LOCAL', 'false').lower() == 'true'
+    
+    # Orçamento de statements SQL por requisição (utils.query_budget): off, warn (log) ou
+    # raise (erro no statement que estoura). Rotas declaram o próprio limite com
+    # @query_budget; as demais usam QUERY_BUDGET_DEFAULT. A mesma forma de statement
+    # repetida mais de QUERY_BUDGET_REPEATS vezes é tratada como N+1.
+    QUERY_BUDGET_MODE = os.environ.get('QUERY_BUDGET_MODE',
+                                       'warn' if os.environ.get('FLASK_ENV') == 'development' else 'off')
+    QUERY_BUDGET_DEFAULT = int(os.environ.get('QUERY_BUDGET_DEFAULT', 20))
+    QUERY_BUDGET_REPEATS = int(os.environ.get('QUERY_BUDGET_REPEATS', 3))
+    
+    # Logs (utils.logs): a requisição só enfileira; uma thread grava JSON em LOG_FILE (vazio
+    # desliga) e texto ou JSON no stderr (LOG_STDERR=text|json|off). O arquivo rotaciona ao
+    # passar de LOG_MAX_BYTES ou a cada LOG_ROTATE_INTERVAL (hourly, daily ou off).
+    # Avisos de 400/404 passam no máximo LOG_SAMPLE_BURST vezes a cada LOG_SAMPLE_WINDOW s.
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    LOG_FILE = os.environ.get('LOG_FILE', 'logs/clinica.log')
+    LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 50 * 1024 * 1024))
+    LOG_ROTATE_INTERVAL = os.environ.get('LOG_ROTATE_INTERVAL', 'daily')
+    LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 14))
+    LOG_STDERR = os.environ.get('LOG_STDERR', 'text')
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+    LOG_SAMPLE_BURST = int(os.environ.get('LOG_SAMPLE_BURST', 20))
+    LOG_SAMPLE_WINDOW = float(os.environ.get('LOG_SAMPLE_WINDOW', 60))
+    # Cabeçalho do id de correlação: aceito na entrada (proxy/balanceador) e devolvido na resposta
+    REQUEST_ID_HEADER = os.environ.get('REQUEST_ID_HEADER', 'X-Request-ID')
+    
+    # Fuso da clínica (ex.: America/Sao_Paulo) para os dias e meses do dashboard; vazio usa o
+    # fuso do servidor. Ao mudar, rode `flask rebuild-stats`
+    CLINIC_TIMEZONE = os.environ.get('CLINIC_TIMEZONE', '')
+    
+    # Grade (min) dos horários oferecidos pela busca de horário livre dos agendamentos
+    APPOINTMENT_SLOT_MINUTES = int(os.environ.get('APPOINTMENT_SLOT_MINUTES', 15))
+    
     # Configurações de upload
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
\ No newline at end of file
@@ -0,0 +1,63 @@
+# Configuração do gunicorn para produção (a partir de backend/):
+#
+#     gunicorn -c gunicorn.conf.py wsgi:app
+#
+# A aplicação é criada uma vez no mestre (preload) e os workers são criados por
+# fork. Tamanho e tipo dos workers vêm do ambiente:
+#   WEB_WORKER_CLASS  gthread (padrão) ou gevent
+#   WEB_CONCURRENCY   processos (padrão: 2 × núcleos + 1)
+#   WEB_THREADS       threads por processo no gthread (padrão 4); mantenha
+#                     DB_POOL_SIZE + DB_MAX_OVERFLOW acima deste número
+#   WEB_WORKER_CONNECTIONS  requisições simultâneas por processo no gevent (padrão 100)
+#   WEB_BIND, WEB_TIMEOUT, WEB_GRACEFUL_TIMEOUT, WEB_KEEPALIVE, WEB_MAX_REQUESTS
+import multiprocessing
+import os
+
+worker_class = os.environ.get('WEB_WORKER_CLASS', 'gthread')
+if worker_class not in ('gthread', 'gevent'):
+    raise ValueError('WEB_WORKER_CLASS deve ser gthread ou gevent')
+
+if worker_class == 'gevent':
+    # O patch precisa vir antes do preload importar a aplicação (sockets, threads e locks)
+    from gevent import monkey
+    monkey.patch_all()
+    try:
+        # psycopg2 só cede o loop durante as consultas com o hook do psycogreen
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        pass
+
+bind = os.environ.get('WEB_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_connections = int(os.environ.get('WEB_WORKER_CONNECTIONS', 100))
+preload_app = True
+
+# Worker sem responder por WEB_TIMEOUT s é reiniciado. No SIGTERM o worker para de
+# aceitar conexões e tem WEB_GRACEFUL_TIMEOUT s para terminar as requisições em andamento
+timeout = int(os.environ.get('WEB_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('WEB_KEEPALIVE', 5))
+
+# Reciclagem periódica dos workers (0 desativa); o jitter evita que reiniciem juntos
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+# Os logs da aplicação têm pipeline próprio (utils.logs); o de acesso vai para o stderr
+accesslog = os.environ.get('WEB_ACCESS_LOG') or None
+
+
+def on_starting(server):
+    import wsgi
+    wsgi.reset_metrics()
+
+
+def post_fork(server, worker):
+    import wsgi
+    wsgi.reset_after_fork()
+
+
+def worker_exit(server, worker):
+    import wsgi
+    wsgi.shutdown_worker()
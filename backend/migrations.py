@@ -0,0 +1,346 @@
+# backend/migrations.py
+# Migrações versionadas do esquema.
+#
+# db.create_all() só cria tabelas que ainda não existem: colunas e índices
+# novos em tabelas antigas ficam para as migrações abaixo. Cada migração é
+# registrada em schema_migrations e deve ser idempotente, pois bancos criados
+# do zero por create_all() já nascem com parte das estruturas.
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateTable
+from models import db, Patient, Professional
+
+# Tabela de controle fora do metadata dos modelos (não faz parte do esquema declarado)
+_control_metadata = db.MetaData()
+schema_migrations = db.Table(
+    'schema_migrations', _control_metadata,
+    db.Column('version', db.Integer, primary_key=True),
+    db.Column('description', db.String(200), nullable=False),
+    db.Column('applied_at', db.DateTime, nullable=False)
+)
+
+MIGRATIONS = []
+
+
+class MigrationError(RuntimeError):
+    """Dados que a migração não converte sozinha: nada foi alterado, corrija e rode de novo"""
+
+
+def migration(version, description):
+    """Registra uma função como a migração `version`"""
+    def decorator(f):
+        MIGRATIONS.append((version, description, f))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return f
+    return decorator
+
+
+# ===== UTILITÁRIOS =====
+
+def add_missing_columns(table_name, columns):
+    """Adiciona colunas (nome -> tipo SQL) que ainda não existem; retorna as adicionadas"""
+    existing = {c['name'] for c in db.inspect(db.engine).get_columns(table_name)}
+    missing = [name for name in columns if name not in existing]
+    with db.engine.begin() as conn:
+        for name in missing:
+            conn.execute(db.text(f'ALTER TABLE {table_name} ADD COLUMN {name} {columns[name]}'))
+    return missing
+
+
+def has_column(table_name, column_name):
+    return column_name in {c['name'] for c in db.inspect(db.engine).get_columns(table_name)}
+
+
+def rebuild_sqlite_table(table):
+    """Recria uma tabela do SQLite com o esquema declarado, copiando as colunas em comum.
+
+    O SQLite não remove colunas UNIQUE com ALTER TABLE: segue o procedimento da
+    documentação (tabela nova, cópia, DROP e troca de nome). Índices e gatilhos
+    da tabela antiga somem com ela; quem chama deve recriá-los.
+    """
+    existing = {c['name'] for c in db.inspect(db.engine).get_columns(table.name)}
+    columns = ', '.join(c.name for c in table.columns if c.name in existing)
+    rebuilt = table.to_metadata(db.metadata, name=f'{table.name}__rebuild')
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(CreateTable(rebuilt))
+            conn.execute(db.text(f'INSERT INTO {rebuilt.name} ({columns}) SELECT {columns} FROM {table.name}'))
+            conn.execute(db.text(f'DROP TABLE {table.name}'))
+            conn.execute(db.text(f'ALTER TABLE {rebuilt.name} RENAME TO {table.name}'))
+    finally:
+        db.metadata.remove(rebuilt)
+
+
+def declared_indexes():
+    """Índices declarados nos modelos, por tabela"""
+    return {table.name: list(table.indexes) for table in db.metadata.sorted_tables}
+
+
+def invalid_indexes():
+    """Índices INVALID do PostgreSQL: um CREATE INDEX CONCURRENTLY interrompido deixa o
+    índice no catálogo (o nome existe), mas o planejador não o usa e o UNIQUE não vale"""
+    if db.engine.dialect.name != 'postgresql':
+        return set()
+    with db.engine.connect() as conn:
+        return set(conn.execute(db.text(
+            'SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+            'WHERE NOT i.indisvalid AND c.relnamespace = current_schema()::regnamespace'
+        )).scalars())
+
+
+def create_index_online(index):
+    """Cria o índice sem bloquear escritas (CONCURRENTLY no PostgreSQL)"""
+    unique = 'UNIQUE ' if index.unique else ''
+    columns = ', '.join(column.name for column in index.columns)
+    if db.engine.dialect.name == 'postgresql':
+        invalid = index.name in invalid_indexes()
+        sql = f'CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {index.name} ON {index.table.name} ({columns})'
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            # IF NOT EXISTS aceitaria o índice INVALID como pronto: descarta e recria
+            if invalid:
+                conn.execute(db.text(f'DROP INDEX CONCURRENTLY IF EXISTS {index.name}'))
+            conn.execute(db.text(sql))
+    else:
+        sql = f'CREATE {unique}INDEX IF NOT EXISTS {index.name} ON {index.table.name} ({columns})'
+        with db.engine.begin() as conn:
+            conn.execute(db.text(sql))
+
+
+def rebuild_invalid_indexes(log=print):
+    """Recria os índices declarados que estão INVALID no PostgreSQL; retorna os nomes"""
+    invalid = invalid_indexes()
+    rebuilt = []
+    for indexes in declared_indexes().values():
+        for index in indexes:
+            if index.name in invalid:
+                log(f'→ Recriando índice inválido {index.name}')
+                create_index_online(index)
+                rebuilt.append(index.name)
+    return rebuilt
+
+
+def malformed_cpf_rows(table_name, limit=20):
+    """Ids de linhas ainda sem cpf_number cujo CPF em texto (coluna cpf legada) foge da
+    máscara 000.000.000-00"""
+    if db.engine.dialect.name == 'postgresql':
+        condition = "cpf IS NULL OR cpf !~ '^[0-9]{3}[.][0-9]{3}[.][0-9]{3}-[0-9]{2}$'"
+    else:
+        condition = "cpf IS NULL OR cpf NOT GLOB '[0-9][0-9][0-9].[0-9][0-9][0-9].[0-9][0-9][0-9]-[0-9][0-9]'"
+    if has_column(table_name, 'cpf_number'):
+        condition = f'cpf_number IS NULL AND ({condition})'
+    with db.engine.connect() as conn:
+        return list(conn.execute(db.text(
+            f'SELECT id FROM {table_name} WHERE {condition} ORDER BY id LIMIT {int(limit)}'
+        )).scalars())
+
+
+# ===== MIGRAÇÕES =====
+
+@migration(1, 'Colunas normalizadas da busca de pacientes')
+def _patient_search_columns():
+    added = add_missing_columns('patients', {
+        'name_normalized': 'VARCHAR(150)',
+        'phone_digits': 'VARCHAR(15)',
+    })
+    # Banco com o CPF ainda em texto: a migração 7 converte e recalcula as colunas
+    if added and has_column('patients', 'cpf_number'):
+        from utils.search import reindex_patients
+        reindex_patients()
+
+
+@migration(2, 'Índices declarados em models.py')
+def _declared_indexes():
+    inspector = db.inspect(db.engine)
+    invalid = invalid_indexes()
+    for table_name, indexes in declared_indexes().items():
+        existing = {i['name'] for i in inspector.get_indexes(table_name)} - invalid
+        columns = {c['name'] for c in inspector.get_columns(table_name)}
+        for index in indexes:
+            # Índice sobre coluna que uma migração posterior adiciona: criado por ela
+            if index.name not in existing and all(c.name in columns for c in index.columns):
+                create_index_online(index)
+
+
+@migration(3, 'Estruturas de busca (FTS5 no SQLite, trigram/tsvector no PostgreSQL)')
+def _search_structures():
+    from utils.search import setup_patient_search
+    setup_patient_search()
+
+
+@migration(4, 'Agregados do dashboard')
+def _dashboard_rollups():
+    from utils.rollups import rebuild_rollups
+    rebuild_rollups()
+
+
+@migration(5, 'Coluna servicos.updated_at e índices de updated_at (respostas condicionais)')
+def _updated_at_watermarks():
+    if add_missing_columns('servicos', {'updated_at': 'TIMESTAMP'}):
+        with db.engine.begin() as conn:
+            conn.execute(db.text('UPDATE servicos SET updated_at = created_at WHERE updated_at IS NULL'))
+    _declared_indexes()
+
+
+@migration(6, 'Coluna users.auth_version (cache da identidade autenticada)')
+def _user_auth_version():
+    add_missing_columns('users', {'auth_version': 'INTEGER NOT NULL DEFAULT 1'})
+
+
+@migration(7, 'CPF como inteiro (cpf_number) com índice único em pacientes e profissionais')
+def _cpf_number():
+    postgresql = db.engine.dialect.name == 'postgresql'
+    legacy_patients = has_column('patients', 'cpf')
+    # Tabelas criadas já com cpf_number ficam de fora
+    legacy_tables = [t for t in (Patient.__table__, Professional.__table__) if has_column(t.name, 'cpf')]
+
+    # A conversão assume a máscara 000.000.000-00 (format_cpf das rotas): qualquer outro
+    # texto interrompe a migração antes de alterar as tabelas, com os ids para corrigir
+    malformed = {t.name: malformed_cpf_rows(t.name) for t in legacy_tables}
+    malformed = {name: ids for name, ids in malformed.items() if ids}
+    if malformed:
+        details = '; '.join(f'{name}: ids {", ".join(map(str, ids))}' for name, ids in malformed.items())
+        raise MigrationError(f'CPF fora do formato 000.000.000-00 ou vazio ({details})')
+
+    for table in legacy_tables:
+        add_missing_columns(table.name, {'cpf_number': 'BIGINT'})
+        with db.engine.begin() as conn:
+            conn.execute(db.text(
+                f"UPDATE {table.name} SET cpf_number = CAST(REPLACE(REPLACE(cpf, '.', ''), '-', '') AS BIGINT) "
+                f"WHERE cpf_number IS NULL"
+            ))
+            if postgresql:
+                # A coluna cpf em texto fica (sem NOT NULL, as linhas novas não a preenchem)
+                # até uma migração posterior, depois de conferido o cpf_number em produção
+                conn.execute(db.text(f'ALTER TABLE {table.name} ALTER COLUMN cpf_number SET NOT NULL'))
+                conn.execute(db.text(f'ALTER TABLE {table.name} ALTER COLUMN cpf DROP NOT NULL'))
+        if not postgresql:
+            rebuild_sqlite_table(table)
+
+    if postgresql:
+        # O prefixo de CPF agora é uma faixa no índice único; o índice de texto sobra
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(db.text('DROP INDEX CONCURRENTLY IF EXISTS ix_patients_cpf_digits'))
+    _declared_indexes()
+    if legacy_patients:
+        from utils.search import reindex_patients, setup_patient_search
+        setup_patient_search()  # Gatilhos do FTS5 somem com a tabela recriada no SQLite
+        reindex_patients()
+
+
+@migration(8, 'Coluna patients.phone_suffix e índice da identificação de chamadas')
+def _patient_phone_suffix():
+    if add_missing_columns('patients', {'phone_suffix': 'VARCHAR(8)'}):
+        from utils.search import reindex_patients
+        reindex_patients()
+    _declared_indexes()
+
+
+@migration(9, 'Busca por trecho do telefone no SQLite (FTS5 trigram)')
+def _phone_trigram_search():
+    from utils.search import setup_patient_search
+    setup_patient_search()
+
+
+@migration(10, 'Agregados do dashboard no relógio da clínica (pacientes por created_at convertido)')
+def _clinic_clock_rollups():
+    from utils.rollups import rebuild_rollups
+    rebuild_rollups()
+
+
+@migration(11, 'Remove patients.cpf_digits (o CPF fica só em cpf_number)')
+def _drop_cpf_digits():
+    if db.engine.dialect.name == 'postgresql':
+        # O índice de texto (se ainda existir) cai junto com a coluna
+        with db.engine.begin() as conn:
+            conn.execute(db.text('ALTER TABLE patients DROP COLUMN IF EXISTS cpf_digits'))
+        return
+    if db.engine.dialect.name != 'sqlite':
+        return
+    with db.engine.begin() as conn:
+        fts_columns = {row[1] for row in conn.execute(db.text('PRAGMA table_info(patients_fts)'))}
+        # O FTS5 antigo indexa cpf_digits e os gatilhos o leem: somem e são recriados sem ele
+        # (a migração 7 já recria patients sem a coluna, mas mantém a tabela FTS)
+        if 'cpf_digits' in fts_columns:
+            for trigger in ('patients_fts_ai', 'patients_fts_ad', 'patients_fts_au'):
+                conn.execute(db.text(f'DROP TRIGGER IF EXISTS {trigger}'))
+            conn.execute(db.text('DROP TABLE patients_fts'))
+        conn.execute(db.text('DROP INDEX IF EXISTS ix_patients_cpf_digits'))
+    if has_column('patients', 'cpf_digits'):
+        rebuild_sqlite_table(Patient.__table__)
+        _declared_indexes()
+    from utils.search import setup_patient_search
+    setup_patient_search()
+
+
+# ===== EXECUÇÃO =====
+
+def applied_versions():
+    schema_migrations.create(db.engine, checkfirst=True)
+    with db.engine.connect() as conn:
+        return set(conn.execute(db.select(schema_migrations.c.version)).scalars())
+
+
+def pending_migrations():
+    applied = applied_versions()
+    return [m for m in MIGRATIONS if m[0] not in applied]
+
+
+def upgrade(log=print):
+    """Aplica as migrações pendentes em ordem; retorna as versões aplicadas"""
+    applied = []
+    for version, description, function in pending_migrations():
+        log(f'→ Migração {version:04d}: {description}')
+        function()
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(db.insert(schema_migrations).values(
+                    version=version, description=description, applied_at=datetime.utcnow()
+                ))
+        except IntegrityError:
+            # Outro processo aplicou a mesma migração em paralelo (todas são idempotentes)
+            pass
+        applied.append(version)
+    # Índice INVALID (CREATE INDEX CONCURRENTLY interrompido) de migração já registrada
+    rebuild_invalid_indexes(log=log)
+    return applied
+
+
+def init_db(log=print):
+    """Cria as tabelas ausentes e aplica as migrações pendentes (flask init-db)"""
+    db.create_all()
+    return upgrade(log=log)
+
+
+def check_schema():
+    """Compara o esquema declarado com o banco: retorna a lista de problemas encontrados"""
+    from utils.search import missing_search_structures
+
+    inspector = db.inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    invalid = invalid_indexes()
+    problems = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            problems.append(f'tabela ausente: {table.name}')
+            continue
+        columns = {c['name'] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns:
+                problems.append(f'coluna ausente: {table.name}.{column.name}')
+        indexes = {i['name'] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            cols = ', '.join(c.name for c in index.columns)
+            if index.name not in indexes:
+                problems.append(f'índice ausente: {index.name} em {table.name} ({cols})')
+            elif index.name in invalid:
+                problems.append(f'índice inválido (recriado por db upgrade): {index.name} em {table.name} ({cols})')
+
+    for name in missing_search_structures():
+        problems.append(f'estrutura de busca ausente: {name}')
+
+    for version, description, _ in pending_migrations():
+        problems.append(f'migração pendente: {version:04d} {description}')
+
+    return problems
@@ -1,12 +1,28 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from utils.normalize import normalize_name, only_digits
+from utils.cpf import cpf_number, format_cpf
+from utils.phone import phone_suffix
+from utils import passwords
+from utils.db_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# Permissões por papel, pré-calculadas (has_permission é chamado muitas vezes por página)
+ROLE_PERMISSIONS = {
+    'admin': frozenset({'all'}),
+    'professional': frozenset({'view_patients', 'edit_patients', 'view_appointments',
+                               'edit_appointments', 'view_records'}),
+    'receptionist': frozenset({'view_patients', 'edit_patients', 'view_appointments',
+                               'edit_appointments'}),
+}
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_professional_id', 'professional_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -17,32 +33,48 @@ class User(UserMixin, db.Model):
     role = db.Column(db.String(20), default='admin')  # admin, professional, receptionist
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime)
+    # Incrementada quando senha, ativação, papel ou vínculo mudam (ver utils.identity)
+    auth_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
     # Relacionamento SIMPLES - apenas referência ao profissional (sem FK circular)
     professional_id = db.Column(db.Integer, nullable=True)  # SEM FOREIGN KEY para evitar ciclo
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return passwords.check_password(self.password_hash, password)
+    
+    def verify_password_for_login(self, password):
+        """Verifica no pool limitado e atualiza o hash se a política mudou.
+        
+        Lança passwords.PasswordHasherBusy quando o pool está saturado.
+        """
+        if not passwords.verify_password_bounded(self.password_hash, password):
+            return False
+        if passwords.needs_rehash(self.password_hash):
+            # UPDATE direto: não é troca de senha, então não passa pelo evento que
+            # incrementa auth_version (as demais sessões do usuário continuam válidas)
+            new_hash = passwords.hash_password_bounded(password)
+            db.session.execute(
+                db.update(User).where(User.id == self.id).values(password_hash=new_hash)
+            )
+        return True
+    
+    def get_id(self):
+        # Mesmo formato do Principal (utils.identity.identity_token): "id:auth_version"
+        return f'{self.id}:{self.auth_version}'
     
     def has_permission(self, permission):
         """Verifica se o usuário tem uma permissão específica"""
-        role_permissions = {
-            'admin': ['all'],
-            'professional': ['view_patients', 'edit_patients', 'view_appointments', 'edit_appointments', 'view_records'],
-            'receptionist': ['view_patients', 'edit_patients', 'view_appointments', 'edit_appointments']
-        }
-        
-        user_permissions = role_permissions.get(self.role, [])
+        user_permissions = ROLE_PERMISSIONS.get(self.role, frozenset())
         return 'all' in user_permissions or permission in user_permissions
     
     @property
     def professional(self):
         """Busca o profissional associado sem usar FK"""
         if self.professional_id:
-            return Professional.query.get(self.professional_id)
+            return db.session.get(Professional, self.professional_id)
         return None
     
     def __repr__(self):
@@ -51,11 +83,16 @@ class User(UserMixin, db.Model):
 # Tabela de associação para o relacionamento muitos-para-muitos entre Profissionais e Serviços
 professional_services = db.Table('professional_services',
     db.Column('professional_id', db.Integer, db.ForeignKey('professionals.id'), primary_key=True),
-    db.Column('service_id', db.Integer, db.ForeignKey('servicos.id'), primary_key=True)
+    db.Column('service_id', db.Integer, db.ForeignKey('servicos.id'), primary_key=True),
+    db.Index('ix_professional_services_service_id', 'service_id')
 )
 
 class Servico(db.Model):
     __tablename__ = 'servicos'
+    __table_args__ = (
+        db.Index('ix_servicos_name_id', 'name', 'id'),
+        db.Index('ix_servicos_updated_at', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -67,6 +104,7 @@ class Servico(db.Model):
     aftercare_instructions = db.Column(db.Text, nullable=True)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relacionamento com Profissionais
     professionals = db.relationship(
@@ -75,19 +113,14 @@ class Servico(db.Model):
         back_populates='services'
     )
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'category': self.category,
-            'duration_minutes': self.duration_minutes,
-            'price': self.price,
-            'preparation_instructions': self.preparation_instructions,
-            'aftercare_instructions': self.aftercare_instructions,
-            'is_active': self.is_active,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
+    # Campos da API, na ordem de serialização (?fields= escolhe um subconjunto)
+    API_FIELDS = ('id', 'name', 'description', 'category', 'duration_minutes', 'price',
+                  'preparation_instructions', 'aftercare_instructions', 'is_active',
+                  'created_at', 'updated_at')
+
+    def to_dict(self, fields=None):
+        # Datas seguem como objetos: o provider JSON (utils.serialization) as serializa
+        return {field: getattr(self, field) for field in fields or self.API_FIELDS}
 
     def __repr__(self):
         return f'<Servico {self.name}>'
@@ -95,10 +128,17 @@ class Servico(db.Model):
 
 class Professional(db.Model):
     __tablename__ = 'professionals'
+    __table_args__ = (
+        db.Index('ix_professionals_full_name_id', 'full_name', 'id'),
+        db.Index('ix_professionals_email', 'email'),
+        db.Index('ix_professionals_registro_prof', 'registro_prof'),
+        db.Index('ix_professionals_updated_at', 'updated_at'),
+        db.Index('ix_professionals_cpf_number', 'cpf_number', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     full_name = db.Column(db.String(150), nullable=False)
-    cpf = db.Column(db.String(14), unique=True, nullable=False)
+    cpf_number = db.Column(db.BigInteger, nullable=False)  # CPF como inteiro (ver utils.cpf)
     registro_prof = db.Column(db.String(20), nullable=True)  # Corrigido: agora é opcional
     phone = db.Column(db.String(15), nullable=False)
     email = db.Column(db.String(120), nullable=True)  # Corrigido: agora é opcional
@@ -132,30 +172,95 @@ class Professional(db.Model):
     def __repr__(self):
         return f'<Professional {self.full_name}>'
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'full_name': self.full_name,
-            'cpf': self.cpf,
-            'registro_prof': self.registro_prof,
-            'phone': self.phone,
-            'email': self.email,
-            'birth_date': self.birth_date.strftime('%Y-%m-%d') if self.birth_date else None,
-            'photo': self.photo,
-            'bio': self.bio,
-            'is_active': self.is_active,
-            'has_user_account': self.has_user_account,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None,
-            'services': [service.to_dict() for service in self.services]
-        }
+    @property
+    def cpf(self):
+        """CPF com máscara, montado a partir de cpf_number"""
+        return format_cpf(self.cpf_number)
+    
+    @cpf.setter
+    def cpf(self, value):
+        self.cpf_number = cpf_number(value)
+    
+    # Campos da API; has_user_account e services são calculados fora da tabela
+    API_FIELDS = ('id', 'full_name', 'cpf', 'registro_prof', 'phone', 'email', 'birth_date',
+                  'photo', 'bio', 'is_active', 'has_user_account', 'created_at', 'updated_at',
+                  'services')
+    # Campo da API -> coluna que o sustenta (load_only de ?fields=)
+    FIELD_COLUMNS = {'cpf': 'cpf_number'}
+    
+    def _base_dict(self, fields, has_user_account=None):
+        data = {}
+        for field in fields:
+            if field == 'has_user_account':
+                data[field] = has_user_account
+            elif field != 'services':
+                data[field] = getattr(self, field)
+        return data
+    
+    def to_dict(self, fields=None):
+        fields = fields or self.API_FIELDS
+        data = self._base_dict(fields, self.has_user_account if 'has_user_account' in fields else None)
+        if 'services' in fields:
+            # Serviços completos vêm do snapshot do catálogo: aqui só os ids são consultados
+            from utils.catalog import services_by_ids
+            service_ids = db.session.execute(
+                db.select(professional_services.c.service_id)
+                .where(professional_services.c.professional_id == self.id)
+            ).scalars().all()
+            data['services'] = services_by_ids(service_ids)
+        return data
+    
+    @classmethod
+    def to_list_dicts(cls, professionals, fields=None):
+        """Serializa uma lista de profissionais em número fixo de consultas.
+        
+        Serviços (apenas id e nome) e a existência de conta de usuário são
+        carregados em lote para todos os profissionais, evitando o N+1 de to_dict(),
+        e só quando pedidos em `fields`.
+        """
+        fields = fields or cls.API_FIELDS
+        ids = [p.id for p in professionals]
+        if not ids:
+            return []
+        
+        services_by_professional = {pid: [] for pid in ids}
+        service_rows = [] if 'services' not in fields else db.session.execute(
+            db.select(professional_services.c.professional_id, Servico.id, Servico.name)
+            .join(Servico, Servico.id == professional_services.c.service_id)
+            .where(professional_services.c.professional_id.in_(ids))
+            .order_by(Servico.name)
+        ).all()
+        for professional_id, service_id, service_name in service_rows:
+            services_by_professional[professional_id].append({'id': service_id, 'name': service_name})
+        
+        with_account = set() if 'has_user_account' not in fields else set(db.session.execute(
+            db.select(User.professional_id).where(User.professional_id.in_(ids)).distinct()
+        ).scalars())
+        
+        result = []
+        for professional in professionals:
+            data = professional._base_dict(fields, professional.id in with_account)
+            if 'services' in fields:
+                data['services'] = services_by_professional[professional.id]
+            result.append(data)
+        return result
 
 class Patient(db.Model):
     __tablename__ = 'patients'
+    __table_args__ = (
+        # Listagem padrão (mais recentes primeiro) e paginação por cursor
+        db.Index('ix_patients_created_at_id', 'created_at', 'id'),
+        # Marca d'água (max updated_at) das respostas condicionais da listagem
+        db.Index('ix_patients_updated_at', 'updated_at'),
+        # Unicidade e busca por prefixo de CPF (faixa de inteiros)
+        db.Index('ix_patients_cpf_number', 'cpf_number', unique=True),
+        # Identificação de chamadas: igualdade nos 8 últimos dígitos do telefone
+        db.Index('ix_patients_phone_suffix', 'phone_suffix'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     full_name = db.Column(db.String(150), nullable=False)
-    cpf = db.Column(db.String(14), unique=True, nullable=False)
+    cpf_number = db.Column(db.BigInteger, nullable=False)  # CPF como inteiro (ver utils.cpf)
     birth_date = db.Column(db.Date, nullable=True)  # Corrigido: agora é opcional
     phone = db.Column(db.String(15), nullable=False)
     musical_preference = db.Column(db.String(100))
@@ -164,33 +269,60 @@ class Patient(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     
+    # Colunas de busca (mantidas automaticamente, ver refresh_search_fields)
+    name_normalized = db.Column(db.String(150))
+    phone_digits = db.Column(db.String(15))
+    phone_suffix = db.Column(db.String(8))
+    
     # Relacionamento com o usuário que criou
     creator = db.relationship('User', backref='patients_created')
     
     def __repr__(self):
         return f'<Patient {self.full_name}>'
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'full_name': self.full_name,
-            'cpf': self.cpf,
-            'birth_date': self.birth_date.strftime('%Y-%m-%d') if self.birth_date else None,
-            'phone': self.phone,
-            'musical_preference': self.musical_preference,
-            'observations': self.observations,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None
-        }
+    @property
+    def cpf(self):
+        """CPF com máscara, montado a partir de cpf_number"""
+        return format_cpf(self.cpf_number)
+    
+    @cpf.setter
+    def cpf(self, value):
+        self.cpf_number = cpf_number(value)
+    
+    def refresh_search_fields(self):
+        """Atualiza as colunas normalizadas usadas pela busca"""
+        self.name_normalized = normalize_name(self.full_name)
+        self.phone_digits = only_digits(self.phone)
+        self.phone_suffix = phone_suffix(self.phone_digits)
+    
+    # Campos da API, na ordem de serialização (?fields= escolhe um subconjunto)
+    API_FIELDS = ('id', 'full_name', 'cpf', 'birth_date', 'phone', 'musical_preference',
+                  'observations', 'created_at', 'updated_at')
+    FIELD_COLUMNS = {'cpf': 'cpf_number'}
+    
+    def to_dict(self, fields=None):
+        return {field: getattr(self, field) for field in fields or self.API_FIELDS}
+
+@db.event.listens_for(Patient, 'before_insert')
+@db.event.listens_for(Patient, 'before_update')
+def _patient_search_fields(mapper, connection, target):
+    target.refresh_search_fields()
 
 # Tabela de associação para Atendimentos e Serviços
 atendimento_servicos = db.Table('atendimento_servicos',
     db.Column('atendimento_id', db.Integer, db.ForeignKey('atendimentos.id'), primary_key=True),
-    db.Column('servico_id', db.Integer, db.ForeignKey('servicos.id'), primary_key=True)
+    db.Column('servico_id', db.Integer, db.ForeignKey('servicos.id'), primary_key=True),
+    db.Index('ix_atendimento_servicos_servico_id', 'servico_id')
 )
 
 class Atendimento(db.Model):
     __tablename__ = 'atendimentos'
+    __table_args__ = (
+        # Histórico do paciente: filtro por paciente ordenado por data
+        db.Index('ix_atendimentos_patient_data', 'patient_id', 'data_atendimento'),
+        db.Index('ix_atendimentos_professional_data', 'professional_id', 'data_atendimento'),
+        db.Index('ix_atendimentos_data', 'data_atendimento'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
@@ -214,8 +346,112 @@ class Atendimento(db.Model):
             'patient_name': self.patient.full_name if self.patient else None,
             'professional_id': self.professional_id,
             'professional_name': self.professional.full_name if self.professional else None,
-            'data_atendimento': self.data_atendimento.strftime('%Y-%m-%d %H:%M:%S'),
+            'data_atendimento': self.data_atendimento,
             'anotacoes': self.anotacoes,
             'valor_cobrado': self.valor_cobrado,
             'servicos': [servico.to_dict() for servico in self.servicos]
-        }
\ No newline at end of file
+        }
+    
+    def to_history_dict(self):
+        """Versão compacta para o histórico: serviços apenas com id, nome e preço"""
+        return {
+            'id': self.id,
+            'patient_id': self.patient_id,
+            'patient_name': self.patient.full_name if self.patient else None,
+            'professional_id': self.professional_id,
+            'professional_name': self.professional.full_name if self.professional else None,
+            'data_atendimento': self.data_atendimento,
+            'anotacoes': self.anotacoes,
+            'valor_cobrado': self.valor_cobrado,
+            'servicos': [
+                {'id': servico.id, 'name': servico.name, 'price': servico.price}
+                for servico in self.servicos
+            ]
+        }
+
+class WorkingHours(db.Model):
+    """Expediente semanal de um profissional: um ou mais intervalos por dia da semana"""
+    __tablename__ = 'working_hours'
+    __table_args__ = (
+        db.Index('ix_working_hours_professional_weekday', 'professional_id', 'weekday'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    professional_id = db.Column(db.Integer, db.ForeignKey('professionals.id'), nullable=False)
+    weekday = db.Column(db.Integer, nullable=False)  # 0 = segunda ... 6 = domingo
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'professional_id': self.professional_id,
+            'weekday': self.weekday,
+            'start_time': self.start_time,
+            'end_time': self.end_time
+        }
+
+class Appointment(db.Model):
+    """Agendamento de um serviço: ocupa o profissional de start_at até end_at"""
+    __tablename__ = 'appointments'
+    __table_args__ = (
+        # Agenda do profissional e busca de horários livres (faixa de start_at por profissional)
+        db.Index('ix_appointments_professional_start', 'professional_id', 'start_at'),
+        db.Index('ix_appointments_patient_start', 'patient_id', 'start_at'),
+    )
+    
+    STATUSES = ('scheduled', 'completed', 'cancelled')
+    
+    id = db.Column(db.Integer, primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
+    professional_id = db.Column(db.Integer, db.ForeignKey('professionals.id'), nullable=False)
+    service_id = db.Column(db.Integer, db.ForeignKey('servicos.id'), nullable=False)
+    start_at = db.Column(db.DateTime, nullable=False)
+    end_at = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='scheduled')
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'patient_id': self.patient_id,
+            'professional_id': self.professional_id,
+            'service_id': self.service_id,
+            'start_at': self.start_at,
+            'end_at': self.end_at,
+            'status': self.status,
+            'notes': self.notes,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+
+class StatRollup(db.Model):
+    """Agregados do dashboard por período, mantidos incrementalmente (ver utils.rollups)"""
+    __tablename__ = 'stat_rollups'
+    
+    period = db.Column(db.String(20), primary_key=True)  # 'total', 'month:2024-05', 'day:2024-05-17'
+    patients = db.Column(db.Integer, nullable=False, default=0)
+    atendimentos = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+class ServiceRollup(db.Model):
+    """Quantidade de atendimentos por serviço e período, para o ranking do dashboard"""
+    __tablename__ = 'service_rollups'
+    __table_args__ = (
+        db.Index('ix_service_rollups_period_atendimentos', 'period', 'atendimentos'),
+    )
+    
+    period = db.Column(db.String(20), primary_key=True)
+    service_id = db.Column(db.Integer, primary_key=True)  # Sem FK: o histórico sobrevive à exclusão do serviço
+    atendimentos = db.Column(db.Integer, nullable=False, default=0)
+
+class CacheVersion(db.Model):
+    """Versão de dados cacheados em memória pelos workers (ver utils.catalog)"""
+    __tablename__ = 'cache_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
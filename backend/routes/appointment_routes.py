@@ -0,0 +1,200 @@
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from models import db, Appointment, WorkingHours, Patient, Professional, Servico
+from utils.scheduling import SchedulingError, ConflictError, first_free_slot, validate_booking
+from utils.security import rate_limit
+from utils.query_budget import query_budget
+from datetime import datetime, timedelta, time
+
+appointments_bp = Blueprint('appointments', __name__)
+
+
+def _parse_datetime(value, field):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise SchedulingError(f'Campo {field} inválido (use YYYY-MM-DDTHH:MM)')
+
+
+# ===== EXPEDIENTE =====
+
+@appointments_bp.route('/api/working-hours/<int:professional_id>')
+@login_required
+def api_get_working_hours(professional_id):
+    hours = WorkingHours.query.filter_by(professional_id=professional_id).order_by(
+        WorkingHours.weekday, WorkingHours.start_time
+    )
+    return jsonify({'working_hours': [h.to_dict() for h in hours]})
+
+@appointments_bp.route('/api/working-hours/<int:professional_id>', methods=['PUT'])
+@login_required
+def api_set_working_hours(professional_id):
+    """Substitui o expediente: [{"weekday": 0, "start_time": "08:00", "end_time": "12:00"}, ...]"""
+    if not current_user.has_permission('all'):
+        return jsonify({'error': 'Acesso negado'}), 403
+
+    try:
+        Professional.query.get_or_404(professional_id)
+        data = request.get_json()
+        if not isinstance(data, dict) or not isinstance(data.get('working_hours'), list):
+            return jsonify({'error': 'Envie working_hours como lista'}), 400
+
+        intervals = []
+        for item in data['working_hours']:
+            try:
+                weekday = int(item['weekday'])
+                start_time = time.fromisoformat(item['start_time'])
+                end_time = time.fromisoformat(item['end_time'])
+            except (KeyError, TypeError, ValueError):
+                return jsonify({'error': 'Intervalo inválido (weekday 0-6, horários HH:MM)'}), 400
+            if not 0 <= weekday <= 6 or start_time >= end_time:
+                return jsonify({'error': 'Intervalo inválido (weekday 0-6, horários HH:MM)'}), 400
+            intervals.append((weekday, start_time, end_time))
+
+        intervals.sort()
+        for (day_a, _, end_a), (day_b, start_b, _) in zip(intervals, intervals[1:]):
+            if day_a == day_b and start_b < end_a:
+                return jsonify({'error': 'Intervalos do mesmo dia não podem se sobrepor'}), 400
+
+        WorkingHours.query.filter_by(professional_id=professional_id).delete()
+        if intervals:
+            # Um único INSERT com todos os intervalos (os ids não são usados)
+            db.session.execute(db.insert(WorkingHours), [
+                {'professional_id': professional_id, 'weekday': weekday, 'start_time': start, 'end_time': end}
+                for weekday, start, end in intervals
+            ])
+        db.session.commit()
+        return jsonify({'message': 'Expediente atualizado com sucesso', 'intervals': len(intervals)})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro ao atualizar expediente: {str(e)}'}), 500
+
+
+# ===== AGENDAMENTOS =====
+
+@appointments_bp.route('/api/list')
+@login_required
+@query_budget(3)
+def api_list_appointments():
+    """Agenda por período (?start=, ?end=, padrão: próximos 7 dias) e ?professional_id= / ?patient_id="""
+    try:
+        start = _parse_datetime(request.args['start'], 'start') if request.args.get('start') else \
+            datetime.combine(datetime.now().date(), time.min)
+        end = _parse_datetime(request.args['end'], 'end') if request.args.get('end') else start + timedelta(days=7)
+        if end - start > timedelta(days=92):
+            return jsonify({'error': 'Período máximo de 92 dias'}), 400
+
+        query = Appointment.query.filter(Appointment.start_at >= start, Appointment.start_at < end)
+        if request.args.get('professional_id', type=int):
+            query = query.filter(Appointment.professional_id == request.args.get('professional_id', type=int))
+        if request.args.get('patient_id', type=int):
+            query = query.filter(Appointment.patient_id == request.args.get('patient_id', type=int))
+        if request.args.get('include_cancelled') != '1':
+            query = query.filter(Appointment.status != 'cancelled')
+
+        return jsonify({'appointments': [a.to_dict() for a in query.order_by(Appointment.start_at, Appointment.id)]})
+    except SchedulingError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Erro ao carregar agenda: {str(e)}'}), 500
+
+@appointments_bp.route('/api/create', methods=['POST'])
+@login_required
+def api_create_appointment():
+    if not current_user.has_permission('edit_appointments'):
+        return jsonify({'error': 'Acesso negado'}), 403
+
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'Dados não recebidos'}), 400
+
+    for field in ['patient_id', 'professional_id', 'service_id', 'start_at']:
+        if not data.get(field):
+            return jsonify({'error': f'Campo {field} é obrigatório'}), 400
+
+    try:
+        patient = db.session.get(Patient, data['patient_id'])
+        service = db.session.get(Servico, data['service_id'])
+        if not patient or not service:
+            return jsonify({'error': 'Paciente ou serviço não encontrado'}), 404
+
+        start_at = _parse_datetime(data['start_at'], 'start_at')
+        if start_at < datetime.now():
+            return jsonify({'error': 'Não é possível agendar no passado'}), 400
+        end_at = validate_booking(int(data['professional_id']), service, patient.id, start_at)
+
+        appointment = Appointment(
+            patient_id=patient.id,
+            professional_id=int(data['professional_id']),
+            service_id=service.id,
+            start_at=start_at,
+            end_at=end_at,
+            notes=data.get('notes', ''),
+            created_by=current_user.id
+        )
+        db.session.add(appointment)
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Agendamento criado com sucesso',
+            'appointment': appointment.to_dict()
+        }), 201
+    except ConflictError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 409
+    except SchedulingError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro ao criar agendamento: {str(e)}'}), 500
+
+@appointments_bp.route('/api/<int:appointment_id>/cancel', methods=['POST'])
+@login_required
+def api_cancel_appointment(appointment_id):
+    if not current_user.has_permission('edit_appointments'):
+        return jsonify({'error': 'Acesso negado'}), 403
+
+    try:
+        appointment = db.session.get(Appointment, appointment_id)
+        if appointment is None:
+            return jsonify({'error': 'Agendamento não encontrado'}), 404
+        appointment.status = 'cancelled'
+        db.session.commit()
+        return jsonify({'message': 'Agendamento cancelado', 'appointment': appointment.to_dict()})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro ao cancelar agendamento: {str(e)}'}), 500
+
+@appointments_bp.route('/api/first-free-slot')
+@login_required
+@query_budget(8)
+@rate_limit(max_requests=120, window=60)
+def api_first_free_slot():
+    """Primeiro horário livre: ?service_id= (obrigatório), ?professional_id=, ?start=, ?days= (padrão 30)"""
+    try:
+        service = db.session.get(Servico, request.args.get('service_id', type=int) or 0)
+        if service is None:
+            return jsonify({'error': 'Serviço não encontrado'}), 404
+
+        start = _parse_datetime(request.args['start'], 'start') if request.args.get('start') else None
+        days = max(min(request.args.get('days', 30, type=int), 90), 1)
+        professional_id = request.args.get('professional_id', type=int)
+
+        slot = first_free_slot(service, start, days, [professional_id] if professional_id else None)
+        if slot is None:
+            return jsonify({'slot': None, 'message': f'Nenhum horário livre nos próximos {days} dias'})
+
+        professional_id, start_at, end_at = slot
+        professional = db.session.get(Professional, professional_id)
+        return jsonify({'slot': {
+            'professional_id': professional_id,
+            'professional_name': professional.full_name,
+            'service_id': service.id,
+            'start_at': start_at,
+            'end_at': end_at
+        }})
+    except SchedulingError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Erro ao buscar horário livre: {str(e)}'}), 500
@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify, render_template, abort
 from flask_login import login_required, current_user
 from models import db, Atendimento, Patient, Professional, Servico
+from utils.pagination import keyset_page, InvalidCursor
+from utils.security import rate_limit
+from utils.query_budget import query_budget
 from datetime import datetime
 
 atendimento_bp = Blueprint('atendimento', __name__)
@@ -71,17 +74,55 @@ def api_create_atendimento():
 
 @atendimento_bp.route('/api/patient/<int:patient_id>')
 @login_required
+@query_budget(4)
 def api_get_atendimentos_by_patient(patient_id):
     # Adicionar verificação de permissão se necessário
     # Ex: Apenas o profissional vinculado ou admin pode ver
 
     try:
-        atendimentos = Atendimento.query.filter_by(patient_id=patient_id).order_by(Atendimento.data_atendimento.desc()).all()
-
-        if not atendimentos:
-            return jsonify([])
-
-        return jsonify([atendimento.to_dict() for atendimento in atendimentos])
+        per_page = max(min(request.args.get('per_page', 20, type=int), 100), 1)
+        
+        query = Atendimento.query.filter_by(patient_id=patient_id).options(
+            db.joinedload(Atendimento.patient).load_only(Patient.id, Patient.full_name),
+            db.joinedload(Atendimento.professional).load_only(Professional.id, Professional.full_name),
+            db.selectinload(Atendimento.servicos).load_only(Servico.id, Servico.name, Servico.price)
+        )
+        
+        result = keyset_page(
+            query,
+            keyset=[(Atendimento.data_atendimento, 'desc'), (Atendimento.id, 'desc')],
+            after=request.args.get('after'),
+            per_page=per_page
+        )
+        
+        return jsonify({
+            'atendimentos': [a.to_history_dict() for a in result.pop('items')],
+            **result
+        })
 
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erro ao buscar atendimentos: {str(e)}'}), 500
+
+@atendimento_bp.route('/api/export')
+@login_required
+@rate_limit(max_requests=10, window=60)
+def api_export_atendimentos():
+    """Exportação de atendimentos com serviços (?format=, ?start=, ?end=, ?professional_id=)"""
+    if not current_user.has_permission('all'):
+        return jsonify({'error': 'Acesso negado'}), 403
+
+    from utils.export import ATENDIMENTO_FIELDS, parse_date_range, atendimento_rows, export_response
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Formato inválido (use csv ou ndjson)'}), 400
+
+    try:
+        start, end = parse_date_range(request.args.get('start'), request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': 'Data inválida (use YYYY-MM-DD)'}), 400
+
+    rows = atendimento_rows(start, end, request.args.get('professional_id', type=int))
+    return export_response(rows, ATENDIMENTO_FIELDS, fmt, 'atendimentos')
@@ -1,9 +1,11 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, make_response
 from flask_login import login_user, logout_user, login_required, current_user
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SubmitField
 from wtforms.validators import DataRequired, Email, Length
 from models import db, User
+from utils.passwords import PasswordHasherBusy
+from utils.security import rate_limit
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
@@ -14,6 +16,7 @@ class LoginForm(FlaskForm):
     submit = SubmitField('Entrar')
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
+@rate_limit(max_requests=20, window=60, per='ip')
 def login():
     if current_user.is_authenticated:
         return redirect(url_for('dashboard'))
@@ -22,7 +25,15 @@ def login():
     if form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data).first()
         
-        if user and user.check_password(form.password.data):
+        try:
+            valid = user is not None and user.verify_password_for_login(form.password.data)
+        except PasswordHasherBusy:
+            flash('Muitos acessos simultâneos. Tente novamente em alguns segundos.', 'error')
+            response = make_response(render_template('login.html', form=form), 503)
+            response.headers['Retry-After'] = '5'
+            return response
+        
+        if valid:
             if not user.is_active:
                 flash('Sua conta está desativada. Entre em contato com o administrador.', 'error')
                 return redirect(url_for('auth.login'))
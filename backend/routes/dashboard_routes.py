@@ -0,0 +1,74 @@
+from flask import Blueprint, jsonify
+from flask_login import login_required
+from models import db, Patient, Servico, StatRollup, ServiceRollup
+from utils.rollups import period_keys, clinic_now
+from utils.cpf import format_cpf
+from utils.query_budget import query_budget
+
+dashboard_bp = Blueprint('dashboard_api', __name__)
+
+@dashboard_bp.route('/summary')
+@login_required
+@query_budget(5)
+def api_summary():
+    """Resumo do dashboard lido dos agregados (custo constante, independe do histórico)"""
+    try:
+        total_key, month_key, day_key = period_keys(clinic_now())
+        
+        rollups = {
+            r.period: r for r in StatRollup.query.filter(
+                StatRollup.period.in_([total_key, month_key, day_key])
+            )
+        }
+        empty = StatRollup(patients=0, atendimentos=0, revenue=0)
+        total = rollups.get(total_key, empty)
+        month = rollups.get(month_key, empty)
+        day = rollups.get(day_key, empty)
+        
+        top_services = db.session.execute(
+            db.select(ServiceRollup.service_id, Servico.name, ServiceRollup.atendimentos)
+            .join(Servico, Servico.id == ServiceRollup.service_id)
+            .where(ServiceRollup.period == month_key, ServiceRollup.atendimentos > 0)
+            .order_by(ServiceRollup.atendimentos.desc())
+            .limit(5)
+        ).all()
+        
+        recent_patients = db.session.execute(
+            db.select(Patient.id, Patient.full_name, Patient.cpf_number, Patient.phone, Patient.created_at)
+            .order_by(Patient.created_at.desc(), Patient.id.desc())
+            .limit(5)
+        ).all()
+        
+        return jsonify({
+            'patients': {
+                'total': total.patients,
+                'new_this_month': month.patients,
+                'new_today': day.patients
+            },
+            'atendimentos': {
+                'total': total.atendimentos,
+                'this_month': month.atendimentos,
+                'today': day.atendimentos
+            },
+            'revenue': {
+                'total': round(total.revenue, 2),
+                'this_month': round(month.revenue, 2),
+                'today': round(day.revenue, 2)
+            },
+            'top_services': [
+                {'id': service_id, 'name': name, 'atendimentos': count}
+                for service_id, name, count in top_services
+            ],
+            'recent_patients': [
+                {
+                    'id': p.id,
+                    'full_name': p.full_name,
+                    'cpf': format_cpf(p.cpf_number),
+                    'phone': p.phone,
+                    'created_at': p.created_at
+                }
+                for p in recent_patients
+            ]
+        })
+    except Exception as e:
+        return jsonify({'error': f'Erro ao carregar resumo: {str(e)}'}), 500
@@ -3,9 +3,17 @@ from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
 from wtforms import StringField, DateField, TextAreaField, SubmitField
 from wtforms.validators import DataRequired, Length, Regexp
-from models import db, Patient
+from models import db, Patient, Atendimento
+from utils.pagination import paginate_list, InvalidCursor
+from utils.db_routing import use_replica
+from utils.security import rate_limit
+from utils.cpf import parse_cpf, format_cpf
+from utils.phone import format_phone, national_digits, phone_suffix
+from utils.query_budget import query_budget
+from utils.serialization import requested_fields, load_only_options, InvalidFields
+from utils.conditional import conditional_entity, conditional_list
+from utils.search import apply_patient_search
 from datetime import datetime
-import re
 
 patient_bp = Blueprint('patients', __name__)
 
@@ -24,46 +32,6 @@ class PatientForm(FlaskForm):
     observations = TextAreaField('Observações')
     submit = SubmitField('Salvar')
 
-def validate_cpf(cpf):
-    """Valida CPF brasileiro"""
-    # Remove caracteres não numéricos
-    cpf = re.sub(r'[^0-9]', '', cpf)
-    
-    # Verifica se tem 11 dígitos
-    if len(cpf) != 11:
-        return False
-    
-    # Verifica se todos os dígitos são iguais
-    if cpf == cpf[0] * 11:
-        return False
-    
-    # Calcula o primeiro dígito verificador
-    sum_1 = sum(int(cpf[i]) * (10 - i) for i in range(9))
-    digit_1 = (sum_1 * 10 % 11) % 10
-    
-    # Calcula o segundo dígito verificador
-    sum_2 = sum(int(cpf[i]) * (11 - i) for i in range(10))
-    digit_2 = (sum_2 * 10 % 11) % 10
-    
-    # Verifica se os dígitos verificadores estão corretos
-    return cpf[-2:] == f'{digit_1}{digit_2}'
-
-def format_cpf(cpf):
-    """Formata CPF para o padrão 000.000.000-00"""
-    cpf = re.sub(r'[^0-9]', '', cpf)
-    if len(cpf) == 11:
-        return f'{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}'
-    return cpf
-
-def format_phone(phone):
-    """Formata telefone para o padrão (00) 00000-0000"""
-    phone = re.sub(r'[^0-9]', '', phone)
-    if len(phone) == 11:
-        return f'({phone[:2]}) {phone[2:7]}-{phone[7:]}'
-    elif len(phone) == 10:
-        return f'({phone[:2]}) {phone[2:6]}-{phone[6:]}'
-    return phone
-
 @patient_bp.route('/')
 @login_required
 def list_patients():
@@ -71,38 +39,91 @@ def list_patients():
 
 @patient_bp.route('/api/list')
 @login_required
+@query_budget(6)
+@rate_limit(max_requests=120, window=60)
+@use_replica
+@conditional_list(Patient)
 def api_list_patients():
     try:
         search = request.args.get('search', '').strip()
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 10, type=int), 100)  # Máximo 100 por página
+        fields = requested_fields(Patient.API_FIELDS)
+        keyset = [(Patient.created_at, 'desc'), (Patient.id, 'desc')]
         
-        query = Patient.query
+        # Só as colunas dos campos pedidos são lidas do banco
+        query = Patient.query.options(*load_only_options(Patient, fields, keyset))
+        ranking = None
         
         if search:
-            search_filter = f'%{search}%'
-            query = query.filter(
-                db.or_(
-                    Patient.full_name.ilike(search_filter),
-                    Patient.cpf.like(search_filter),
-                    Patient.phone.like(search_filter)
-                )
-            )
-        
-        pagination = query.order_by(Patient.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+            # Busca indexada (FTS5/trigram) sobre nome normalizado e CPF/telefone só com dígitos
+            query, ranking = apply_patient_search(query, search)
+        
+        result = paginate_list(
+            query,
+            keyset=keyset,
+            count_key=f'patients:{search}',
+            filtered=bool(search),
+            ranking=ranking
         )
         
         return jsonify({
-            'patients': [p.to_dict() for p in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page,
-            'per_page': per_page
+            'patients': [p.to_dict(fields) for p in result.pop('items')],
+            **result
         })
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erro ao carregar pacientes: {str(e)}'}), 500
 
+PHONE_MATCH_LIMIT = 10
+
+@patient_bp.route('/api/by-phone/<digits>')
+@login_required
+@query_budget(3)
+@rate_limit(max_requests=120, window=60)
+@use_replica
+def api_patients_by_phone(digits):
+    """Identificação de chamadas: pacientes cujo telefone termina nos mesmos 8 dígitos.
+
+    Aceita o número com ou sem máscara, DDD, nono dígito ou +55. Uma consulta
+    pelo índice de phone_suffix; o número completo e os 9 últimos dígitos só
+    ordenam os candidatos (mesmo número primeiro).
+    """
+    try:
+        digits = national_digits(digits)
+        suffix = phone_suffix(digits)
+        if not suffix:
+            return jsonify({'error': 'Telefone inválido'}), 400
+        
+        last_atendimento = (
+            db.select(db.func.max(Atendimento.data_atendimento))
+            .where(Atendimento.patient_id == Patient.id)
+            .scalar_subquery()
+        )
+        exact = Patient.phone_digits == digits
+        rows = db.session.execute(
+            db.select(Patient.id, Patient.full_name, Patient.cpf_number, Patient.phone,
+                      Patient.birth_date, last_atendimento.label('last_atendimento'), exact.label('exact'))
+            .where(Patient.phone_suffix == suffix)
+            .order_by(db.case((exact, 0), (Patient.phone_digits.endswith(digits[-9:]), 1), else_=2),
+                      Patient.full_name)
+            .limit(PHONE_MATCH_LIMIT)
+        ).all()
+        
+        return jsonify({
+            'phone': digits,
+            'patients': [{
+                'id': row.id,
+                'full_name': row.full_name,
+                'cpf': format_cpf(row.cpf_number),
+                'phone': row.phone,
+                'birth_date': row.birth_date,
+                'last_atendimento': row.last_atendimento,
+                'exact_match': bool(row.exact)
+            } for row in rows]
+        })
+    except Exception as e:
+        return jsonify({'error': f'Erro ao buscar paciente: {str(e)}'}), 500
+
 @patient_bp.route('/api/create', methods=['POST'])
 @login_required
 def api_create_patient():
@@ -118,13 +139,14 @@ def api_create_patient():
             if not data.get(field):
                 return jsonify({'error': f'Campo {field} é obrigatório'}), 400
         
-        # Formatar e validar CPF
-        cpf_formatted = format_cpf(data['cpf'])
-        if not validate_cpf(cpf_formatted):
+        # Validar CPF (guardado como inteiro de 11 dígitos)
+        try:
+            cpf = parse_cpf(data['cpf'])
+        except ValueError:
             return jsonify({'error': 'CPF inválido'}), 400
         
         # Verificar CPF único
-        if Patient.query.filter_by(cpf=cpf_formatted).first():
+        if db.session.execute(db.select(Patient.id).where(Patient.cpf_number == cpf)).first():
             return jsonify({'error': 'CPF já cadastrado'}), 400
         
         # Formatar telefone
@@ -151,7 +173,7 @@ def api_create_patient():
         # Criar paciente
         patient = Patient(
             full_name=data['full_name'].strip(),
-            cpf=cpf_formatted,
+            cpf_number=cpf,
             birth_date=birth_date,
             phone=phone_formatted,
             musical_preference=data.get('musical_preference', '').strip(),
@@ -171,12 +193,71 @@ def api_create_patient():
         db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+@patient_bp.route('/api/import', methods=['POST'])
+@login_required
+@rate_limit(max_requests=5, window=60)
+def api_import_patients():
+    """Importação em lote (CSV ou NDJSON), via upload multipart ou corpo bruto"""
+    if not current_user.has_permission('all'):
+        return jsonify({'error': 'Acesso negado'}), 403
+    
+    from utils.patient_import import detect_format, import_patients_from_stream
+    
+    try:
+        upload = request.files.get('file')
+        if upload:
+            stream = upload.stream
+            fmt = request.args.get('format') or detect_format(upload.filename, upload.content_type)
+        else:
+            stream = request.stream
+            fmt = request.args.get('format') or detect_format(content_type=request.content_type)
+        
+        if fmt not in ('csv', 'ndjson'):
+            return jsonify({'error': 'Formato inválido (use csv ou ndjson)'}), 400
+        
+        report = import_patients_from_stream(stream, fmt, created_by=current_user.id)
+        return jsonify(report), 200 if report['imported'] else 400
+        
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({'error': 'Arquivo deve estar em UTF-8'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro na importação: {str(e)}'}), 500
+
+@patient_bp.route('/api/export')
+@login_required
+@rate_limit(max_requests=10, window=60)
+def api_export_patients():
+    """Exportação completa em CSV ou NDJSON (?format=, ?start=, ?end= por data de cadastro)"""
+    if not current_user.has_permission('all'):
+        return jsonify({'error': 'Acesso negado'}), 403
+    
+    from utils.export import PATIENT_FIELDS, parse_date_range, patient_rows, export_response
+    
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Formato inválido (use csv ou ndjson)'}), 400
+    
+    try:
+        start, end = parse_date_range(request.args.get('start'), request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': 'Data inválida (use YYYY-MM-DD)'}), 400
+    
+    return export_response(patient_rows(start, end), PATIENT_FIELDS, fmt, 'pacientes')
+
 @patient_bp.route('/api/<int:patient_id>', methods=['GET'])
 @login_required
+@query_budget(4)
+@use_replica
+@conditional_entity(Patient, 'patient_id')
 def api_get_patient(patient_id):
     try:
-        patient = Patient.query.get_or_404(patient_id)
-        return jsonify(patient.to_dict())
+        fields = requested_fields(Patient.API_FIELDS)
+        patient = Patient.query.options(*load_only_options(Patient, fields)).get_or_404(patient_id)
+        return jsonify(patient.to_dict(fields))
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erro ao carregar paciente: {str(e)}'}), 500
 
@@ -196,15 +277,15 @@ def api_update_patient(patient_id):
             if not data.get(field):
                 return jsonify({'error': f'Campo {field} é obrigatório'}), 400
         
-        # Formatar e validar CPF
-        cpf_formatted = format_cpf(data['cpf'])
-        if not validate_cpf(cpf_formatted):
+        # Validar CPF (guardado como inteiro de 11 dígitos)
+        try:
+            cpf = parse_cpf(data['cpf'])
+        except ValueError:
             return jsonify({'error': 'CPF inválido'}), 400
         
         # Verificar CPF único (exceto para o próprio paciente)
-        cpf_exists = Patient.query.filter(
-            Patient.cpf == cpf_formatted,
-            Patient.id != patient_id
+        cpf_exists = db.session.execute(
+            db.select(Patient.id).where(Patient.cpf_number == cpf, Patient.id != patient_id)
         ).first()
         
         if cpf_exists:
@@ -233,7 +314,7 @@ def api_update_patient(patient_id):
         
         # Atualizar paciente
         patient.full_name = data['full_name'].strip()
-        patient.cpf = cpf_formatted
+        patient.cpf_number = cpf
         patient.birth_date = birth_date
         patient.phone = phone_formatted
         patient.musical_preference = data.get('musical_preference', '').strip()
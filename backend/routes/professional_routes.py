@@ -4,8 +4,17 @@ from flask_wtf import FlaskForm
 from wtforms import StringField, DateField, TextAreaField, SubmitField, BooleanField
 from wtforms.validators import DataRequired, Length, Email
 from models import db, Professional, User, Servico
+from utils.pagination import paginate_list, InvalidCursor
+from utils.db_routing import use_replica
+from utils.security import rate_limit
+from utils.cpf import parse_cpf, cpf_prefix_range
+from utils.phone import format_phone
+from utils.normalize import only_digits
+from utils.search import DIGITS_TERM
+from utils.query_budget import query_budget
+from utils.serialization import requested_fields, load_only_options, InvalidFields
+from utils.conditional import conditional_entity, conditional_list, catalog_version
 from datetime import datetime
-import re
 
 professionals_bp = Blueprint('professionals', __name__)
 
@@ -20,42 +29,6 @@ class ProfessionalForm(FlaskForm):
     is_active = BooleanField('Ativo')
     submit = SubmitField('Salvar')
 
-def validate_cpf(cpf):
-    """Valida CPF brasileiro"""
-    cpf = re.sub(r'[^0-9]', '', cpf)
-    
-    if len(cpf) != 11:
-        return False
-    
-    if cpf == cpf[0] * 11:
-        return False
-    
-    # Calcula o primeiro dígito verificador
-    sum_1 = sum(int(cpf[i]) * (10 - i) for i in range(9))
-    digit_1 = (sum_1 * 10 % 11) % 10
-    
-    # Calcula o segundo dígito verificador
-    sum_2 = sum(int(cpf[i]) * (11 - i) for i in range(10))
-    digit_2 = (sum_2 * 10 % 11) % 10
-    
-    return cpf[-2:] == f'{digit_1}{digit_2}'
-
-def format_cpf(cpf):
-    """Formata CPF para o padrão 000.000.000-00"""
-    cpf = re.sub(r'[^0-9]', '', cpf)
-    if len(cpf) == 11:
-        return f'{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}'
-    return cpf
-
-def format_phone(phone):
-    """Formata telefone para o padrão (00) 00000-0000"""
-    phone = re.sub(r'[^0-9]', '', phone)
-    if len(phone) == 11:
-        return f'({phone[:2]}) {phone[2:7]}-{phone[7:]}'
-    elif len(phone) == 10:
-        return f'({phone[:2]}) {phone[2:6]}-{phone[6:]}'
-    return phone
-
 # ===== ROTAS DE PROFISSIONAIS =====
 
 @professionals_bp.route('/')
@@ -69,36 +42,44 @@ def list_professionals():
 
 @professionals_bp.route('/api/list')
 @login_required
+@query_budget(10)
+@rate_limit(max_requests=120, window=60)
+@use_replica
+@conditional_list(Professional, extra=catalog_version)
 def api_list_professionals():
     try:
         search = request.args.get('search', '').strip()
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 10, type=int), 100)
+        fields = requested_fields(Professional.API_FIELDS)
+        keyset = [(Professional.full_name, 'asc'), (Professional.id, 'asc')]
         
-        query = Professional.query
+        query = Professional.query.options(*load_only_options(Professional, fields, keyset))
         
         if search:
             search_filter = f'%{search}%'
-            query = query.filter(
-                db.or_(
-                    Professional.full_name.ilike(search_filter),
-                    Professional.cpf.like(search_filter),
-                    Professional.registro_prof.ilike(search_filter),
-                    Professional.email.ilike(search_filter)
-                )
-            )
-        
-        pagination = query.order_by(Professional.full_name).paginate(
-            page=page, per_page=per_page, error_out=False
+            conditions = [
+                Professional.full_name.ilike(search_filter),
+                Professional.registro_prof.ilike(search_filter),
+                Professional.email.ilike(search_filter)
+            ]
+            # CPF por prefixo dos dígitos: faixa de inteiros no índice único de cpf_number
+            cpf_range = cpf_prefix_range(only_digits(search)) if DIGITS_TERM.match(search) else None
+            if cpf_range:
+                conditions.append(Professional.cpf_number.between(*cpf_range))
+            query = query.filter(db.or_(*conditions))
+        
+        result = paginate_list(
+            query,
+            keyset=keyset,
+            count_key=f'professionals:{search}',
+            filtered=bool(search)
         )
         
         return jsonify({
-            'professionals': [p.to_dict() for p in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page,
-            'per_page': per_page
+            'professionals': Professional.to_list_dicts(result.pop('items'), fields),
+            **result
         })
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erro ao carregar profissionais: {str(e)}'}), 500
 
@@ -120,13 +101,14 @@ def api_create_professional():
             if not data.get(field):
                 return jsonify({'error': f'Campo {field} é obrigatório'}), 400
         
-        # Formatar e validar CPF
-        cpf_formatted = format_cpf(data['cpf'])
-        if not validate_cpf(cpf_formatted):
+        # Validar CPF (guardado como inteiro de 11 dígitos)
+        try:
+            cpf = parse_cpf(data['cpf'])
+        except ValueError:
             return jsonify({'error': 'CPF inválido'}), 400
         
         # Verificar CPF único
-        if Professional.query.filter_by(cpf=cpf_formatted).first():
+        if db.session.execute(db.select(Professional.id).where(Professional.cpf_number == cpf)).first():
             return jsonify({'error': 'CPF já cadastrado'}), 400
         
         # Verificar email único apenas se fornecido
@@ -159,7 +141,7 @@ def api_create_professional():
         # Criar profissional
         professional = Professional(
             full_name=data['full_name'].strip(),
-            cpf=cpf_formatted,
+            cpf_number=cpf,
             registro_prof=data.get('registro_prof', '').strip().upper() if data.get('registro_prof') else None,
             phone=phone_formatted,
             email=data.get('email', '').strip().lower() if data.get('email') else None,
@@ -189,10 +171,18 @@ def api_create_professional():
 
 @professionals_bp.route('/api/<int:professional_id>', methods=['GET'])
 @login_required
+@query_budget(6)
+@use_replica
+@conditional_entity(Professional, 'professional_id', extra=catalog_version)
 def api_get_professional(professional_id):
     try:
-        professional = Professional.query.get_or_404(professional_id)
-        return jsonify(professional.to_dict())
+        fields = requested_fields(Professional.API_FIELDS)
+        professional = Professional.query.options(
+            *load_only_options(Professional, fields)
+        ).get_or_404(professional_id)
+        return jsonify(professional.to_dict(fields))
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erro ao carregar profissional: {str(e)}'}), 500
 
@@ -215,14 +205,14 @@ def api_update_professional(professional_id):
             if not data.get(field):
                 return jsonify({'error': f'Campo {field} é obrigatório'}), 400
         
-        cpf_formatted = format_cpf(data['cpf'])
-        if not validate_cpf(cpf_formatted):
+        try:
+            cpf = parse_cpf(data['cpf'])
+        except ValueError:
             return jsonify({'error': 'CPF inválido'}), 400
         
         # Verificar duplicatas apenas para campos obrigatórios
-        cpf_existing = Professional.query.filter(
-            Professional.cpf == cpf_formatted,
-            Professional.id != professional_id
+        cpf_existing = db.session.execute(
+            db.select(Professional.id).where(Professional.cpf_number == cpf, Professional.id != professional_id)
         ).first()
         if cpf_existing:
             return jsonify({'error': 'CPF já cadastrado para outro profissional'}), 400
@@ -267,7 +257,7 @@ def api_update_professional(professional_id):
         
         # Atualizar profissional
         professional.full_name = data['full_name'].strip()
-        professional.cpf = cpf_formatted
+        professional.cpf_number = cpf
         professional.registro_prof = data.get('registro_prof', '').strip().upper() if data.get('registro_prof') else None
         professional.phone = phone_formatted
         professional.email = data.get('email', '').strip().lower() if data.get('email') else None
@@ -356,6 +346,8 @@ def api_create_user_account(professional_id):
         )
         user.set_password(password)
         
+        # has_user_account faz parte da representação: invalida ETags do profissional
+        professional.updated_at = datetime.utcnow()
         db.session.add(user)
         db.session.commit()
         
@@ -1,6 +1,13 @@
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
+from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, current_app
 from flask_login import login_required, current_user
 from models import db, Servico
+from utils.pagination import paginate_list, InvalidCursor
+from utils.db_routing import use_replica
+from utils.security import rate_limit
+from utils.query_budget import query_budget
+from utils.serialization import requested_fields, load_only_options, InvalidFields
+from utils.conditional import conditional_entity, conditional_list
+from utils.catalog import get_catalog, bump_version, catalog_etag
 from datetime import datetime
 
 services_bp = Blueprint('services', __name__)
@@ -16,32 +23,56 @@ def list_services():
 
 @services_bp.route('/api/list')
 @login_required
+@query_budget(6)
+@rate_limit(max_requests=120, window=60)
+@use_replica
+@conditional_list(Servico)
 def api_list_services():
     try:
         search = request.args.get('search', '').strip()
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 10, type=int), 100)
+        fields = requested_fields(Servico.API_FIELDS)
+        keyset = [(Servico.name, 'asc'), (Servico.id, 'asc')]
 
-        query = Servico.query
+        query = Servico.query.options(*load_only_options(Servico, fields, keyset))
 
         if search:
             search_filter = f'%{search}%'
             query = query.filter(Servico.name.ilike(search_filter))
 
-        pagination = query.order_by(Servico.name).paginate(
-            page=page, per_page=per_page, error_out=False
+        result = paginate_list(
+            query,
+            keyset=keyset,
+            count_key=f'services:{search}',
+            filtered=bool(search)
         )
 
         return jsonify({
-            'services': [s.to_dict() for s in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page,
-            'per_page': per_page
+            'services': [s.to_dict(fields) for s in result.pop('items')],
+            **result
         })
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erro ao carregar serviços: {str(e)}'}), 500
 
+@services_bp.route('/api/catalog')
+@login_required
+def api_catalog():
+    """Catálogo completo em cache, revalidável por ETag (versão do catálogo)"""
+    try:
+        version, services, _ = get_catalog()
+        etag = catalog_etag(version)
+        # Comparação fraca: a compressão torna o ETag fraco (W/)
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = jsonify({'version': version, 'services': services})
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    except Exception as e:
+        return jsonify({'error': f'Erro ao carregar catálogo: {str(e)}'}), 500
+
 @services_bp.route('/api/create', methods=['POST'])
 @login_required
 def api_create_service():
@@ -70,6 +101,7 @@ def api_create_service():
         )
 
         db.session.add(service)
+        bump_version()
         db.session.commit()
 
         return jsonify({
@@ -83,10 +115,16 @@ def api_create_service():
 
 @services_bp.route('/api/<int:service_id>', methods=['GET'])
 @login_required
+@query_budget(4)
+@use_replica
+@conditional_entity(Servico, 'service_id')
 def api_get_service(service_id):
     try:
-        service = Servico.query.get_or_404(service_id)
-        return jsonify(service.to_dict())
+        fields = requested_fields(Servico.API_FIELDS)
+        service = Servico.query.options(*load_only_options(Servico, fields)).get_or_404(service_id)
+        return jsonify(service.to_dict(fields))
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erro ao carregar serviço: {str(e)}'}), 500
 
@@ -117,6 +155,7 @@ def api_update_service(service_id):
         service.aftercare_instructions = data.get('aftercare_instructions', '').strip()
         service.is_active = data.get('is_active', True)
 
+        bump_version()
         db.session.commit()
 
         return jsonify({
@@ -138,6 +177,7 @@ def api_delete_service(service_id):
         service = Servico.query.get_or_404(service_id)
 
         db.session.delete(service)
+        bump_version()
         db.session.commit()
 
         return jsonify({'message': 'Serviço excluído com sucesso'})
@@ -0,0 +1,95 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# config.py lê o ambiente no import: valores mínimos para create_app validar
+os.environ.setdefault('SECRET_KEY', 'test-secret-key-' + 'x' * 32)
+os.environ.setdefault('JWT_SECRET_KEY', 'test-jwt-key-' + 'y' * 32)
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+ADMIN_PASSWORD = 'test-admin-123'
+
+# PostgreSQL descartável (o esquema public é recriado): habilita os testes que comparam bancos
+POSTGRES_URL = os.environ.get('TEST_POSTGRES_URL')
+
+
+def _reset_process_caches():
+    """Caches por processo sobrevivem entre apps: cada teste começa do zero"""
+    from utils import catalog, identity, pagination, passwords, scheduling, search
+    identity._principals.clear()
+    pagination._count_cache.clear()
+    scheduling._agendas.clear()
+    search._backends.clear()
+    passwords._reset_pool()
+    catalog._snapshot.update(version=None, checked_at=0.0, services=[], by_id={})
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Fábrica de apps sobre um banco novo; kwargs sobrescrevem a Config (ex.: RATELIMIT_ENABLED=True)"""
+    from app import bootstrap_database, create_app
+    from config import Config
+    from models import db
+
+    apps = []
+
+    def factory(database_url=None, **config):
+        settings = {
+            'SQLALCHEMY_DATABASE_URI': database_url or 'sqlite:///' + str(tmp_path / f'test{len(apps)}.db'),
+            'TESTING': True,
+            'WTF_CSRF_ENABLED': False,
+            'SESSION_COOKIE_SECURE': False,
+            'RATELIMIT_ENABLED': False,
+            'RATELIMIT_STORAGE_URL': 'memory://',
+            'METRICS_ENABLED': False,
+            'METRICS_DIR': str(tmp_path / 'metrics'),
+            'LOG_FILE': '',
+            'QUERY_BUDGET_MODE': 'off',
+            # Sem o custo do scrypt padrão a cada login dos testes
+            'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+            **config,
+        }
+        for key, value in settings.items():
+            monkeypatch.setattr(Config, key, value, raising=False)
+        monkeypatch.setenv('ADMIN_DEFAULT_PASSWORD', ADMIN_PASSWORD)
+        _reset_process_caches()
+
+        app = create_app()
+        if database_url:
+            with app.app_context(), db.engine.begin() as conn:
+                conn.execute(db.text('DROP SCHEMA public CASCADE'))
+                conn.execute(db.text('CREATE SCHEMA public'))
+        bootstrap_database(app)
+        apps.append(app)
+        return app
+
+    yield factory
+
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+    _reset_process_caches()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+def login(client, username='admin', password=ADMIN_PASSWORD):
+    return client.post('/auth/login', data={'username': username, 'password': password})
+
+
+@pytest.fixture
+def client(app):
+    """Cliente autenticado como admin"""
+    client = app.test_client()
+    response = login(client)
+    assert response.status_code == 302, response.get_data(as_text=True)
+    return client
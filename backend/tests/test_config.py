@@ -0,0 +1,26 @@
+import pytest
+from flask import Flask
+
+from config import Config
+
+
+def _validate(**overrides):
+    from app import validate_config
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.update(overrides)
+    validate_config(app)
+
+
+@pytest.mark.parametrize('secret', [None, 'sua-chave-jwt-aqui-mude-em-producao'])
+def test_jwt_secret_not_required_while_jwt_is_disabled(secret):
+    _validate(JWT_ENABLED=False, JWT_SECRET_KEY=secret)
+
+
+@pytest.mark.parametrize('secret, message', [
+    (None, 'JWT_SECRET_KEY não foi configurada'),
+    ('sua-chave-jwt-aqui-mude-em-producao', 'JWT_SECRET_KEY está usando o valor padrão'),
+])
+def test_jwt_secret_required_when_jwt_is_enabled(secret, message):
+    with pytest.raises(ValueError, match=message):
+        _validate(JWT_ENABLED=True, JWT_SECRET_KEY=secret)
@@ -0,0 +1,62 @@
+from conftest import ADMIN_PASSWORD, login
+
+
+def _remember_cookie(app):
+    """Cliente novo só com o cookie "lembrar-me" de um login recente (sem a sessão)"""
+    client = app.test_client()
+    assert login(client).status_code == 302
+    token = client.get_cookie('remember_token')
+    assert token is not None
+    restored = app.test_client()
+    restored.set_cookie('remember_token', token.value)
+    return restored
+
+
+def _change_admin(app, **changes):
+    from models import db, User
+    with app.app_context():
+        admin = db.session.execute(db.select(User).filter_by(username='admin')).scalar_one()
+        for name, value in changes.items():
+            if name == 'password':
+                admin.set_password(value)
+            else:
+                setattr(admin, name, value)
+        db.session.commit()
+
+
+def test_remember_cookie_restores_the_session(app):
+    client = _remember_cookie(app)
+    assert client.get('/auth/api/check-auth').status_code == 200
+
+
+def test_remember_cookie_stops_working_after_password_change(app):
+    client = _remember_cookie(app)
+    session_client = app.test_client()
+    login(session_client)
+
+    _change_admin(app, password='nova-senha-segura-456')
+
+    assert client.get('/auth/api/check-auth').status_code == 302
+    assert session_client.get('/auth/api/check-auth').status_code == 302
+
+
+def test_remember_cookie_stops_working_after_role_change(app):
+    client = _remember_cookie(app)
+    _change_admin(app, role='receptionist')
+    assert client.get('/auth/api/check-auth').status_code == 302
+
+
+def test_identity_without_version_is_rejected(app):
+    from utils.identity import load_principal
+    with app.app_context():
+        assert load_principal('1') is None
+        assert load_principal('1:x') is None
+        assert load_principal('1:1') is not None
+
+
+def test_login_after_password_change(app):
+    _change_admin(app, password='nova-senha-segura-456')
+    client = app.test_client()
+    assert login(client, password=ADMIN_PASSWORD).status_code == 200  # senha antiga: formulário de novo
+    assert login(client, password='nova-senha-segura-456').status_code == 302
+    assert client.get('/auth/api/check-auth').status_code == 200
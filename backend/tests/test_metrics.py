@@ -0,0 +1,40 @@
+import pytest
+
+LOCAL = {'REMOTE_ADDR': '127.0.0.1'}
+REMOTE = {'REMOTE_ADDR': '203.0.113.7'}
+
+
+@pytest.fixture
+def metrics_app(make_app):
+    def factory(**config):
+        return make_app(METRICS_ENABLED=True, **config)
+    return factory
+
+
+def test_denied_without_token_by_default(metrics_app):
+    client = metrics_app(METRICS_TOKEN=None).test_client()
+    assert client.get('/metrics', environ_base=LOCAL).status_code == 403
+    assert client.get('/metrics', environ_base=REMOTE).status_code == 403
+
+
+def test_local_scrape_needs_explicit_opt_in(metrics_app):
+    client = metrics_app(METRICS_TOKEN=None, METRICS_ALLOW_LOCAL=True).test_client()
+    assert client.get('/metrics', environ_base=LOCAL).status_code == 200
+    assert client.get('/metrics', environ_base=REMOTE).status_code == 403
+
+
+def test_local_opt_in_behind_proxy_uses_the_forwarded_client(metrics_app):
+    client = metrics_app(METRICS_TOKEN=None, METRICS_ALLOW_LOCAL=True, TRUSTED_PROXIES=1).test_client()
+    # O proxy no mesmo host conecta de 127.0.0.1, mas o cliente é externo
+    response = client.get('/metrics', environ_base=LOCAL, headers={'X-Forwarded-For': '203.0.113.7'})
+    assert response.status_code == 403
+
+
+def test_bearer_token(metrics_app):
+    client = metrics_app(METRICS_TOKEN='s3cr3t').test_client()
+    assert client.get('/metrics', environ_base=REMOTE).status_code == 403
+    assert client.get('/metrics', environ_base=REMOTE,
+                      headers={'Authorization': 'Bearer errado'}).status_code == 403
+    response = client.get('/metrics', environ_base=REMOTE, headers={'Authorization': 'Bearer s3cr3t'})
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
@@ -0,0 +1,150 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.schema import CreateTable
+
+from conftest import POSTGRES_URL
+
+postgresql_only = pytest.mark.skipif(not POSTGRES_URL, reason='TEST_POSTGRES_URL não configurada')
+
+LEGACY_UPDATED_AT = datetime(2024, 1, 1, 10, 0, 0)
+
+
+def _legacy_patients(cpfs):
+    """patients como antes da migração 7: CPF em texto na coluna cpf, sem cpf_number"""
+    from migrations import schema_migrations
+    from models import db, Patient
+    if db.engine.dialect.name == 'postgresql':
+        with db.engine.begin() as conn:
+            conn.execute(db.text('ALTER TABLE patients ADD COLUMN cpf VARCHAR(14) NOT NULL UNIQUE'))
+            conn.execute(db.text('ALTER TABLE patients ALTER COLUMN cpf_number DROP NOT NULL'))
+    else:
+        # SQLite não altera NOT NULL: recria a tabela com o esquema antigo
+        legacy = Patient.__table__.to_metadata(db.metadata, name='patients_legacy')
+        legacy.c.cpf_number.nullable = True
+        legacy.append_column(db.Column('cpf', db.String(14), nullable=False, unique=True))
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(db.text('DROP TABLE patients'))
+                conn.execute(CreateTable(legacy))
+                conn.execute(db.text('ALTER TABLE patients_legacy RENAME TO patients'))
+        finally:
+            db.metadata.remove(legacy)
+    with db.engine.begin() as conn:
+        for i, cpf in enumerate(cpfs):
+            conn.execute(db.text(
+                "INSERT INTO patients (id, full_name, cpf, phone, created_at, updated_at) "
+                "VALUES (:id, :name, :cpf, '(11) 98765-4321', :at, :at)"
+            ), {'id': i + 1, 'name': f'Paciente {i + 1}', 'cpf': cpf, 'at': LEGACY_UPDATED_AT})
+        if db.engine.dialect.name == 'sqlite':
+            # O FTS5 acompanhava a tabela antiga pelos gatilhos, que somem com o DROP
+            from utils.search import SQLITE_FTS_TABLES
+            for name in SQLITE_FTS_TABLES:
+                conn.execute(db.text(f"INSERT INTO {name}({name}) VALUES ('rebuild')"))
+        conn.execute(schema_migrations.delete().where(schema_migrations.c.version == 7))
+
+
+def _patients():
+    from models import db
+    with db.engine.connect() as conn:
+        return conn.execute(db.text('SELECT id, cpf_number FROM patients ORDER BY id')).all()
+
+
+@pytest.mark.parametrize('database', ['sqlite', pytest.param('postgresql', marks=postgresql_only)])
+def test_cpf_migration_stops_on_malformed_rows(make_app, database):
+    from migrations import MigrationError, has_column, upgrade
+    app = make_app(POSTGRES_URL if database == 'postgresql' else None)
+    with app.app_context():
+        _legacy_patients(['529.982.247-25', '52998224725', '111.444.777-35'])
+        with pytest.raises(MigrationError, match=r'patients: ids 2\b'):
+            upgrade(log=lambda message: None)
+        # Nada convertido: a migração roda de novo depois de corrigido o dado
+        assert has_column('patients', 'cpf')
+        assert [number for _, number in _patients()] == [None, None, None]
+
+
+@pytest.mark.parametrize('database', ['sqlite', pytest.param('postgresql', marks=postgresql_only)])
+def test_cpf_migration_backfills_cpf_number(make_app, database):
+    from migrations import check_schema, has_column, upgrade
+    from models import db
+    app = make_app(POSTGRES_URL if database == 'postgresql' else None)
+    with app.app_context():
+        _legacy_patients(['529.982.247-25', '111.444.777-35'])
+        upgrade(log=lambda message: None)
+        assert [number for _, number in _patients()] == [52998224725, 11144477735]
+        assert check_schema() == []
+        if database == 'postgresql':
+            # A coluna em texto fica até uma migração posterior, sem exigir valor nas linhas novas
+            column = next(c for c in db.inspect(db.engine).get_columns('patients') if c['name'] == 'cpf')
+            assert column['nullable']
+        else:
+            assert not has_column('patients', 'cpf')
+
+
+@pytest.mark.parametrize('database', ['sqlite', pytest.param('postgresql', marks=postgresql_only)])
+def test_reindex_keeps_updated_at(make_app, database):
+    from migrations import upgrade
+    from models import db, Patient
+    from utils.search import reindex_patients
+    app = make_app(POSTGRES_URL if database == 'postgresql' else None)
+    with app.app_context():
+        _legacy_patients(['529.982.247-25', '111.444.777-35'])
+        # A migração 7 reindexa os pacientes; a modificação real não pode virar a hora do upgrade
+        upgrade(log=lambda message: None)
+        reindex_patients()
+        rows = db.session.execute(db.select(Patient.updated_at, Patient.name_normalized)).all()
+        assert [updated_at for updated_at, _ in rows] == [LEGACY_UPDATED_AT] * 2
+        assert all(name for _, name in rows)
+
+
+@postgresql_only
+def test_invalid_index_is_reported_and_rebuilt(make_app):
+    from migrations import check_schema, invalid_indexes, upgrade
+    from models import db
+    app = make_app(POSTGRES_URL)
+    with app.app_context():
+        # Efeito de um CREATE INDEX CONCURRENTLY interrompido
+        with db.engine.begin() as conn:
+            conn.execute(db.text(
+                "UPDATE pg_index SET indisvalid = false WHERE indexrelid = 'ix_patients_cpf_number'::regclass"
+            ))
+        assert invalid_indexes() == {'ix_patients_cpf_number'}
+        assert any('índice inválido' in p and 'ix_patients_cpf_number' in p for p in check_schema())
+        upgrade(log=lambda message: None)
+        assert invalid_indexes() == set()
+        assert check_schema() == []
+
+
+def test_cpf_digits_copy_is_dropped(make_app):
+    from migrations import check_schema, has_column, schema_migrations, upgrade
+    from models import db, Patient
+    from utils.search import apply_patient_search
+    app = make_app()
+    with app.app_context():
+        db.session.add(Patient(full_name='Maria Souza', cpf='529.982.247-25', phone='(11) 98765-4321'))
+        db.session.commit()
+        updated_at = db.session.execute(db.select(Patient.updated_at)).scalar_one()
+        # Esquema anterior: cópia em texto do CPF na tabela, no FTS5 e nos gatilhos
+        with db.engine.begin() as conn:
+            for trigger in ('patients_fts_ai', 'patients_fts_ad', 'patients_fts_au'):
+                conn.execute(db.text(f'DROP TRIGGER {trigger}'))
+            conn.execute(db.text('DROP TABLE patients_fts'))
+            conn.execute(db.text('ALTER TABLE patients ADD COLUMN cpf_digits VARCHAR(11)'))
+            conn.execute(db.text("UPDATE patients SET cpf_digits = '52998224725'"))
+            conn.execute(db.text(
+                "CREATE VIRTUAL TABLE patients_fts USING fts5(name_normalized, cpf_digits, phone_digits, "
+                "content='patients', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+            ))
+            conn.execute(db.text("INSERT INTO patients_fts(patients_fts) VALUES ('rebuild')"))
+            conn.execute(schema_migrations.delete().where(schema_migrations.c.version == 11))
+
+        upgrade(log=lambda message: None)
+        assert not has_column('patients', 'cpf_digits')
+        with db.engine.connect() as conn:
+            fts_columns = [row[1] for row in conn.execute(db.text('PRAGMA table_info(patients_fts)'))]
+        assert fts_columns == ['name_normalized', 'phone_digits']
+        assert check_schema() == []
+        assert db.session.execute(db.select(Patient.updated_at)).scalar_one() == updated_at
+        for term in ('maria', '529982', '8765'):
+            query, _ = apply_patient_search(Patient.query, term)
+            assert [p.full_name for p in query] == ['Maria Souza'], term
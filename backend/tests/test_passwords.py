@@ -0,0 +1,102 @@
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+
+from conftest import BACKEND_DIR, login
+
+
+def _hold_slots(app, count):
+    """Ocupa `count` chamadas do pool com jobs que só terminam quando o evento é liberado"""
+    from utils.passwords import _executor, run_bounded
+    with app.app_context():
+        slots = _executor()[1]
+    release = threading.Event()
+
+    def call():
+        with app.app_context():
+            run_bounded(release.wait)
+
+    callers = [threading.Thread(target=call) for _ in range(count)]
+    for caller in callers:
+        caller.start()
+    for _ in range(200):
+        if slots._value == 0:
+            break
+        time.sleep(0.01)
+    return release, callers
+
+
+def _release(release, callers):
+    release.set()
+    for caller in callers:
+        caller.join()
+
+
+def test_waiting_calls_leave_a_request_thread_free(make_app):
+    from utils.passwords import PasswordHasherBusy, run_bounded
+    app = make_app(WEB_THREADS=3, PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=16)
+    # 1 no pool + 1 em espera = WEB_THREADS - 1: a terceira falha na hora
+    release, callers = _hold_slots(app, 2)
+    try:
+        with app.app_context(), pytest.raises(PasswordHasherBusy):
+            run_bounded(lambda: None)
+    finally:
+        _release(release, callers)
+    with app.app_context():
+        assert run_bounded(lambda: 42) == 42
+
+
+def test_login_answers_503_when_the_pool_is_full(make_app):
+    app = make_app(WEB_THREADS=2, PASSWORD_HASH_WORKERS=1)
+    release, callers = _hold_slots(app, 1)
+    try:
+        response = login(app.test_client())
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '5'
+    finally:
+        _release(release, callers)
+
+
+def test_gevent_worker_hashes_outside_the_event_loop():
+    pytest.importorskip('gevent')
+    # Processo próprio: o monkey patch não pode vazar para os outros testes
+    script = textwrap.dedent('''
+        from gevent import monkey
+        monkey.patch_all()
+        import hashlib
+        from functools import partial
+        import gevent
+        from flask import Flask
+        from gevent.threadpool import ThreadPool
+        from utils.passwords import _executor, run_bounded
+
+        app = Flask(__name__)
+        app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=16,
+                          PASSWORD_HASH_TIMEOUT=30, WEB_THREADS=4)
+        ticks = []
+
+        def ticker():
+            while True:
+                ticks.append(1)
+                gevent.sleep(0.005)
+
+        def login():
+            with app.app_context():
+                return run_bounded(partial(hashlib.scrypt, b'senha', salt=b'sal', n=2 ** 14,
+                                           r=8, p=8, maxmem=64 * 1024 * 1024))
+
+        with app.app_context():
+            assert isinstance(_executor()[0], ThreadPool)
+        background = gevent.spawn(ticker)
+        assert len(login()) == 64
+        background.kill()
+        # O loop seguiu rodando enquanto o KDF ocupava a thread do pool
+        assert len(ticks) > 3, ticks
+    ''')
+    result = subprocess.run([sys.executable, '-c', script], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,43 @@
+import pytest
+
+from utils.query_budget import QueryCounter
+from utils.seed import cpf_from_number
+
+
+@pytest.fixture
+def professionals(app):
+    """60 profissionais com dois serviços cada; um a cada três com conta de acesso"""
+    from models import db, Professional, Servico, User
+
+    with app.app_context():
+        services = [Servico(name=f'Serviço {i}', duration_minutes=30, price=100) for i in range(4)]
+        db.session.add_all(services)
+        for i in range(60):
+            professional = Professional(full_name=f'Profissional {i:02d}', cpf=cpf_from_number(900_000 + i),
+                                        phone='(11) 98888-0000', services=services[i % 3:i % 3 + 2])
+            db.session.add(professional)
+            if i % 3 == 0:
+                db.session.flush()
+                account = User(username=f'prof{i}', email=f'prof{i}@clinica.test', full_name=professional.full_name,
+                               role='professional', professional_id=professional.id)
+                account.set_password('senha-segura-123')
+                db.session.add(account)
+        db.session.commit()
+
+
+def _statements(client, per_page):
+    with QueryCounter(label='professionals') as counter:
+        response = client.get('/professionals/api/list', query_string={'per_page': per_page})
+    assert response.status_code == 200
+    page = response.get_json()['professionals']
+    assert len(page) == per_page
+    assert all(p['services'] for p in page)
+    return counter.count
+
+
+def test_list_page_runs_a_fixed_number_of_queries(client, professionals):
+    client.get('/professionals/api/list')  # identidade e catálogo em cache, como em regime
+    small, large = _statements(client, 10), _statements(client, 50)
+    # Marca d'água e versão do catálogo (ETag), página, total, serviços e contas da página:
+    # uma consulta cada, qualquer que seja o tamanho da página
+    assert small == large == 6
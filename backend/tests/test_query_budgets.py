@@ -0,0 +1,36 @@
+"""Orçamento de statements de cada rota /api/* (os casos ficam em benchmarks.query_budgets)"""
+import pytest
+
+from benchmarks.query_budgets import CASES, api_routes, run_case, seed
+from conftest import login
+
+
+@pytest.fixture
+def seeded(make_app):
+    # Cada statement além do orçamento (ou N+1) vira exceção na própria rota
+    app = make_app(QUERY_BUDGET_MODE='raise')
+    with app.app_context():
+        ids = seed(30)
+    client = app.test_client()
+    assert login(client).status_code == 302
+    # Orçamentos valem para o worker em regime: identidade e catálogo já em cache
+    # (utils.identity, utils.catalog), como no benchmark que roda as rotas em sequência
+    for url in ('/auth/api/check-auth', '/services/api/catalog'):
+        assert client.get(url).status_code == 200
+    return app, client, ids
+
+
+def test_every_api_route_has_a_case(app):
+    missing = sorted(api_routes(app) - set(CASES))
+    assert not missing, f'rotas sem caso em benchmarks.query_budgets.CASES: {missing}'
+
+
+@pytest.mark.parametrize('endpoint, method', list(CASES), ids=[f'{m} {e}' for e, m in CASES])
+def test_route_within_query_budget(seeded, endpoint, method):
+    app, client, ids = seeded
+    assert (endpoint, method) in api_routes(app), 'caso de uma rota que não existe mais'
+    result = run_case(app, client, endpoint, method, ids)
+    assert result['ok'], result['error']
+    # Exportações geram o corpo sob demanda, sem X-Query-Count: o modo raise confere o stream
+    if result['queries'] is not None:
+        assert result['queries'] <= result['budget']
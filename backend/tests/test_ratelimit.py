@@ -0,0 +1,115 @@
+import multiprocessing
+
+import pytest
+
+from utils import ratelimit
+from utils.ratelimit import MemoryBucketStore, MmapBucketStore
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture(params=['memory', 'mmap'])
+def store(request, tmp_path):
+    if request.param == 'mmap':
+        if ratelimit.fcntl is None:
+            pytest.skip('mmap:// requer fcntl')
+        return MmapBucketStore(str(tmp_path / 'ratelimit.bin'), slots=64)
+    return MemoryBucketStore()
+
+
+def test_burst_up_to_capacity_then_denied(store, clock):
+    # 3 requisições a cada 6 s: rajada de 3, depois uma ficha a cada 2 s
+    assert [store.take('k', 3, 0.5)[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = store.take('k', 3, 0.5)
+    assert not allowed
+    assert retry_after == pytest.approx(2.0)
+
+
+def test_refill_at_rate_without_passing_capacity(store, clock):
+    for _ in range(3):
+        store.take('k', 3, 0.5)
+    clock.now += 1.0
+    allowed, retry_after = store.take('k', 3, 0.5)
+    assert not allowed
+    assert retry_after == pytest.approx(1.0)
+    clock.now += 1.0
+    assert store.take('k', 3, 0.5)[0]
+    # Parado por muito tempo, o balde enche só até a capacidade
+    clock.now += 3600
+    assert [store.take('k', 3, 0.5)[0] for _ in range(4)] == [True, True, True, False]
+
+
+def test_buckets_are_per_key(store, clock):
+    assert store.take('a', 1, 0.1)[0]
+    assert not store.take('a', 1, 0.1)[0]
+    assert store.take('b', 1, 0.1)[0]
+
+
+def _take_in_child(path, count, results):
+    child_store = MmapBucketStore(path, slots=64)
+    results.put([child_store.take('shared', 5, 0.001)[0] for _ in range(count)])
+
+
+@pytest.mark.skipif(ratelimit.fcntl is None, reason='mmap:// requer fcntl')
+def test_mmap_buckets_are_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'ratelimit.bin')
+    parent = MmapBucketStore(path, slots=64)
+    assert parent.take('shared', 5, 0.001)[0]
+    # Processos novos (como os workers do gunicorn) consomem o mesmo balde
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    children = [context.Process(target=_take_in_child, args=(path, 2, results)) for _ in range(2)]
+    for child in children:
+        child.start()
+    taken = [results.get(timeout=60) for _ in children]
+    for child in children:
+        child.join()
+    assert sorted(taken) == [[True, True], [True, True]]
+    assert not parent.take('shared', 5, 0.001)[0]
+
+
+def test_route_limit_answers_429_with_retry_after(make_app):
+    app = make_app(RATELIMIT_ENABLED=True, RATELIMIT_DEFAULT='')
+    client = app.test_client()
+    # Login: 20 por minuto por IP
+    assert all(client.get('/auth/login').status_code == 200 for _ in range(20))
+    response = client.get('/auth/login')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '3'
+    assert 'error' in response.get_json()
+
+
+def test_default_limit_applies_to_every_route(make_app):
+    app = make_app(RATELIMIT_ENABLED=True, RATELIMIT_DEFAULT='2/60')
+    client = app.test_client()
+    statuses = [client.get('/auth/api/check-auth').status_code for _ in range(3)]
+    assert 429 not in statuses[:2]
+    assert statuses[2] == 429
+    assert client.get('/auth/api/check-auth').headers['Retry-After'] == '30'
+
+
+@pytest.mark.parametrize('trusted_proxies, separate_buckets', [(0, False), (1, True)])
+def test_client_ip_behind_trusted_proxies(make_app, trusted_proxies, separate_buckets):
+    app = make_app(RATELIMIT_ENABLED=True, RATELIMIT_DEFAULT='1/60', TRUSTED_PROXIES=trusted_proxies)
+    client = app.test_client()
+
+    def limited(ip):
+        return client.get('/auth/api/check-auth', headers={'X-Forwarded-For': ip}).status_code == 429
+
+    assert not limited('203.0.113.1')
+    # Sem proxy confiável o cabeçalho é ignorado: todos dividem o balde do IP do proxy
+    assert limited('203.0.113.2') is not separate_buckets
+    assert limited('203.0.113.1')
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import login
+from utils.seed import cpf_from_number
+
+
+def _rollup_rows():
+    from models import db, StatRollup, ServiceRollup
+    stats = {r.period: (r.patients, r.atendimentos, round(r.revenue, 2))
+             for r in db.session.execute(db.select(StatRollup)).scalars()
+             if r.patients or r.atendimentos or r.revenue}
+    services = {(r.period, r.service_id): r.atendimentos
+                for r in db.session.execute(db.select(ServiceRollup)).scalars() if r.atendimentos}
+    return stats, services
+
+
+def _assert_matches_rebuild():
+    """Os agregados mantidos pelos eventos são os mesmos que um recálculo completo produz"""
+    from utils.rollups import rebuild_rollups
+    incremental = _rollup_rows()
+    rebuild_rollups()
+    assert incremental == _rollup_rows()
+
+
+@pytest.mark.parametrize('timezone', ['Pacific/Kiritimati', 'Pacific/Pago_Pago'])
+def test_new_patient_counts_today_on_the_clinic_clock(make_app, timezone):
+    # +14h e -11h: a qualquer hora, ao menos um deles está em outro dia que o UTC
+    app = make_app(CLINIC_TIMEZONE=timezone)
+    client = app.test_client()
+    login(client)
+    response = client.post('/patients/api/create', json={
+        'full_name': 'Paciente Hoje', 'cpf': cpf_from_number(4242), 'phone': '(11) 98765-4321'})
+    assert response.status_code == 201
+
+    summary = client.get('/api/dashboard/summary').get_json()
+    assert summary['patients']['new_today'] == 1
+    assert summary['patients']['new_this_month'] == 1
+
+
+def test_patient_created_late_evening_uses_local_day(make_app):
+    from models import db, Patient
+    from utils.rollups import patient_period_keys
+
+    app = make_app(CLINIC_TIMEZONE='America/Sao_Paulo')
+    with app.app_context():
+        # 31/01 às 22:30 em São Paulo (UTC-3) = 01/02 01:30 UTC
+        created_at = datetime(2024, 2, 1, 1, 30)
+        assert patient_period_keys(created_at) == ['total', 'month:2024-01', 'day:2024-01-31']
+        db.session.add(Patient(full_name='Paciente Noite', cpf=cpf_from_number(4243), phone='(11) 98765-0000',
+                               created_at=created_at))
+        db.session.commit()
+        stats, _ = _rollup_rows()
+        assert stats['day:2024-01-31'][0] == 1
+        assert 'day:2024-02-01' not in stats
+        _assert_matches_rebuild()
+
+
+def test_atendimento_update_moves_rollups(app):
+    from models import db, Atendimento, Patient, Professional, Servico
+
+    with app.app_context():
+        services = [Servico(name=f'Serviço {i}', duration_minutes=30, price=100) for i in range(3)]
+        patient = Patient(full_name='Paciente', cpf=cpf_from_number(4244), phone='(11) 98765-1111')
+        professional = Professional(full_name='Profissional', cpf=cpf_from_number(4245), phone='(11) 98765-2222')
+        db.session.add_all([*services, patient, professional])
+        db.session.flush()
+        atendimento = Atendimento(patient_id=patient.id, professional_id=professional.id,
+                                  data_atendimento=datetime(2024, 3, 10, 15, 0), valor_cobrado=200,
+                                  servicos=services[:2])
+        db.session.add(atendimento)
+        db.session.commit()
+        _assert_matches_rebuild()
+
+        atendimento = db.session.get(Atendimento, atendimento.id)
+        atendimento.valor_cobrado = 350
+        atendimento.data_atendimento = datetime(2024, 4, 2, 9, 0)
+        db.session.commit()
+        stats, _ = _rollup_rows()
+        assert 'month:2024-03' not in stats
+        assert stats['month:2024-04'] == (0, 1, 350)
+        _assert_matches_rebuild()
+
+        # Só a coleção de serviços muda
+        atendimento = db.session.get(Atendimento, atendimento.id)
+        atendimento.servicos = [services[2]]
+        db.session.commit()
+        _, service_rows = _rollup_rows()
+        assert service_rows == {('total', services[2].id): 1, ('month:2024-04', services[2].id): 1}
+        _assert_matches_rebuild()
+
+        # Objeto expirado (sem o valor antigo em memória)
+        db.session.expire_all()
+        db.session.get(Atendimento, atendimento.id).data_atendimento = datetime(2024, 4, 3, 9, 0) + timedelta(hours=1)
+        db.session.commit()
+        _assert_matches_rebuild()
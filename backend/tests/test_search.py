@@ -0,0 +1,83 @@
+import pytest
+
+from conftest import POSTGRES_URL, login
+from utils.seed import cpf_from_number
+
+PATIENTS = [
+    ('João da Silva', cpf_from_number(123456001), '(11) 98765-4321'),
+    ('Maria Souza', cpf_from_number(123456002), '(21) 3333-1234'),
+    ('Ana Silveira', cpf_from_number(987654003), '(31) 91234-5678'),
+]
+
+# Termos de dígitos: prefixo do CPF ou qualquer trecho do telefone (inclusive o do meio)
+TERMS = ['98765', '4321', '(11) 98765', '3333-12', '91234', PATIENTS[0][1][:7], '99999', 'silva', 'souza']
+
+BACKENDS = [
+    'fts5',
+    'like',
+    pytest.param('postgresql', marks=pytest.mark.skipif(not POSTGRES_URL, reason='TEST_POSTGRES_URL não definida')),
+]
+
+
+def _search_results(make_app, backend, monkeypatch):
+    from models import db, Patient
+    from utils import search
+
+    app = make_app(POSTGRES_URL if backend == 'postgresql' else None)
+    with app.app_context():
+        db.session.add_all(Patient(full_name=name, cpf=cpf, phone=phone) for name, cpf, phone in PATIENTS)
+        db.session.commit()
+        assert search.backend_name() in (backend, 'fts5')
+    if backend == 'like':
+        monkeypatch.setattr(search, 'backend_name', lambda: 'like')
+
+    client = app.test_client()
+    login(client)
+    results = {}
+    for term in TERMS:
+        response = client.get('/patients/api/list', query_string={'search': term})
+        assert response.status_code == 200
+        results[term] = sorted(p['full_name'] for p in response.get_json()['patients'])
+    return results
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_digit_terms_match_anywhere_in_phone(make_app, backend, monkeypatch):
+    results = _search_results(make_app, backend, monkeypatch)
+    assert results['98765'] == ['João da Silva']
+    assert results['4321'] == ['João da Silva']
+    assert results['3333-12'] == ['Maria Souza']
+    assert results['99999'] == []
+
+
+@pytest.mark.parametrize('backend', BACKENDS[1:])
+def test_backends_agree(make_app, backend, monkeypatch):
+    reference = _search_results(make_app, 'fts5', monkeypatch)
+    other = _search_results(make_app, backend, monkeypatch)
+    assert other == reference
+
+
+def test_fts_follows_edits_of_indexed_columns(make_app):
+    from models import db, Patient
+    from utils.search import apply_patient_search
+
+    app = make_app()
+    with app.app_context():
+        patient = Patient(full_name='João da Silva', cpf=PATIENTS[0][1], phone=PATIENTS[0][2])
+        db.session.add(patient)
+        db.session.commit()
+        # Só observações: o gatilho do FTS5 não dispara e o índice continua válido
+        patient.observations = 'Retorno em 30 dias'
+        db.session.commit()
+        patient.full_name = 'João Pereira'
+        db.session.commit()
+
+        def found(term):
+            return [p.full_name for p in apply_patient_search(Patient.query, term)[0]]
+
+        assert found('pereira') == ['João Pereira']
+        assert found('silva') == []
+        assert found('98765') == ['João Pereira']
+        db.session.delete(patient)
+        db.session.commit()
+        assert found('pereira') == []
@@ -0,0 +1,39 @@
+from datetime import date, datetime, time
+
+import pytest
+
+from utils.seed import cpf_from_number
+from utils.serialization import FastJSONProvider, orjson
+
+PAYLOAD = {
+    'created_at': datetime(2024, 5, 17, 14, 30, 5, 123456),
+    'birth_date': date(1990, 1, 2),
+    'start_time': time(9, 15),
+    'items': [{'nome': 'Ação', 'valor': 10.5, 'ativo': True, 'vazio': None}],
+}
+
+
+def test_datetimes_keep_the_response_format(app):
+    with app.test_request_context():
+        body = app.json.dumps(PAYLOAD)
+    assert '"2024-05-17 14:30:05"' in body
+    assert '"1990-01-02"' in body
+    assert '"09:15:00"' in body
+
+
+@pytest.mark.skipif(orjson is None, reason='orjson não instalado')
+def test_encoders_produce_the_same_json(app):
+    with app.test_request_context():
+        outputs = [FastJSONProvider(app, backend).response(PAYLOAD).get_data(as_text=True).strip()
+                   for backend in ('orjson', 'stdlib')]
+    assert outputs[0] == outputs[1]
+
+
+def test_patient_api_dates(client):
+    response = client.post('/patients/api/create', json={
+        'full_name': 'Paciente Datas', 'cpf': cpf_from_number(5150), 'phone': '(11) 98765-4321',
+        'birth_date': '1990-01-02'})
+    assert response.status_code == 201
+    patient = client.get(f"/patients/api/{response.get_json()['patient']['id']}").get_json()
+    assert patient['birth_date'] == '1990-01-02'
+    datetime.strptime(patient['created_at'], '%Y-%m-%d %H:%M:%S')
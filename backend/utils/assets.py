@@ -0,0 +1,106 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+from flask import current_app, send_from_directory, url_for
+from utils.compression import brotli, accepted_encodings
+
+MANIFEST_NAME = 'manifest.json'
+PRECOMPRESS_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.map'}
+ONE_YEAR = 365 * 24 * 3600
+
+_manifest = {'mtime': None, 'files': {}}
+
+
+def assets_folder(app=None):
+    app = app or current_app
+    return os.path.join(app.root_path, app.config['ASSETS_FOLDER'])
+
+
+def fingerprint(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def build_assets(static_folder, output_folder):
+    """Copia os arquivos de static_folder com o hash do conteúdo no nome.
+
+    Arquivos de texto também ganham cópias .gz (e .br, se brotli estiver
+    instalado). Grava manifest.json com nome original -> nome com hash.
+    """
+    manifest = {}
+    for root, _, files in os.walk(static_folder):
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            relative = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            stem, ext = os.path.splitext(relative)
+            hashed = f'{stem}.{fingerprint(source)}{ext}'
+            manifest[relative] = hashed
+
+            target = os.path.join(output_folder, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(source, 'rb') as f:
+                data = f.read()
+            with open(target, 'wb') as f:
+                f.write(data)
+            if ext.lower() in PRECOMPRESS_EXTENSIONS:
+                with open(target + '.gz', 'wb') as f:
+                    f.write(gzip.compress(data, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    with open(target + '.br', 'wb') as f:
+                        f.write(brotli.compress(data, quality=11))
+
+    with open(os.path.join(output_folder, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest():
+    """Manifesto dos assets gerados; recarregado quando o arquivo muda (novo build)"""
+    path = os.path.join(assets_folder(), MANIFEST_NAME)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    if mtime != _manifest['mtime']:
+        with open(path, encoding='utf-8') as f:
+            _manifest['files'] = json.load(f)
+        _manifest['mtime'] = mtime
+    return _manifest['files']
+
+
+def asset_url_for(endpoint, **values):
+    """url_for que troca arquivos de 'static' pela cópia com hash, quando existir"""
+    if endpoint == 'static' and 'filename' in values:
+        hashed = load_manifest().get(values['filename'])
+        if hashed:
+            values['filename'] = hashed
+            return url_for('assets', **values)
+    return url_for(endpoint, **values)
+
+
+def init_assets(app):
+    """Rota dos assets com hash (cache imutável de um ano) e url_for dos templates"""
+
+    @app.route('/assets/<path:filename>', endpoint='assets')
+    def serve_asset(filename):
+        folder = assets_folder(app)
+        for encoding in accepted_encodings():
+            suffix = '.br' if encoding == 'br' else '.gz'
+            if os.path.isfile(os.path.join(folder, filename + suffix)):
+                response = send_from_directory(folder, filename + suffix, max_age=ONE_YEAR)
+                # Mantém o tipo do original (ex.: text/css), não application/gzip
+                response.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(folder, filename, max_age=ONE_YEAR)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    # Templates existentes continuam usando url_for('static', filename=...)
+    app.jinja_env.globals['url_for'] = asset_url_for
@@ -0,0 +1,65 @@
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from models import db, Servico, CacheVersion
+
+CATALOG_NAME = 'services'
+
+# Snapshot do catálogo neste processo; a versão no banco diz quando recarregar
+_snapshot = {'version': None, 'checked_at': 0.0, 'services': [], 'by_id': {}}
+_lock = threading.Lock()
+
+
+def current_version():
+    """Versão do catálogo gravada no banco (consulta por chave primária)"""
+    version = db.session.execute(
+        db.select(CacheVersion.version).where(CacheVersion.name == CATALOG_NAME)
+    ).scalar()
+    return version or 0
+
+
+def bump_version():
+    """Incrementa a versão na transação atual; chamar antes do commit da alteração"""
+    result = db.session.execute(
+        db.update(CacheVersion)
+        .where(CacheVersion.name == CATALOG_NAME)
+        .values(version=CacheVersion.version + 1, updated_at=datetime.utcnow())
+    )
+    if result.rowcount == 0:
+        db.session.add(CacheVersion(name=CATALOG_NAME, version=1))
+    # Este processo não espera o intervalo de verificação para recarregar
+    _snapshot['checked_at'] = 0.0
+
+
+def get_catalog():
+    """Snapshot do catálogo: (versão, lista de serviços, dict por id).
+
+    A versão no banco é conferida no máximo a cada CATALOG_CHECK_SECONDS; os
+    serviços só são relidos quando ela muda, o que propaga alterações feitas
+    por outros workers sem reinício.
+    """
+    interval = current_app.config.get('CATALOG_CHECK_SECONDS', 2)
+    now = time.monotonic()
+    if _snapshot['version'] is not None and now - _snapshot['checked_at'] < interval:
+        return _snapshot['version'], _snapshot['services'], _snapshot['by_id']
+
+    with _lock:
+        version = current_version()
+        if version != _snapshot['version']:
+            services = [s.to_dict() for s in Servico.query.order_by(Servico.name, Servico.id)]
+            _snapshot.update(services=services, by_id={s['id']: s for s in services}, version=version)
+        _snapshot['checked_at'] = now
+        return _snapshot['version'], _snapshot['services'], _snapshot['by_id']
+
+
+def services_by_ids(ids):
+    """Serviços completos do snapshot para os ids informados, em ordem de nome"""
+    _, services, _ = get_catalog()
+    wanted = set(ids)
+    return [s for s in services if s['id'] in wanted]
+
+
+def catalog_etag(version):
+    return f'services-{version}'
@@ -0,0 +1,53 @@
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele, apenas gzip
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html'}
+
+
+def accepted_encodings():
+    """Codificações aceitas pelo cliente, na ordem de preferência do servidor"""
+    encodings = []
+    if brotli is not None and request.accept_encodings['br']:
+        encodings.append('br')
+    if request.accept_encodings['gzip']:
+        encodings.append('gzip')
+    return encodings
+
+
+def compress(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESS_BR_LEVEL'])
+    return gzip.compress(data, compresslevel=config['COMPRESS_GZIP_LEVEL'], mtime=0)
+
+
+def init_compression(app):
+    """Comprime respostas JSON/HTML acima de COMPRESS_MIN_SIZE (brotli ou gzip)"""
+
+    @app.after_request
+    def _compress_response(response):
+        if not app.config['COMPRESS_ENABLED'] or response.direct_passthrough or response.is_streamed:
+            return response
+        if response.status_code != 200 or 'Content-Encoding' in response.headers:
+            return response
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        encodings = accepted_encodings()
+        if len(data) < app.config['COMPRESS_MIN_SIZE'] or not encodings:
+            return response
+
+        response.set_data(compress(data, encodings[0], app.config))
+        response.headers['Content-Encoding'] = encodings[0]
+        # A representação comprimida não é idêntica byte a byte: o ETag passa a ser fraco
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,104 @@
+import hashlib
+from datetime import timezone
+from functools import wraps
+
+from flask import request, jsonify, current_app
+from models import db, Patient, Professional, Servico, CacheVersion
+from utils.rollups import upsert_increment
+
+cache_table = CacheVersion.__table__
+
+
+def deletes_key(model):
+    return f'{model.__tablename__}:deletes'
+
+
+def _count_delete(mapper, connection, target):
+    # Exclusões não mudam o max(updated_at): um contador por tabela entra na marca d'água
+    upsert_increment(connection, cache_table, {'name': deletes_key(mapper.class_)}, {'version': 1})
+
+
+for _model in (Patient, Professional, Servico):
+    db.event.listen(_model, 'after_delete', _count_delete)
+
+
+def _make_etag(*parts):
+    return hashlib.sha1('|'.join(str(p) for p in parts).encode()).hexdigest()[:20]
+
+
+def _not_modified(etag, last_modified, honor_ims):
+    """Aplica If-None-Match (prioritário) ou If-Modified-Since, como na RFC 9110"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if honor_ims and request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= request.if_modified_since
+    return False
+
+
+def _respond(view_result, etag, last_modified, honor_ims=True):
+    if _not_modified(etag, last_modified, honor_ims):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.make_response(view_result())
+        if response.status_code != 200:
+            return response
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def conditional_entity(model, id_arg, extra=None):
+    """Decorator de GET de detalhe com ETag/Last-Modified.
+
+    O 304 é respondido com uma consulta de uma coluna (updated_at por chave
+    primária), sem carregar a entidade nem chamar to_dict(). `extra` é uma
+    função opcional cujo valor também entra no ETag (ex.: versão do catálogo).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            entity_id = kwargs[id_arg]
+            found = db.session.execute(
+                db.select(model.id, model.updated_at).where(model.id == entity_id)
+            ).first()
+            if found is None:
+                return jsonify({'error': 'Recurso não encontrado'}), 404
+
+            updated_at = found.updated_at
+            # A query string (ex.: ?fields=) muda a representação, então entra no ETag
+            query_string = sorted(request.args.items(multi=True))
+            etag = _make_etag(model.__tablename__, entity_id, updated_at, query_string,
+                              extra() if extra else '')
+            return _respond(lambda: f(*args, **kwargs), etag, updated_at)
+        return decorated_function
+    return decorator
+
+
+def conditional_list(model, extra=None):
+    """Decorator de GET de listagem com ETag derivado de uma marca d'água da tabela.
+
+    A marca d'água é max(updated_at) (índice em updated_at) mais o contador de
+    exclusões da tabela; qualquer alteração invalida as listagens em cache e a
+    query string entra no ETag para distinguir páginas e buscas.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            watermark = db.session.execute(db.select(db.func.max(model.updated_at))).scalar()
+            deletes = db.session.execute(
+                db.select(CacheVersion.version).where(CacheVersion.name == deletes_key(model))
+            ).scalar() or 0
+            query_string = sorted(request.args.items(multi=True))
+            etag = _make_etag(model.__tablename__, watermark, deletes, query_string, extra() if extra else '')
+            # Exclusões não movem a data: listagens só respondem 304 por ETag
+            return _respond(lambda: f(*args, **kwargs), etag, watermark, honor_ims=False)
+        return decorated_function
+    return decorator
+
+
+def catalog_version():
+    """Versão do catálogo de serviços, para respostas que embutem dados de serviços"""
+    from utils.catalog import get_catalog
+    return get_catalog()[0]
@@ -0,0 +1,64 @@
+from utils.normalize import only_digits
+
+# O CPF é guardado como inteiro de 11 dígitos (cpf_number): a máscara só existe na saída
+CPF_DIGITS = 11
+
+
+def validate_cpf(cpf):
+    """Valida CPF brasileiro (com ou sem máscara)"""
+    cpf = only_digits(str(cpf))
+
+    # Verifica se tem 11 dígitos e se não são todos iguais
+    if len(cpf) != CPF_DIGITS or cpf == cpf[0] * CPF_DIGITS:
+        return False
+
+    # Dígitos verificadores
+    sum_1 = sum(int(cpf[i]) * (10 - i) for i in range(9))
+    digit_1 = (sum_1 * 10 % 11) % 10
+    sum_2 = sum(int(cpf[i]) * (11 - i) for i in range(10))
+    digit_2 = (sum_2 * 10 % 11) % 10
+    return cpf[-2:] == f'{digit_1}{digit_2}'
+
+
+def cpf_number(cpf):
+    """'000.000.001-91', '00000000191' ou 191 -> 191 (chave canônica); None se não tiver 11 dígitos"""
+    if isinstance(cpf, int):
+        return cpf if 0 <= cpf < 10 ** CPF_DIGITS else None
+    digits = only_digits(cpf)
+    return int(digits) if len(digits) == CPF_DIGITS else None
+
+
+def parse_cpf(cpf):
+    """Chave canônica de um CPF válido; lança ValueError se inválido"""
+    number = cpf_number(cpf)
+    if number is None or not validate_cpf(cpf_digits(number)):
+        raise ValueError('CPF inválido')
+    return number
+
+
+def cpf_digits(number):
+    """191 -> '00000000191'"""
+    return f'{number:0{CPF_DIGITS}d}'
+
+
+def format_cpf(cpf):
+    """Formata para o padrão 000.000.000-00 (aceita inteiro, dígitos ou máscara)"""
+    if cpf is None:
+        return None
+    digits = cpf_digits(cpf) if isinstance(cpf, int) else only_digits(cpf)
+    if len(digits) == CPF_DIGITS:
+        return f'{digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]}'
+    return digits
+
+
+def cpf_prefix_range(digits):
+    """Faixa [início, fim] de cpf_number dos CPFs que começam com `digits` (busca por prefixo).
+
+    '123456' -> (12345600000, 12345699999): uma varredura de faixa no índice
+    único, sem LIKE sobre texto. Retorna None para prefixos vazios ou longos demais.
+    """
+    if not digits or len(digits) > CPF_DIGITS:
+        return None
+    scale = 10 ** (CPF_DIGITS - len(digits))
+    start = int(digits) * scale
+    return start, start + scale - 1
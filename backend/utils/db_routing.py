@@ -0,0 +1,101 @@
+import time
+from functools import wraps
+
+from flask import g, session, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+REPLICA_BIND = 'replica'
+
+
+def build_engine_options(uri, config, bind='default'):
+    """Opções do engine (pool, pre-ping, timeout por statement) a partir da configuração"""
+    options = {'pool_pre_ping': config['DB_POOL_PRE_PING']}
+    url = make_url(uri)
+
+    # SQLite em memória usa um pool de conexão única que não aceita dimensionamento
+    if not (url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')):
+        options.update(
+            pool_size=config['DB_POOL_SIZE'],
+            max_overflow=config['DB_MAX_OVERFLOW'],
+            pool_timeout=config['DB_POOL_TIMEOUT'],
+            pool_recycle=config['DB_POOL_RECYCLE'],
+        )
+        if config.get('METRICS_ENABLED'):
+            # Mesmo QueuePool, medindo a espera por conexão para /metrics
+            from utils.metrics import instrumented_pool
+            options['poolclass'] = instrumented_pool(bind)
+
+    timeout_ms = config['DB_STATEMENT_TIMEOUT_MS']
+    if timeout_ms and url.get_backend_name() == 'postgresql':
+        options['connect_args'] = {'options': f'-c statement_timeout={int(timeout_ms)}'}
+    return options
+
+
+def configure_database(app):
+    """Define SQLALCHEMY_ENGINE_OPTIONS e o bind da réplica antes de db.init_app"""
+    config = app.config
+    config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', build_engine_options(config['SQLALCHEMY_DATABASE_URI'], config))
+
+    replica_url = config.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+        binds[REPLICA_BIND] = {'url': replica_url, **build_engine_options(replica_url, config, REPLICA_BIND)}
+        config['SQLALCHEMY_BINDS'] = binds
+
+
+def _replica_requested():
+    return has_request_context() and g.get('db_use_replica', False)
+
+
+class RoutingSession(Session):
+    """Sessão que envia leituras das rotas marcadas com @use_replica para a réplica.
+
+    Escritas (flush) sempre vão para o primário, mesmo dentro dessas rotas.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _replica_requested():
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def use_replica(f):
+    """Decorator para GETs somente leitura que podem ser servidos pela réplica.
+
+    Depois de uma escrita do próprio usuário, as leituras continuam no primário
+    por REPLICA_STICKY_SECONDS (read-your-writes), controlado pelo cookie de sessão.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        sticky_until = session.get('_db_primary_until', 0)
+        g.db_use_replica = sticky_until < time.time()
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_flush_write(db_session, flush_context):
+    # Marca a requisição que gravou algo, para fixar o usuário no primário
+    if has_request_context() and (db_session.new or db_session.dirty or db_session.deleted):
+        g.db_wrote = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _mark_bulk_write(orm_execute_state):
+    if has_request_context() and (orm_execute_state.is_insert or orm_execute_state.is_update
+                                  or orm_execute_state.is_delete):
+        g.db_wrote = True
+
+
+def init_replica_routing(app):
+    """Grava no cookie de sessão até quando as leituras devem ficar no primário"""
+
+    @app.after_request
+    def _stick_to_primary(response):
+        if g.get('db_wrote') and app.config.get('DATABASE_REPLICA_URL'):
+            session['_db_primary_until'] = time.time() + app.config['REPLICA_STICKY_SECONDS']
+        return response
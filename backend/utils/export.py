@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+from datetime import datetime, date, time
+from itertools import groupby
+
+from flask import Response, stream_with_context
+from models import db, Patient, Professional, Atendimento, Servico, atendimento_servicos
+from utils.cpf import format_cpf
+
+PATIENT_FIELDS = ['id', 'full_name', 'cpf', 'birth_date', 'phone', 'musical_preference',
+                  'observations', 'created_at', 'updated_at']
+
+ATENDIMENTO_FIELDS = ['id', 'data_atendimento', 'patient_id', 'patient_name', 'professional_id',
+                      'professional_name', 'valor_cobrado', 'servico_ids', 'servicos', 'anotacoes']
+
+# Linhas por ida ao banco (cursor no servidor) e por pedaço escrito na resposta
+BATCH_SIZE = 1000
+
+
+def parse_date_range(start, end):
+    """Converte datas 'YYYY-MM-DD' em limites inclusivos de datetime; lança ValueError"""
+    start_dt = datetime.combine(date.fromisoformat(start), time.min) if start else None
+    end_dt = datetime.combine(date.fromisoformat(end), time.max) if end else None
+    return start_dt, end_dt
+
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+def patient_rows(start=None, end=None):
+    """Gera os pacientes como dicts planos, lendo em lotes por cursor no servidor"""
+    columns = [getattr(Patient, Patient.FIELD_COLUMNS.get(f, f)) for f in PATIENT_FIELDS]
+    stmt = db.select(*columns).order_by(Patient.id)
+    if start:
+        stmt = stmt.where(Patient.created_at >= start)
+    if end:
+        stmt = stmt.where(Patient.created_at <= end)
+
+    for row in db.session.execute(stmt.execution_options(yield_per=BATCH_SIZE)):
+        record = {field: _format_value(value) for field, value in zip(PATIENT_FIELDS, row)}
+        record['cpf'] = format_cpf(record['cpf'])
+        yield record
+
+
+def atendimento_rows(start=None, end=None, professional_id=None):
+    """Gera os atendimentos com nomes e serviços em uma única consulta em streaming.
+
+    A consulta traz uma linha por serviço, ordenada por atendimento; as linhas
+    consecutivas do mesmo atendimento são agrupadas aqui.
+    """
+    stmt = (
+        db.select(
+            Atendimento.id, Atendimento.data_atendimento, Atendimento.patient_id,
+            Patient.full_name, Atendimento.professional_id, Professional.full_name,
+            Atendimento.valor_cobrado, Atendimento.anotacoes, Servico.id, Servico.name
+        )
+        .join(Patient, Patient.id == Atendimento.patient_id)
+        .join(Professional, Professional.id == Atendimento.professional_id)
+        .outerjoin(atendimento_servicos, atendimento_servicos.c.atendimento_id == Atendimento.id)
+        .outerjoin(Servico, Servico.id == atendimento_servicos.c.servico_id)
+        .order_by(Atendimento.id, Servico.id)
+    )
+    if start:
+        stmt = stmt.where(Atendimento.data_atendimento >= start)
+    if end:
+        stmt = stmt.where(Atendimento.data_atendimento <= end)
+    if professional_id:
+        stmt = stmt.where(Atendimento.professional_id == professional_id)
+
+    result = db.session.execute(stmt.execution_options(yield_per=BATCH_SIZE))
+    for _, group in groupby(result, key=lambda row: row[0]):
+        group = list(group)
+        first = group[0]
+        services = [(row[8], row[9]) for row in group if row[8] is not None]
+        yield {
+            'id': first[0],
+            'data_atendimento': _format_value(first[1]),
+            'patient_id': first[2],
+            'patient_name': first[3],
+            'professional_id': first[4],
+            'professional_name': first[5],
+            'valor_cobrado': first[6],
+            'servico_ids': [service_id for service_id, _ in services],
+            'servicos': [name for _, name in services],
+            'anotacoes': first[7]
+        }
+
+
+def iter_csv(rows, fields):
+    """Escreve as linhas como CSV incrementalmente, em pedaços de BATCH_SIZE linhas"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for i, row in enumerate(rows, start=1):
+        writer.writerow([
+            '|'.join(str(v) for v in row[f]) if isinstance(row[f], list) else row[f]
+            for f in fields
+        ])
+        if i % BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows):
+    """Escreve as linhas como NDJSON incrementalmente"""
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(row, ensure_ascii=False))
+        if len(chunk) >= BATCH_SIZE:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+
+def iter_export(rows, fields, fmt):
+    return iter_ndjson(rows) if fmt == 'ndjson' else iter_csv(rows, fields)
+
+
+def export_response(rows, fields, fmt, basename):
+    """Resposta HTTP em streaming: a memória não cresce com o tamanho da exportação"""
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'text/csv'
+    filename = f'{basename}-{datetime.now():%Y%m%d-%H%M%S}.{fmt}'
+    return Response(
+        stream_with_context(iter_export(rows, fields, fmt)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
@@ -0,0 +1,115 @@
+import threading
+import time
+
+from flask import current_app
+from models import db, User, Professional, ROLE_PERMISSIONS
+
+# Campos de User que, ao mudar, incrementam auth_version e derrubam as sessões antigas
+AUTH_FIELDS = ('password_hash', 'is_active', 'role', 'professional_id')
+
+# user_id -> (Principal, expira_em); cache deste processo
+_principals = {}
+_lock = threading.Lock()
+
+
+class Principal:
+    """Identidade autenticada em cache: o que as rotas e templates leem de current_user.
+
+    Não é uma instância do ORM; para alterar o usuário, carregue User pelo id.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user):
+        self.id = user.id
+        self.username = user.username
+        self.full_name = user.full_name
+        self.email = user.email
+        self.role = user.role
+        self.is_active = bool(user.is_active)
+        self.professional_id = user.professional_id
+        self.auth_version = user.auth_version
+        self.permissions = ROLE_PERMISSIONS.get(user.role, frozenset())
+
+    def get_id(self):
+        return identity_token(self.id, self.auth_version)
+
+    def has_permission(self, permission):
+        return 'all' in self.permissions or permission in self.permissions
+
+    @property
+    def professional(self):
+        # session.get usa o identity map: repetido na mesma requisição não consulta de novo
+        if self.professional_id:
+            return db.session.get(Professional, self.professional_id)
+        return None
+
+    def __repr__(self):
+        return f'<Principal {self.username}>'
+
+
+def identity_token(user_id, auth_version):
+    """Identidade gravada pelo Flask-Login na sessão e no cookie "lembrar-me": "id:auth_version".
+
+    Com a versão dentro do próprio token, um cookie emitido antes de uma troca de
+    senha, desativação ou mudança de papel deixa de valer, mesmo sem sessão.
+    """
+    return f'{user_id}:{auth_version}'
+
+
+def invalidate(user_id):
+    with _lock:
+        _principals.pop(user_id, None)
+
+
+def get_principal(user_id):
+    """Principal do usuário, do cache (até IDENTITY_CACHE_TTL segundos) ou do banco"""
+    now = time.monotonic()
+    cached = _principals.get(user_id)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        invalidate(user_id)
+        return None
+    principal = Principal(user)
+    with _lock:
+        _principals[user_id] = (principal, now + current_app.config['IDENTITY_CACHE_TTL'])
+    return principal
+
+
+def load_principal(token):
+    """user_loader do Flask-Login: sem consultas enquanto o principal estiver em cache.
+
+    Sessões e cookies "lembrar-me" emitidos antes de um incremento de
+    auth_version (troca de senha, desativação, mudança de papel) deixam de
+    valer; tokens sem versão (formato antigo, só o id) também.
+    """
+    user_id, _, version = token.partition(':')
+    if not (user_id.isdigit() and version.isdigit()):
+        return None
+    user_id, version = int(user_id), int(version)
+    principal = get_principal(user_id)
+    if principal is not None and version > principal.auth_version:
+        # Login feito depois que este processo guardou o principal: o cache está velho
+        invalidate(user_id)
+        principal = get_principal(user_id)
+    if principal is None or not principal.is_active or version != principal.auth_version:
+        return None
+    return principal
+
+
+@db.event.listens_for(User, 'before_update')
+def _bump_auth_version(mapper, connection, target):
+    state = db.inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in AUTH_FIELDS):
+        target.auth_version = (target.auth_version or 0) + 1
+
+
+@db.event.listens_for(User, 'after_update')
+@db.event.listens_for(User, 'after_delete')
+def _evict_principal(mapper, connection, target):
+    # Outros processos percebem a mudança quando o TTL do cache deles expira
+    invalidate(target.id)
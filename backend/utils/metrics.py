@@ -0,0 +1,362 @@
+import hmac
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem flock, cada processo publica apenas os próprios valores
+    fcntl = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+CHECKOUT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# nome -> (tipo, descrição, faixas do histograma)
+METRICS = {
+    'http_requests_total': ('counter', 'Requisições por endpoint, método e status', None),
+    'http_request_duration_seconds': ('histogram', 'Latência das requisições por endpoint', LATENCY_BUCKETS),
+    'http_request_db_statements': ('histogram', 'Statements SQL executados por requisição', STATEMENT_BUCKETS),
+    'http_request_db_duration_seconds': ('histogram', 'Tempo em SQL por requisição', LATENCY_BUCKETS),
+    'db_pool_checkouts_total': ('counter', 'Conexões retiradas do pool', None),
+    'db_pool_checkout_seconds': ('histogram', 'Espera por uma conexão do pool (fila ou nova conexão)',
+                                 CHECKOUT_BUCKETS),
+    'db_pool_timeouts_total': ('counter', 'Retiradas do pool que estouraram DB_POOL_TIMEOUT', None),
+    'db_pool_checked_out': ('gauge', 'Conexões em uso agora (soma dos processos vivos)', None),
+}
+
+# Rótulo "le" de cada faixa, já formatado (a última é +Inf)
+_LE = {name: [repr(float(b)) for b in spec[2]] + ['+Inf'] for name, spec in METRICS.items() if spec[2]}
+
+_store = None
+
+
+def _histogram(name, labels, value):
+    """Incrementos de uma observação: faixa (não cumulativa), soma e contagem"""
+    le = _LE[name][bisect_left(METRICS[name][2], value)]
+    return [((f'{name}_bucket', labels + (('le', le),)), 1),
+            ((f'{name}_sum', labels), value),
+            ((f'{name}_count', labels), 1)]
+
+
+# ===== VALORES POR PROCESSO =====
+
+class ProcessValues:
+    """Valores deste processo em um arquivo mapeado só dele (<dir>/<pid>-<ns>.bin).
+
+    Cada processo grava apenas no próprio arquivo, sem flock: o custo por
+    requisição é um lock de thread e algumas escritas de double no mmap. O
+    arquivo é uma sequência de registros (tamanho da chave, chave JSON, valor)
+    e o cabeçalho guarda os bytes em uso, atualizado depois de cada registro
+    novo para que a coleta nunca leia um registro pela metade.
+    """
+
+    HEADER = struct.Struct('<Q')
+    KEY_SIZE = struct.Struct('<I')
+    VALUE = struct.Struct('<d')
+    INITIAL_SIZE = 64 * 1024
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        # Após o fork, o worker cria o próprio arquivo; o do mestre fica com os valores do mestre
+        if self._pid == os.getpid():
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f'{os.getpid()}-{time.time_ns()}.bin')
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o600)
+        os.ftruncate(self._fd, self.INITIAL_SIZE)
+        self._map = mmap.mmap(self._fd, self.INITIAL_SIZE)
+        self._used = self.HEADER.size
+        self.HEADER.pack_into(self._map, 0, self._used)
+        self._offsets = {}
+        self._pid = os.getpid()
+
+    def _append(self, key):
+        encoded = json.dumps(key).encode()
+        key_end = self._used + self.KEY_SIZE.size + len(encoded)
+        value_offset = key_end + (-key_end % 8)
+        end = value_offset + self.VALUE.size
+        if end > len(self._map):
+            size = len(self._map)
+            while size < end:
+                size *= 2
+            os.ftruncate(self._fd, size)
+            self._map.resize(size)
+        self.KEY_SIZE.pack_into(self._map, self._used, len(encoded))
+        self._map[self._used + self.KEY_SIZE.size:key_end] = encoded
+        self.VALUE.pack_into(self._map, value_offset, 0.0)
+        self._used = end
+        self.HEADER.pack_into(self._map, 0, end)
+        self._offsets[key] = value_offset
+        return value_offset
+
+    def update(self, increments=(), gauges=()):
+        """Soma os incrementos e define os gauges em uma única seção crítica"""
+        with self._lock:
+            self._open()
+            buf, value = self._map, self.VALUE
+            for key, amount in increments:
+                offset = self._offsets.get(key) or self._append(key)
+                value.pack_into(buf, offset, value.unpack_from(buf, offset)[0] + amount)
+            for key, amount in gauges:
+                value.pack_into(buf, self._offsets.get(key) or self._append(key), amount)
+
+    @classmethod
+    def read(cls, path):
+        """{(nome, rótulos): valor} de um arquivo de processo"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < cls.HEADER.size:
+            return {}
+        used = min(cls.HEADER.unpack_from(data, 0)[0], len(data))
+        values, offset = {}, cls.HEADER.size
+        while offset < used:
+            length = cls.KEY_SIZE.unpack_from(data, offset)[0]
+            key_end = offset + cls.KEY_SIZE.size + length
+            name, labels = json.loads(data[offset + cls.KEY_SIZE.size:key_end])
+            value_offset = key_end + (-key_end % 8)
+            values[(name, tuple(map(tuple, labels)))] = cls.VALUE.unpack_from(data, value_offset)[0]
+            offset = value_offset + cls.VALUE.size
+        return values
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _is_gauge(key):
+    return METRICS.get(key[0], ('',))[0] == 'gauge'
+
+
+def collect(directory, own_path=None):
+    """Soma os valores de todos os processos do diretório.
+
+    Arquivos de processos encerrados têm os contadores e histogramas somados em
+    archive.json (para que não voltem a zero) e são removidos; gauges só contam
+    para processos vivos. A coleta segura um flock no diretório.
+    """
+    totals = defaultdict(float)
+    if not os.path.isdir(directory):
+        return totals
+    archive_path = os.path.join(directory, 'archive.json')
+    lock_fd = os.open(os.path.join(directory, '.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        archive = defaultdict(float)
+        if os.path.exists(archive_path):
+            with open(archive_path) as f:
+                for name, labels, value in json.load(f):
+                    archive[(name, tuple(map(tuple, labels)))] = value
+        archived = False
+
+        for filename in os.listdir(directory):
+            if not filename.endswith('.bin'):
+                continue
+            path = os.path.join(directory, filename)
+            pid = int(filename.split('-', 1)[0])
+            values = ProcessValues.read(path)
+            # Arquivo antigo com o mesmo pid deste processo: pid reaproveitado, processo já encerrado
+            alive = path == own_path if pid == os.getpid() else _alive(pid)
+            if alive:
+                for key, value in values.items():
+                    totals[key] += value
+            else:
+                for key, value in values.items():
+                    if not _is_gauge(key):
+                        archive[key] += value
+                os.unlink(path)
+                archived = True
+
+        if archived:
+            temporary = archive_path + '.tmp'
+            with open(temporary, 'w') as f:
+                json.dump([[name, labels, value] for (name, labels), value in archive.items()], f)
+            os.replace(temporary, archive_path)
+        for key, value in archive.items():
+            totals[key] += value
+    finally:
+        os.close(lock_fd)
+    return totals
+
+
+def reset(directory):
+    """Apaga os valores de execuções anteriores do servidor (no mestre, antes dos workers).
+
+    Contadores do Prometheus recomeçam do zero a cada reinício. Arquivos de
+    processos ainda vivos (o próprio mestre, se já usou o banco no preload) ficam.
+    """
+    if not os.path.isdir(directory):
+        return
+    for filename in os.listdir(directory):
+        if filename.endswith('.bin'):
+            if _alive(int(filename.split('-', 1)[0])):
+                continue
+        elif not filename.startswith('archive.json'):
+            continue
+        os.unlink(os.path.join(directory, filename))
+
+
+# ===== FORMATO TEXTO DO PROMETHEUS =====
+
+def _format_number(value):
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def render(totals):
+    """Exposição em text/plain; version=0.0.4, com faixas de histograma cumulativas"""
+    series = defaultdict(dict)
+    for (name, labels), value in totals.items():
+        series[name][labels] = value
+
+    lines = []
+    for name, (kind, description, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind != 'histogram':
+            for labels, value in sorted(series[name].items()):
+                lines.append(f'{name}{_format_labels(labels)} {_format_number(value)}')
+            continue
+        bucket_values = series[f'{name}_bucket']
+        for labels, count in sorted(series[f'{name}_count'].items()):
+            cumulative = 0.0
+            for le in _LE[name]:
+                cumulative += bucket_values.get(labels + (('le', le),), 0.0)
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", le),))} {_format_number(cumulative)}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_number(series[f"{name}_sum"][labels])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {_format_number(count)}')
+    return '\n'.join(lines) + '\n'
+
+
+# ===== INSTRUMENTAÇÃO =====
+
+def instrumented_pool(bind):
+    """QueuePool que mede a espera por conexão e publica as conexões em uso do bind"""
+
+    class InstrumentedQueuePool(QueuePool):
+        metrics_bind = bind
+
+        def _do_get(self):
+            labels = (('bind', self.metrics_bind),)
+            started = time.perf_counter()
+            try:
+                record = super()._do_get()
+            except PoolTimeoutError:
+                if _store is not None:
+                    _store.update([(('db_pool_timeouts_total', labels), 1)])
+                raise
+            if _store is not None:
+                _store.update(
+                    [(('db_pool_checkouts_total', labels), 1)]
+                    + _histogram('db_pool_checkout_seconds', labels, time.perf_counter() - started),
+                    [(('db_pool_checked_out', labels), self.checkedout())]
+                )
+            return record
+
+        def _do_return_conn(self, record):
+            super()._do_return_conn(record)
+            if _store is not None:
+                _store.update(gauges=[(('db_pool_checked_out', (('bind', self.metrics_bind),)),
+                                       self.checkedout())])
+
+    return InstrumentedQueuePool
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _statement_started(conn, cursor, statement, parameters, context, executemany):
+    if _store is not None and context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _statement_finished(conn, cursor, statement, parameters, context, executemany):
+    if _store is None or context is None or not has_request_context():
+        return
+    started = getattr(context, '_metrics_started', None)
+    if started is None:
+        return
+    stats = g.get('_metrics_sql')
+    if stats is None:
+        stats = g._metrics_sql = [0, 0.0]
+    stats[0] += 1
+    stats[1] += time.perf_counter() - started
+
+
+def metrics_authorized():
+    """Com METRICS_TOKEN, exige o Bearer; sem ele, nega, salvo o próprio host com METRICS_ALLOW_LOCAL"""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        scheme, _, provided = request.headers.get('Authorization', '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(provided.encode(), token.encode())
+    return bool(current_app.config.get('METRICS_ALLOW_LOCAL')) and request.remote_addr in ('127.0.0.1', '::1')
+
+
+def init_metrics(app):
+    """Registra latência, status e SQL por requisição e publica tudo em /metrics"""
+    global _store
+    if not app.config['METRICS_ENABLED']:
+        return
+    directory = app.config['METRICS_DIR'] or os.path.join(app.instance_path, 'metrics')
+    _store = app.extensions['metrics'] = ProcessValues(directory)
+
+    # Primeiro before_request e último after_request: a medida cobre os demais hooks
+    @app.before_request
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+    app.before_request_funcs[None].insert(0, app.before_request_funcs[None].pop())
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('_metrics_started', None)
+        if started is None or _store is None:
+            return response
+        # Sem regra (404/405) agrupa em "unmatched" para não criar uma série por URL
+        labels = (('endpoint', request.endpoint or 'unmatched'), ('method', request.method))
+        statements, sql_seconds = g.pop('_metrics_sql', None) or (0, 0.0)
+        _store.update(
+            [(('http_requests_total', labels + (('status', str(response.status_code)),)), 1)]
+            + _histogram('http_request_duration_seconds', labels, time.perf_counter() - started)
+            + _histogram('http_request_db_statements', labels, statements)
+            + _histogram('http_request_db_duration_seconds', labels, sql_seconds)
+        )
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        if not metrics_authorized():
+            return Response('Acesso negado\n', status=403, mimetype='text/plain')
+        body = render(collect(directory, _store.path if _store._pid == os.getpid() else None))
+        return Response(body, content_type='text/plain; version=0.0.4; charset=utf-8',
+                        headers={'Cache-Control': 'no-store'})
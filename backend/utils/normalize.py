@@ -0,0 +1,14 @@
+import re
+import unicodedata
+
+def only_digits(value):
+    """Remove tudo que não for dígito"""
+    return re.sub(r'[^0-9]', '', value or '')
+
+def normalize_name(value):
+    """Normaliza nomes para busca: sem acentos, minúsculo e espaços simples"""
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', value)
+    without_accents = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(without_accents.lower().split())
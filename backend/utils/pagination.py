@@ -0,0 +1,166 @@
+import base64
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+
+from flask import request, current_app
+from models import db
+
+# Cache LRU de contagens por processo: chave -> (expira_em, total), no máximo
+# COUNT_CACHE_SIZE chaves (cada ?search= distinto é uma chave)
+_count_cache = OrderedDict()
+_count_lock = threading.Lock()
+
+
+class InvalidCursor(ValueError):
+    """Cursor de paginação malformado ou incompatível com a listagem"""
+
+
+def encode_cursor(values):
+    """Codifica os valores da chave de ordenação em um cursor opaco"""
+    payload = [v.isoformat() if isinstance(v, (datetime, date)) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, columns):
+    """Decodifica um cursor opaco de volta para os valores tipados das colunas"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor('Cursor inválido')
+
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise InvalidCursor('Cursor inválido')
+
+    decoded = []
+    for column, value in zip(columns, values):
+        python_type = column.type.python_type
+        try:
+            if value is not None and python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif value is not None and python_type is date:
+                value = date.fromisoformat(value)
+        except (ValueError, TypeError):
+            raise InvalidCursor('Cursor inválido')
+        decoded.append(value)
+    return decoded
+
+
+def _keyset_filter(keyset, values):
+    """Monta o filtro "linha depois do cursor" sem depender de row values do banco"""
+    clauses = []
+    for i, (column, direction) in enumerate(keyset):
+        op = column < values[i] if direction == 'desc' else column > values[i]
+        equals = [keyset[j][0] == values[j] for j in range(i)]
+        clauses.append(db.and_(*equals, op) if equals else op)
+    return db.or_(*clauses)
+
+
+def _order_clauses(keyset):
+    return [column.desc() if direction == 'desc' else column.asc() for column, direction in keyset]
+
+
+def _cursor_for(item, keyset):
+    return encode_cursor([getattr(item, column.key) for column, _ in keyset])
+
+
+def keyset_page(query, keyset, after, per_page):
+    """Busca uma página por cursor: filtra depois de `after` e lê per_page + 1 linhas"""
+    if after:
+        columns = [column for column, _ in keyset]
+        query = query.filter(_keyset_filter(keyset, decode_cursor(after, columns)))
+    rows = query.order_by(*_order_clauses(keyset)).limit(per_page + 1).all()
+    items = rows[:per_page]
+    has_more = len(rows) > per_page
+    return {
+        'items': items,
+        'per_page': per_page,
+        'has_more': has_more,
+        'next_cursor': _cursor_for(items[-1], keyset) if has_more else None
+    }
+
+
+def estimated_count(query, count_key, filtered):
+    """Total aproximado: estatística do PostgreSQL ou contagem em cache por alguns segundos"""
+    if not filtered and db.engine.dialect.name == 'postgresql':
+        table = query.column_descriptions[0]['entity'].__table__.name
+        estimate = db.session.execute(
+            db.text('SELECT reltuples::bigint FROM pg_class WHERE relname = :table'),
+            {'table': table}
+        ).scalar()
+        if estimate is not None and estimate >= 0:
+            return int(estimate)
+
+    ttl = current_app.config.get('COUNT_CACHE_TTL', 60)
+    now = time.monotonic()
+    with _count_lock:
+        cached = _count_cache.get(count_key)
+        if cached and cached[0] > now:
+            _count_cache.move_to_end(count_key)
+            return cached[1]
+
+    total = query.order_by(None).count()
+    _store_count(count_key, now + ttl, total, current_app.config.get('COUNT_CACHE_SIZE', 1024))
+    return total
+
+
+def _store_count(count_key, expires_at, total, max_size):
+    """Grava a contagem e descarta as vencidas e, acima do limite, as menos usadas"""
+    with _count_lock:
+        _count_cache[count_key] = expires_at, total
+        _count_cache.move_to_end(count_key)
+        now = time.monotonic()
+        for key in [key for key, (expires, _) in _count_cache.items() if expires <= now]:
+            del _count_cache[key]
+        while len(_count_cache) > max_size:
+            _count_cache.popitem(last=False)
+
+
+def paginate_list(query, keyset, count_key, filtered=False, ranking=None):
+    """Pagina uma listagem por cursor (?after=) ou pelo contrato antigo page/per_page.
+
+    O modo de contagem vem de ?count=exact|estimate|none. No modo página o
+    padrão continua sendo a contagem exata; no modo cursor nenhuma contagem é
+    feita a menos que pedida. Resultados ordenados por relevância (ranking)
+    não têm chave estável e usam sempre o modo página.
+    """
+    per_page = max(min(request.args.get('per_page', 10, type=int), 100), 1)  # Máximo 100 por página
+    after = request.args.get('after')
+    cursor_mode = after is not None and ranking is None
+    count_mode = request.args.get('count', 'none' if cursor_mode else 'exact')
+
+    if cursor_mode:
+        result = keyset_page(query, keyset, after, per_page)
+        if count_mode == 'exact':
+            result['total'] = query.order_by(None).count()
+        elif count_mode == 'estimate':
+            result['total'] = estimated_count(query, count_key, filtered)
+        return result
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    order = _order_clauses(keyset) if ranking is None else [ranking, *_order_clauses(keyset)]
+    pagination = query.order_by(*order).paginate(
+        page=page, per_page=per_page, error_out=False, count=count_mode == 'exact'
+    )
+
+    if count_mode == 'exact':
+        total = pagination.total
+    elif count_mode == 'estimate':
+        total = estimated_count(query, count_key, filtered)
+    else:
+        total = None
+
+    items = pagination.items
+    return {
+        'items': items,
+        'total': total,
+        'pages': int(math.ceil(total / per_page)) if total else 0,
+        'current_page': page,
+        'per_page': per_page,
+        'next_cursor': _cursor_for(items[-1], keyset) if ranking is None and len(items) == per_page else None
+    }
@@ -0,0 +1,157 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+# Parâmetros padrão de cada família, para comparar políticas escritas de forma abreviada
+_DEFAULTS = {
+    'scrypt': ['32768', '8', '1'],
+    'pbkdf2': ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)],
+    'bcrypt': ['12'],
+}
+
+_pool = {'executor': None, 'slots': None}
+_pool_lock = threading.Lock()
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Fila de verificação de senhas cheia ou lenta demais"""
+
+
+def normalize_method(method):
+    """Política completa: 'scrypt' -> 'scrypt:32768:8:1', 'bcrypt' -> 'bcrypt:12'"""
+    family, *params = method.split(':')
+    if family not in _DEFAULTS:
+        raise ValueError(f'Política de hash de senha desconhecida: {method}')
+    defaults = _DEFAULTS[family]
+    return ':'.join([family] + params + defaults[len(params):])
+
+
+def configured_method():
+    return normalize_method(current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def hash_password(password, method=None):
+    """Gera o hash com a política informada (padrão: PASSWORD_HASH_METHOD)"""
+    method = normalize_method(method) if method else configured_method()
+    if method.startswith('bcrypt:'):
+        import bcrypt
+        rounds = int(method.split(':')[1])
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('ascii')
+    return generate_password_hash(password, method=method)
+
+
+def stored_method(password_hash):
+    """Política com que um hash armazenado foi gerado"""
+    if password_hash.startswith('$2'):
+        return f"bcrypt:{int(password_hash.split('$')[2])}"
+    return normalize_method(password_hash.split('$', 1)[0])
+
+
+def check_password(password_hash, password):
+    if password_hash.startswith('$2'):
+        import bcrypt
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('ascii'))
+    return check_password_hash(password_hash, password)
+
+
+def needs_rehash(password_hash, method=None):
+    """True quando o hash armazenado não segue a política atual"""
+    target = normalize_method(method) if method else configured_method()
+    try:
+        return stored_method(password_hash) != target
+    except (ValueError, IndexError):
+        return True
+
+
+# ===== EXECUÇÃO LIMITADA =====
+
+def _reset_pool():
+    # As threads do pool não sobrevivem ao fork (servidor com preload): o worker cria o seu
+    global _pool_lock
+    _pool['executor'] = _pool['slots'] = None
+    _pool_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pool)
+
+
+def _gevent_active():
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('threading')
+
+
+def _executor():
+    # Criado sob demanda: em servidores com fork, cada worker tem o seu
+    if _pool['executor'] is None:
+        with _pool_lock:
+            if _pool['executor'] is None:
+                config = current_app.config
+                workers = config['PASSWORD_HASH_WORKERS']
+                callers = workers + config['PASSWORD_HASH_QUEUE']
+                if _gevent_active():
+                    # Com o monkey patch o ThreadPoolExecutor roda em greenlets e o KDF
+                    # travaria o loop: usa threads reais do gevent. Esperar não ocupa thread.
+                    from gevent.threadpool import ThreadPool
+                    executor = ThreadPool(workers)
+                else:
+                    # Cada chamada em espera segura uma thread de requisição do worker:
+                    # sempre sobra ao menos uma para as outras rotas
+                    callers = min(callers, max(config['WEB_THREADS'] - 1, 1))
+                    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+                _pool['slots'] = threading.BoundedSemaphore(callers)
+                _pool['executor'] = executor
+    return _pool['executor'], _pool['slots']
+
+
+def run_bounded(fn, *args):
+    """Executa um hash/verificação no pool dedicado, sem passar do limite de fila.
+
+    Uma rajada de logins não ocupa mais que PASSWORD_HASH_WORKERS núcleos com o
+    KDF; acima de PASSWORD_HASH_QUEUE esperas (no gthread, de WEB_THREADS - 1
+    chamadas), ou após PASSWORD_HASH_TIMEOUT segundos, lança PasswordHasherBusy
+    em vez de segurar o worker da aplicação.
+    """
+    executor, slots = _executor()
+    if not slots.acquire(blocking=False):
+        raise PasswordHasherBusy('Fila de verificação de senhas cheia')
+    timeout = current_app.config['PASSWORD_HASH_TIMEOUT']
+    if not isinstance(executor, ThreadPoolExecutor):
+        return _run_gevent(executor, slots, timeout, fn, *args)
+    try:
+        future = executor.submit(fn, *args)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        raise PasswordHasherBusy('Verificação de senha excedeu o tempo limite')
+
+
+def _run_gevent(pool, slots, timeout, fn, *args):
+    from gevent import Timeout
+    try:
+        result = pool.spawn(fn, *args)
+    except Exception:
+        slots.release()
+        raise
+    result.rawlink(lambda _: slots.release())
+    try:
+        return result.get(timeout=timeout)
+    except Timeout:
+        raise PasswordHasherBusy('Verificação de senha excedeu o tempo limite')
+
+
+def verify_password_bounded(password_hash, password):
+    return run_bounded(check_password, password_hash, password)
+
+
+def hash_password_bounded(password, method=None):
+    # A política é resolvida aqui: a thread do pool não tem contexto da aplicação
+    return run_bounded(hash_password, password, method or configured_method())
@@ -0,0 +1,166 @@
+import csv
+import io
+import json
+from datetime import datetime, date
+
+from models import db, Patient
+from utils.phone import format_phone, phone_suffix
+from utils.security import validate_phone
+from utils.cpf import parse_cpf, format_cpf
+from utils.normalize import normalize_name, only_digits
+from utils.rollups import record_bulk_patients
+
+IMPORT_FIELDS = ['full_name', 'cpf', 'phone', 'birth_date', 'musical_preference', 'observations']
+
+
+def detect_format(filename=None, content_type=None):
+    """Descobre o formato (csv ou ndjson) pelo nome do arquivo ou Content-Type"""
+    name = (filename or '').lower()
+    ctype = (content_type or '').lower()
+    if name.endswith(('.ndjson', '.jsonl')) or 'ndjson' in ctype or 'jsonl' in ctype:
+        return 'ndjson'
+    return 'csv'
+
+
+def iter_records(stream, fmt):
+    """Lê registros de um stream de texto sem carregá-lo inteiro: gera (linha, dict)"""
+    if fmt == 'ndjson':
+        for line_no, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield line_no, None
+                continue
+            yield line_no, record if isinstance(record, dict) else None
+        return
+
+    header = stream.readline()
+    # Planilhas brasileiras costumam exportar CSV separado por ponto e vírgula
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    fieldnames = [f.strip() for f in next(csv.reader([header], delimiter=delimiter), [])]
+    reader = csv.DictReader(stream, fieldnames=fieldnames, delimiter=delimiter)
+    for record in reader:
+        yield reader.line_num + 1, record
+
+
+def _parse_birth_date(value):
+    if not value:
+        return None
+    for fmt in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            birth_date = datetime.strptime(value, fmt).date()
+            break
+        except ValueError:
+            continue
+    else:
+        raise ValueError('Data de nascimento inválida')
+
+    today = date.today()
+    if birth_date > today:
+        raise ValueError('Data de nascimento não pode ser futura')
+    age = today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+    if age > 120:
+        raise ValueError('Data de nascimento inválida')
+    return birth_date
+
+
+def _validate_record(record):
+    """Valida e normaliza um registro; devolve o dict de colunas ou lança ValueError"""
+    if record is None:
+        raise ValueError('Linha malformada')
+
+    values = {field: str(record.get(field) or '').strip() for field in IMPORT_FIELDS}
+    for field in ('full_name', 'cpf', 'phone'):
+        if not values[field]:
+            raise ValueError(f'Campo {field} é obrigatório')
+
+    cpf = parse_cpf(values['cpf'])
+
+    phone_formatted = format_phone(values['phone'])
+    if not validate_phone(phone_formatted):
+        raise ValueError('Telefone inválido')
+
+    return {
+        'full_name': values['full_name'],
+        'cpf_number': cpf,
+        'birth_date': _parse_birth_date(values['birth_date']),
+        'phone': phone_formatted,
+        'musical_preference': values['musical_preference'][:100],
+        'observations': values['observations'],
+        'name_normalized': normalize_name(values['full_name']),
+        'phone_digits': only_digits(phone_formatted),
+        'phone_suffix': phone_suffix(phone_formatted)
+    }
+
+
+def _import_chunk(chunk, created_by, report):
+    rows = []
+    seen = set()
+    for line_no, record in chunk:
+        try:
+            row = _validate_record(record)
+        except ValueError as e:
+            report['errors'].append({'row': line_no, 'error': str(e)})
+            continue
+        if row['cpf_number'] in seen:
+            report['errors'].append({'row': line_no, 'cpf': format_cpf(row['cpf_number']),
+                                     'error': 'CPF duplicado no arquivo'})
+            continue
+        seen.add(row['cpf_number'])
+        rows.append((line_no, row))
+
+    # Uma única consulta por lote para os CPFs já cadastrados
+    existing = set()
+    if seen:
+        existing = set(db.session.execute(
+            db.select(Patient.cpf_number).where(Patient.cpf_number.in_(seen))
+        ).scalars())
+
+    now = datetime.utcnow()
+    to_insert = []
+    for line_no, row in rows:
+        if row['cpf_number'] in existing:
+            report['errors'].append({'row': line_no, 'cpf': format_cpf(row['cpf_number']),
+                                     'error': 'CPF já cadastrado'})
+            continue
+        row.update(created_by=created_by, created_at=now, updated_at=now)
+        to_insert.append(row)
+
+    if to_insert:
+        # executemany (insertmanyvalues no PostgreSQL); não passa pelos eventos do ORM
+        db.session.execute(db.insert(Patient), to_insert)
+        record_bulk_patients(db.session.connection(), [now] * len(to_insert))
+    db.session.commit()
+    report['imported'] += len(to_insert)
+
+
+def import_patients(records, created_by=None, chunk_size=1000):
+    """Importa pacientes em lotes: validação, checagem de CPF e insert por lote.
+
+    Cada lote é confirmado separadamente; o relatório lista as linhas rejeitadas.
+    """
+    report = {'total': 0, 'imported': 0, 'failed': 0, 'errors': []}
+    chunk = []
+    for line_no, record in records:
+        report['total'] += 1
+        chunk.append((line_no, record))
+        if len(chunk) >= chunk_size:
+            _import_chunk(chunk, created_by, report)
+            chunk = []
+    if chunk:
+        _import_chunk(chunk, created_by, report)
+
+    report['failed'] = len(report['errors'])
+    return report
+
+
+def import_patients_from_stream(binary_stream, fmt, created_by=None, chunk_size=1000):
+    """Atalho para importar de um stream binário (upload ou arquivo aberto em 'rb')"""
+    text_stream = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+    try:
+        return import_patients(iter_records(text_stream, fmt), created_by, chunk_size)
+    finally:
+        text_stream.detach()
@@ -0,0 +1,32 @@
+from utils.normalize import only_digits
+
+# Os 8 últimos dígitos identificam a linha com ou sem DDD, com ou sem o nono dígito
+# do celular e com ou sem o +55 do E.164: é a chave indexada da busca por telefone
+PHONE_SUFFIX_DIGITS = 8
+COUNTRY_CODE = '55'
+
+
+def format_phone(phone):
+    """Formata telefone para o padrão (00) 00000-0000"""
+    phone = only_digits(phone)
+    if len(phone) == 11:
+        return f'({phone[:2]}) {phone[2:7]}-{phone[7:]}'
+    elif len(phone) == 10:
+        return f'({phone[:2]}) {phone[2:6]}-{phone[6:]}'
+    return phone
+
+
+def national_digits(phone):
+    """'+55 (11) 98765-4321' -> '11987654321' (sem código do país nem zero de longa distância)"""
+    digits = only_digits(phone)
+    if len(digits) in (12, 13) and digits.startswith(COUNTRY_CODE):
+        digits = digits[len(COUNTRY_CODE):]
+    elif len(digits) in (11, 12) and digits.startswith('0'):
+        digits = digits[1:]
+    return digits
+
+
+def phone_suffix(phone):
+    """'(11) 98765-4321' -> '87654321'; None se tiver menos de 8 dígitos"""
+    digits = only_digits(phone)
+    return digits[-PHONE_SUFFIX_DIGITS:] if len(digits) >= PHONE_SUFFIX_DIGITS else None
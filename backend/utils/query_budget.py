@@ -0,0 +1,159 @@
+import re
+import warnings
+from collections import Counter
+from contextvars import ContextVar
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Listas de parâmetros (IN (?, ?, ?), VALUES (%(a)s, %(b)s)...) viram "(?)": a forma do
+# statement não depende de quantos itens a lista tem
+_PARAMETER_LISTS = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+|\$\d+))*\s*\)')
+_SPACES = re.compile(r'\s+')
+
+# Contadores de blocos abertos com `with QueryCounter(...)` fora das requisições
+_blocks = ContextVar('query_budget_blocks', default=())
+_listening = False
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Requisição ou bloco acima do orçamento de statements (QUERY_BUDGET_MODE=raise)"""
+
+
+def statement_shape(statement):
+    """SQL normalizado para detectar o mesmo statement executado em laço"""
+    return _SPACES.sub(' ', _PARAMETER_LISTS.sub('(?)', statement)).strip()
+
+
+def _mode(mode=None):
+    if mode:
+        return mode
+    return current_app.config['QUERY_BUDGET_MODE'] if has_app_context() else 'warn'
+
+
+def _warn(message):
+    if has_app_context():
+        current_app.logger.warning(message)
+    else:
+        warnings.warn(message, stacklevel=3)
+
+
+class QueryCounter:
+    """Conta os statements de um bloco e aponta orçamento estourado ou N+1.
+
+    Com mode='raise' o statement que ultrapassa o limite lança
+    QueryBudgetExceeded (o traceback aponta o laço); com 'warn' o resumo vai
+    para o log ao final do bloco. Uso fora de rotas:
+
+        with QueryCounter(max_queries=3, label='importação'):
+            ...
+    """
+
+    def __init__(self, max_queries=None, max_repeats=None, label='bloco', mode=None):
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+        self.label = label
+        self.mode = _mode(mode)
+        self.count = 0
+        self.shapes = Counter()
+        self.violations = []
+
+    def record(self, statement):
+        self.count += 1
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        if self.max_queries is not None and self.count == self.max_queries + 1:
+            self._violate(f'{self.label}: mais de {self.max_queries} statements')
+        if self.max_repeats is not None and self.shapes[shape] == self.max_repeats + 1:
+            self._violate(f'{self.label}: statement repetido mais de {self.max_repeats} vezes '
+                          f'(provável N+1): {shape[:300]}')
+
+    def _violate(self, message):
+        self.violations.append(message)
+        if self.mode == 'raise':
+            raise QueryBudgetExceeded(message)
+
+    def report(self):
+        """Resumo no log quando algum limite foi ultrapassado (modo warn)"""
+        if not self.violations or self.mode != 'warn':
+            return
+        shape, repeats = self.shapes.most_common(1)[0]
+        _warn(f'Orçamento de consultas excedido em {self.label}: {self.count} statements '
+              f'(limite {self.max_queries}); mais repetido {repeats}x: {shape[:300]}')
+
+    def __enter__(self):
+        _listen()
+        self._token = _blocks.set(_blocks.get() + (self,))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _blocks.reset(self._token)
+        self.report()
+        return False
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    for counter in _blocks.get():
+        counter.record(statement)
+    if has_request_context():
+        counter = g.get('_query_counter')
+        if counter is not None:
+            counter.record(statement)
+
+
+def _listen():
+    # Só registra o evento quando alguém mede: com QUERY_BUDGET_MODE=off não há custo por statement
+    global _listening
+    if not _listening:
+        event.listen(Engine, 'before_cursor_execute', _count_statement)
+        _listening = True
+
+
+def query_budget(max_queries, max_repeats=None):
+    """Declara quantos statements a rota pode executar (em vez de QUERY_BUDGET_DEFAULT).
+
+    max_repeats limita quantas vezes a mesma forma de statement pode se repetir
+    (padrão QUERY_BUDGET_REPEATS). O atributo sobe pelos decorators que usam
+    functools.wraps, então a posição na pilha de decorators não importa.
+    """
+    def decorator(f):
+        f.query_budget = (max_queries, max_repeats)
+        return f
+    return decorator
+
+
+def init_query_budget(app):
+    """Conta os statements de cada requisição e confere o orçamento da rota"""
+    mode = app.config['QUERY_BUDGET_MODE']
+    if mode == 'off':
+        return
+    _listen()
+
+    # Primeiro before_request: os statements dos demais hooks também contam
+    @app.before_request
+    def _start_query_counter():
+        view = app.view_functions.get(request.endpoint)
+        max_queries, max_repeats = getattr(view, 'query_budget', (app.config['QUERY_BUDGET_DEFAULT'], None))
+        g._query_counter = QueryCounter(
+            max_queries,
+            app.config['QUERY_BUDGET_REPEATS'] if max_repeats is None else max_repeats,
+            label=request.endpoint or request.path,
+            mode=mode
+        )
+    app.before_request_funcs[None].insert(0, app.before_request_funcs[None].pop())
+
+    @app.after_request
+    def _finish_query_counter(response):
+        counter = g.get('_query_counter')
+        if counter is None:
+            return response
+        if response.is_streamed:
+            # Exportações consultam o banco enquanto geram o corpo (stream_with_context
+            # mantém g): o resumo sai quando o stream termina, sem o cabeçalho
+            response.call_on_close(counter.report)
+            return response
+        g.pop('_query_counter')
+        response.headers['X-Query-Count'] = str(counter.count)
+        counter.report()
+        return response
@@ -0,0 +1,217 @@
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from urllib.parse import urlparse
+
+from flask import current_app, request, jsonify
+from flask_login import current_user
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem flock, o armazenamento compartilhado em arquivo não está disponível
+    fcntl = None
+
+
+def parse_limit(value):
+    """'120/60' -> (120, 60.0): requisições por janela em segundos; vazio -> None"""
+    if not value:
+        return None
+    requests_, _, window = str(value).partition('/')
+    return int(requests_), float(window or 60)
+
+
+# ===== ARMAZENAMENTO DOS BALDES =====
+#
+# Todos implementam take(key, capacity, rate, cost=1) -> (permitido, retry_after_s),
+# a mesma semântica do script Lua usado no Redis: o balde começa cheio, recebe
+# `rate` fichas por segundo até `capacity` e cada requisição consome `cost`.
+
+def _refill(tokens, updated, now, capacity, rate):
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+def _decide(tokens, cost, rate):
+    if tokens >= cost:
+        return True, tokens - cost, 0.0
+    return False, tokens, (cost - tokens) / rate
+
+
+class MemoryBucketStore:
+    """Baldes no próprio processo (desenvolvimento ou servidor de processo único)"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, cost=1):
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            allowed, tokens, retry_after = _decide(_refill(tokens, updated, now, capacity, rate), cost, rate)
+            self._buckets[key] = (tokens, now)
+        return allowed, retry_after
+
+
+class MmapBucketStore:
+    """Baldes em um arquivo mapeado em memória, compartilhado entre os workers do gunicorn.
+
+    O arquivo é uma tabela hash de tamanho fixo (endereçamento aberto) com
+    slots (hash da chave, fichas, atualizado_em). Cada operação segura um flock
+    exclusivo; quando os slots da sondagem estão ocupados, o balde mais antigo é
+    reaproveitado.
+    """
+
+    HEADER = struct.Struct('<8sQ')
+    SLOT = struct.Struct('<Qdd')
+    MAGIC = b'CLRLv001'
+    PROBES = 16
+
+    def __init__(self, path, slots=65536):
+        if fcntl is None:
+            raise RuntimeError('MmapBucketStore requer fcntl (Linux/macOS)')
+        self.path = path
+        self.slots = slots
+        self._size = self.HEADER.size + slots * self.SLOT.size
+        self._pid = None
+        self._thread_lock = threading.Lock()
+
+    def _open(self):
+        # Após o fork cada worker reabre o arquivo: flock em descritor herdado não exclui
+        if self._pid == os.getpid():
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size != self._size:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, self._size)
+            self._map = mmap.mmap(fd, self._size)
+            magic, slots = self.HEADER.unpack_from(self._map, 0)
+            if magic != self.MAGIC or slots != self.slots:
+                self._map[:] = bytes(self._size)
+                self.HEADER.pack_into(self._map, 0, self.MAGIC, self.slots)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._fd = fd
+        self._pid = os.getpid()
+
+    def _key_hash(self, key):
+        # hash() do Python muda por processo; blake2b é estável entre workers (0 = slot vazio)
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+
+    def take(self, key, capacity, rate, cost=1):
+        key_hash = self._key_hash(key)
+        start = key_hash % self.slots
+        now = time.time()
+        with self._thread_lock:
+            self._open()
+            buf, slot, base = self._map, self.SLOT, self.HEADER.size
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                target, oldest, oldest_updated = None, None, math.inf
+                for probe in range(self.PROBES):
+                    offset = base + ((start + probe) % self.slots) * slot.size
+                    stored_hash, tokens, updated = slot.unpack_from(buf, offset)
+                    if stored_hash == key_hash:
+                        target = offset
+                        tokens = _refill(tokens, updated, now, capacity, rate)
+                        break
+                    if stored_hash == 0:
+                        target, tokens = offset, capacity
+                        break
+                    if updated < oldest_updated:
+                        oldest, oldest_updated = offset, updated
+                else:
+                    target, tokens = oldest, capacity
+                allowed, tokens, retry_after = _decide(tokens, cost, rate)
+                slot.pack_into(buf, target, key_hash, tokens, now)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return allowed, retry_after
+
+
+class RedisBucketStore:
+    """Baldes no Redis (vários servidores), com a mesma semântica via script Lua atômico"""
+
+    SCRIPT = """
+    local capacity, rate, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens, updated = tonumber(bucket[1]) or capacity, tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local allowed, retry_after = 0, (cost - tokens) / rate
+    if tokens >= cost then allowed, tokens, retry_after = 1, tokens - cost, 0 end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(retry_after)}
+    """
+
+    def __init__(self, url, prefix='ratelimit:'):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+        self._prefix = prefix
+
+    def take(self, key, capacity, rate, cost=1):
+        allowed, retry_after = self._script(keys=[self._prefix + key], args=[capacity, rate, cost, time.time()])
+        return bool(allowed), float(retry_after)
+
+
+def create_store(url, instance_path):
+    """memory://, mmap://[/caminho/arquivo] (padrão: instance/ratelimit.bin) ou redis://..."""
+    parsed = urlparse(url or 'mmap://')
+    if parsed.scheme == 'memory':
+        return MemoryBucketStore()
+    if parsed.scheme == 'mmap':
+        if fcntl is None:
+            return MemoryBucketStore()
+        return MmapBucketStore(parsed.path or os.path.join(instance_path, 'ratelimit.bin'))
+    if parsed.scheme in ('redis', 'rediss', 'unix'):
+        return RedisBucketStore(url)
+    raise ValueError(f'RATELIMIT_STORAGE_URL não suportada: {url}')
+
+
+# ===== LIMITADOR =====
+
+def client_identity(per='user'):
+    """Quem consome o balde: o usuário autenticado (per='user') ou o IP"""
+    if per == 'user' and current_user.is_authenticated:
+        return f'u{current_user.id}'
+    return f'ip{request.remote_addr}'
+
+
+def too_many_requests(retry_after):
+    response = jsonify({'error': 'Muitas requisições. Tente novamente em instantes.'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def hit(scope, max_requests, window, per='user'):
+    """Consome uma ficha do balde (scope, cliente); devolve a resposta 429 ou None"""
+    store = current_app.extensions.get('rate_limiter')
+    if store is None:
+        return None
+    key = f'{scope}:{client_identity(per)}'
+    allowed, retry_after = store.take(key, max_requests, max_requests / window)
+    return None if allowed else too_many_requests(retry_after)
+
+
+def init_rate_limiting(app):
+    """Cria o armazenamento compartilhado e aplica o limite padrão por cliente a todas as rotas"""
+    if not app.config['RATELIMIT_ENABLED']:
+        return
+    app.extensions['rate_limiter'] = create_store(app.config['RATELIMIT_STORAGE_URL'], app.instance_path)
+    default_limit = parse_limit(app.config['RATELIMIT_DEFAULT'])
+    if default_limit is None:
+        return
+
+    @app.before_request
+    def _default_rate_limit():
+        if request.endpoint in (None, 'static', 'assets'):
+            return None
+        return hit('default', *default_limit)
@@ -0,0 +1,217 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from flask import current_app, has_app_context
+from models import db, Patient, Atendimento, StatRollup, ServiceRollup, atendimento_servicos
+
+stat_table = StatRollup.__table__
+service_table = ServiceRollup.__table__
+
+# Campos de Atendimento que mudam os agregados quando alterados
+ROLLUP_FIELDS = ('data_atendimento', 'valor_cobrado', 'servicos')
+
+
+# Os períodos (dia/mês) seguem o relógio da clínica: data_atendimento já é hora local;
+# created_at dos pacientes é UTC e é convertido antes de virar chave
+def clinic_timezone():
+    """CLINIC_TIMEZONE (ex.: America/Sao_Paulo) ou None para o fuso local do servidor"""
+    name = current_app.config.get('CLINIC_TIMEZONE') if has_app_context() else None
+    return ZoneInfo(name) if name else None
+
+
+def clinic_now():
+    """Agora no relógio da clínica (naive, como data_atendimento)"""
+    return datetime.now(timezone.utc).astimezone(clinic_timezone()).replace(tzinfo=None)
+
+
+def utc_to_clinic(moment):
+    """datetime naive em UTC (created_at) -> hora da clínica"""
+    return moment.replace(tzinfo=timezone.utc).astimezone(clinic_timezone()).replace(tzinfo=None)
+
+
+def period_keys(moment):
+    """Chaves de período afetadas por um evento na hora da clínica: total, mês e dia"""
+    if moment is None:
+        moment = clinic_now()
+    return ['total', f'month:{moment:%Y-%m}', f'day:{moment:%Y-%m-%d}']
+
+
+def patient_period_keys(created_at):
+    return period_keys(utc_to_clinic(created_at) if created_at else None)
+
+
+def upsert_increment(connection, table, keys, increments):
+    """Soma os incrementos na linha de chave `keys`, criando-a se necessário (atômico)"""
+    upsert_increments(connection, table, [(keys, increments)])
+
+
+def upsert_increments(connection, table, rows):
+    """Várias linhas [(keys, increments), ...] com as mesmas colunas em um único statement.
+
+    Chaves repetidas são somadas antes: o ON CONFLICT do PostgreSQL não aceita
+    atualizar a mesma linha duas vezes no mesmo comando.
+    """
+    merged = {}
+    for keys, increments in rows:
+        key = tuple(keys.items())
+        if key in merged:
+            for name, value in increments.items():
+                merged[key][name] += value
+        else:
+            merged[key] = dict(increments)
+    if not merged:
+        return
+
+    key_names = [name for name, _ in next(iter(merged))]
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        # Sob demanda: o pacote do dialeto PostgreSQL custa ~45 ms de import a quem usa SQLite
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values([{**dict(key), **increments} for key, increments in merged.items()])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_names,
+            set_={name: table.c[name] + stmt.excluded[name] for name in next(iter(merged.values()))}
+        )
+        connection.execute(stmt)
+        return
+
+    for key, increments in merged.items():
+        condition = db.and_(*(table.c[name] == value for name, value in key))
+        result = connection.execute(
+            db.update(table).where(condition).values(
+                {name: table.c[name] + value for name, value in increments.items()})
+        )
+        if result.rowcount == 0:
+            connection.execute(db.insert(table).values(**dict(key), **increments))
+
+
+def _bump_atendimento(connection, atendimento, service_ids, sign):
+    """Soma (sign=1) ou retira (sign=-1) um atendimento dos agregados; aceita qualquer
+    objeto com data_atendimento e valor_cobrado (a linha antiga numa alteração)"""
+    revenue = (atendimento.valor_cobrado or 0) * sign
+    periods = period_keys(atendimento.data_atendimento)
+    upsert_increments(connection, stat_table, [
+        ({'period': period}, {'patients': 0, 'atendimentos': sign, 'revenue': revenue}) for period in periods
+    ])
+    # Ranking de serviços só por total e por mês (o dashboard não usa o diário)
+    upsert_increments(connection, service_table, [
+        ({'period': period, 'service_id': service_id}, {'atendimentos': sign})
+        for period in periods[:2] for service_id in service_ids
+    ])
+
+
+def record_bulk_patients(connection, created_ats):
+    """Aplica aos agregados pacientes inseridos em lote (inserts em lote não disparam eventos do ORM)"""
+    counts = defaultdict(int)
+    for created_at in created_ats:
+        for period in patient_period_keys(created_at):
+            counts[period] += 1
+    upsert_increments(connection, stat_table, [
+        ({'period': period}, {'patients': count, 'atendimentos': 0, 'revenue': 0}) for period, count in counts.items()
+    ])
+
+
+@db.event.listens_for(Patient, 'after_insert')
+def _patient_inserted(mapper, connection, target):
+    upsert_increments(connection, stat_table, [
+        ({'period': period}, {'patients': 1, 'atendimentos': 0, 'revenue': 0})
+        for period in patient_period_keys(target.created_at)
+    ])
+
+
+@db.event.listens_for(Patient, 'after_delete')
+def _patient_deleted(mapper, connection, target):
+    upsert_increments(connection, stat_table, [
+        ({'period': period}, {'patients': -1, 'atendimentos': 0, 'revenue': 0})
+        for period in patient_period_keys(target.created_at)
+    ])
+
+
+@db.event.listens_for(Atendimento, 'after_insert')
+def _atendimento_inserted(mapper, connection, target):
+    _bump_atendimento(connection, target, [s.id for s in target.servicos], 1)
+
+
+@db.event.listens_for(db.session, 'before_flush')
+def _capture_rollup_state(session, flush_context, instances):
+    # Os vínculos com serviços são removidos antes do próprio atendimento no flush,
+    # então a lista é capturada enquanto a coleção ainda pode ser carregada
+    for obj in session.deleted:
+        if isinstance(obj, Atendimento):
+            obj._rollup_service_ids = [s.id for s in obj.servicos]
+    # Alteração: a linha gravada (antes do flush) sai dos agregados e a nova entra
+    for obj in session.dirty:
+        if isinstance(obj, Atendimento) and obj.id is not None and _rollup_fields_changed(obj):
+            with session.no_autoflush:
+                previous = session.execute(
+                    db.select(Atendimento.data_atendimento, Atendimento.valor_cobrado)
+                    .where(Atendimento.id == obj.id)
+                ).one()
+                previous_ids = session.execute(
+                    db.select(atendimento_servicos.c.servico_id)
+                    .where(atendimento_servicos.c.atendimento_id == obj.id)
+                ).scalars().all()
+            obj._rollup_previous = (previous, previous_ids, [s.id for s in obj.servicos])
+
+
+def _rollup_fields_changed(atendimento):
+    state = db.inspect(atendimento)
+    return any(state.attrs[name].history.has_changes() for name in ROLLUP_FIELDS)
+
+
+@db.event.listens_for(Atendimento, 'after_update')
+def _atendimento_updated(mapper, connection, target):
+    previous = target.__dict__.pop('_rollup_previous', None)
+    if previous is not None:
+        row, previous_ids, service_ids = previous
+        _bump_atendimento(connection, row, previous_ids, -1)
+        _bump_atendimento(connection, target, service_ids, 1)
+
+
+@db.event.listens_for(Atendimento, 'after_delete')
+def _atendimento_deleted(mapper, connection, target):
+    _bump_atendimento(connection, target, getattr(target, '_rollup_service_ids', []), -1)
+
+
+def rebuild_rollups(batch_size=5000):
+    """Recalcula todos os agregados a partir das tabelas de origem"""
+    stats = defaultdict(lambda: {'patients': 0, 'atendimentos': 0, 'revenue': 0.0})
+    services = defaultdict(int)
+    stats['total']  # Garante a linha 'total' mesmo em banco vazio
+
+    for (created_at,) in db.session.execute(
+        db.select(Patient.created_at).execution_options(yield_per=batch_size)
+    ):
+        for period in patient_period_keys(created_at):
+            stats[period]['patients'] += 1
+
+    for data_atendimento, valor in db.session.execute(
+        db.select(Atendimento.data_atendimento, Atendimento.valor_cobrado).execution_options(yield_per=batch_size)
+    ):
+        for period in period_keys(data_atendimento):
+            stats[period]['atendimentos'] += 1
+            stats[period]['revenue'] += valor or 0
+
+    for data_atendimento, service_id in db.session.execute(
+        db.select(Atendimento.data_atendimento, atendimento_servicos.c.servico_id)
+        .join(atendimento_servicos, atendimento_servicos.c.atendimento_id == Atendimento.id)
+        .execution_options(yield_per=batch_size)
+    ):
+        for period in period_keys(data_atendimento)[:2]:
+            services[(period, service_id)] += 1
+
+    db.session.execute(db.delete(StatRollup))
+    db.session.execute(db.delete(ServiceRollup))
+    if stats:
+        db.session.execute(db.insert(StatRollup), [{'period': k, **v} for k, v in stats.items()])
+    if services:
+        db.session.execute(db.insert(ServiceRollup), [
+            {'period': period, 'service_id': service_id, 'atendimentos': count}
+            for (period, service_id), count in services.items()
+        ])
+    db.session.commit()
+
@@ -0,0 +1,245 @@
+import threading
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from models import db, Appointment, WorkingHours, Professional, CacheVersion, professional_services
+from utils.rollups import upsert_increment
+
+# Nenhum agendamento dura mais que isso: limita por baixo a faixa de start_at consultada
+MAX_APPOINTMENT = timedelta(hours=12)
+
+# Dias à frente carregados no índice em memória de cada profissional
+AGENDA_CACHE_DAYS = 92
+
+# professional_id -> (versão, início, fim, IntervalIndex); cache deste processo
+_agendas = {}
+_lock = threading.Lock()
+
+
+class SchedulingError(ValueError):
+    """Agendamento inválido (serviço não atendido, fora do expediente...)"""
+
+
+class ConflictError(SchedulingError):
+    """Horário já ocupado pelo profissional ou pelo paciente"""
+
+
+def align(moment, minutes):
+    """Arredonda para cima até a próxima grade de `minutes` minutos do dia"""
+    midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    step = timedelta(minutes=minutes)
+    return midnight + -(-(moment - midnight) // step) * step
+
+
+class IntervalIndex:
+    """Intervalos ocupados de um profissional, mesclados e ordenados.
+
+    Como os intervalos mesclados não se sobrepõem, inícios e fins ficam ambos
+    ordenados e as consultas usam busca binária sobre os fins.
+    """
+
+    def __init__(self, intervals=()):
+        self.starts, self.ends = [], []
+        for start, end in sorted(intervals):
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def overlaps(self, start, end):
+        i = bisect_right(self.ends, start)
+        return i < len(self.starts) and self.starts[i] < end
+
+    def first_fit(self, start, limit, duration, slot_minutes):
+        """Primeiro início alinhado em [start, limit) com `duration` livre, ou None"""
+        cursor = align(start, slot_minutes)
+        i = bisect_right(self.ends, cursor)
+        while cursor + duration <= limit:
+            if i < len(self.starts) and self.starts[i] < cursor + duration:
+                cursor = align(max(cursor, self.ends[i]), slot_minutes)
+                i += 1
+                continue
+            return cursor
+        return None
+
+
+# ===== CARGA DO BANCO =====
+
+def working_windows(professional_ids):
+    """Expediente por profissional: {id: {dia_da_semana: [(início, fim), ...]}}"""
+    windows = defaultdict(lambda: defaultdict(list))
+    rows = db.session.execute(
+        db.select(WorkingHours.professional_id, WorkingHours.weekday,
+                  WorkingHours.start_time, WorkingHours.end_time)
+        .where(WorkingHours.professional_id.in_(professional_ids))
+        .order_by(WorkingHours.professional_id, WorkingHours.weekday, WorkingHours.start_time)
+    )
+    for professional_id, weekday, start_time, end_time in rows:
+        windows[professional_id][weekday].append((start_time, end_time))
+    return windows
+
+
+def agenda_key(professional_id):
+    return f'agenda:{professional_id}'
+
+
+def _load_indexes(professional_ids, start, end):
+    """Ocupação entre start e end, em uma consulta por faixa no índice (profissional, início)"""
+    rows = db.session.execute(
+        db.select(Appointment.professional_id, Appointment.start_at, Appointment.end_at)
+        .where(
+            Appointment.professional_id.in_(professional_ids),
+            Appointment.status != 'cancelled',
+            Appointment.start_at >= start - MAX_APPOINTMENT,
+            Appointment.start_at < end
+        )
+        .order_by(Appointment.professional_id, Appointment.start_at)
+    )
+    intervals = defaultdict(list)
+    for professional_id, start_at, end_at in rows:
+        if end_at > start:
+            intervals[professional_id].append((start_at, end_at))
+    return {professional_id: IntervalIndex(items) for professional_id, items in intervals.items()}
+
+
+def busy_indexes(professional_ids, start, end):
+    """Índices de ocupação dos profissionais que cobrem [start, end).
+
+    Cada índice fica em memória com a versão da agenda do profissional
+    (CacheVersion 'agenda:<id>'); só as agendas alteradas são relidas do banco.
+    """
+    keys = {agenda_key(pid): pid for pid in professional_ids}
+    # Versões antes das linhas: uma escrita no meio só torna o cache velho, nunca errado
+    versions = dict.fromkeys(professional_ids, 0)
+    for name, version in db.session.execute(
+            db.select(CacheVersion.name, CacheVersion.version).where(CacheVersion.name.in_(keys))):
+        versions[keys[name]] = version
+
+    result, stale = {}, []
+    for pid in professional_ids:
+        cached = _agendas.get(pid)
+        if cached and cached[0] == versions[pid] and cached[1] <= start and end <= cached[2]:
+            result[pid] = cached[3]
+        else:
+            stale.append(pid)
+
+    if stale:
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        load_start = min(start, today)
+        load_end = max(end, today + timedelta(days=AGENDA_CACHE_DAYS))
+        loaded = _load_indexes(stale, load_start, load_end)
+        with _lock:
+            for pid in stale:
+                result[pid] = loaded.get(pid) or IntervalIndex()
+                _agendas[pid] = (versions[pid], load_start, load_end, result[pid])
+    return result
+
+
+def qualified_professionals(service_id, professional_ids=None):
+    """Profissionais ativos que realizam o serviço"""
+    query = (
+        db.select(Professional.id)
+        .join(professional_services, professional_services.c.professional_id == Professional.id)
+        .where(professional_services.c.service_id == service_id, Professional.is_active.is_(True))
+        .order_by(Professional.id)
+    )
+    if professional_ids:
+        query = query.where(Professional.id.in_(professional_ids))
+    return db.session.execute(query).scalars().all()
+
+
+# ===== BUSCA E VALIDAÇÃO =====
+
+def first_free_slot(service, start=None, days=30, professional_ids=None):
+    """Primeiro horário livre para o serviço com qualquer profissional habilitado.
+
+    Devolve (professional_id, início, fim) ou None. Percorre os dias em ordem:
+    o primeiro dia com vaga contém o horário mais cedo entre todos os profissionais.
+    """
+    slot_minutes = current_app.config['APPOINTMENT_SLOT_MINUTES']
+    duration = timedelta(minutes=service.duration_minutes)
+    start = align(max(start or datetime.now(), datetime.now()), slot_minutes)
+    end = start + timedelta(days=days)
+
+    windows = working_windows(qualified_professionals(service.id, professional_ids))
+    if not windows:
+        return None
+    indexes = busy_indexes(list(windows), start, end)
+    empty = IntervalIndex()
+
+    day = start.date()
+    while day <= end.date():
+        best = None
+        for professional_id, week in windows.items():
+            for window_start, window_end in week.get(day.weekday(), ()):
+                lower = max(datetime.combine(day, window_start), start)
+                upper = min(datetime.combine(day, window_end), end)
+                if lower >= upper:
+                    continue
+                slot = indexes.get(professional_id, empty).first_fit(lower, upper, duration, slot_minutes)
+                if slot is not None:
+                    if best is None or (slot, professional_id) < (best[1], best[0]):
+                        best = (professional_id, slot)
+                    break
+        if best:
+            return best[0], best[1], best[1] + duration
+        day += timedelta(days=1)
+    return None
+
+
+def validate_booking(professional_id, service, patient_id, start_at, exclude_id=None):
+    """Valida um agendamento e devolve o horário de término; lança SchedulingError/ConflictError"""
+    duration = timedelta(minutes=service.duration_minutes)
+    if duration > MAX_APPOINTMENT:
+        raise SchedulingError('Duração do serviço excede o máximo de um agendamento')
+    end_at = start_at + duration
+
+    if professional_id not in qualified_professionals(service.id, [professional_id]):
+        raise SchedulingError('Profissional não realiza este serviço ou está inativo')
+
+    week = working_windows([professional_id]).get(professional_id, {})
+    within_hours = any(
+        datetime.combine(start_at.date(), window_start) <= start_at
+        and end_at <= datetime.combine(start_at.date(), window_end)
+        for window_start, window_end in week.get(start_at.weekday(), ())
+    )
+    if not within_hours:
+        raise SchedulingError('Horário fora do expediente do profissional')
+
+    # No PostgreSQL, serializa agendamentos concorrentes do mesmo profissional
+    db.session.execute(
+        db.select(Professional.id).where(Professional.id == professional_id).with_for_update()
+    )
+
+    overlap = db.and_(
+        Appointment.status != 'cancelled',
+        Appointment.start_at >= start_at - MAX_APPOINTMENT,
+        Appointment.start_at < end_at,
+        Appointment.end_at > start_at
+    )
+    if exclude_id:
+        overlap = db.and_(overlap, Appointment.id != exclude_id)
+    if db.session.execute(db.select(Appointment.id).where(
+            Appointment.professional_id == professional_id, overlap).limit(1)).first():
+        raise ConflictError('Profissional já possui agendamento neste horário')
+    if db.session.execute(db.select(Appointment.id).where(
+            Appointment.patient_id == patient_id, overlap).limit(1)).first():
+        raise ConflictError('Paciente já possui agendamento neste horário')
+    return end_at
+
+
+@db.event.listens_for(Appointment, 'after_insert')
+@db.event.listens_for(Appointment, 'after_update')
+@db.event.listens_for(Appointment, 'after_delete')
+def _bump_agenda_version(mapper, connection, target):
+    # Invalida o índice do profissional em todos os processos (e já neste)
+    upsert_increment(connection, CacheVersion.__table__, {'name': agenda_key(target.professional_id)},
+                     {'version': 1})
+    with _lock:
+        _agendas.pop(target.professional_id, None)
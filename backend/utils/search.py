@@ -0,0 +1,207 @@
+import re
+
+from models import db, Patient
+from utils.normalize import normalize_name, only_digits
+from utils.cpf import cpf_prefix_range
+from utils.phone import phone_suffix
+
+# Termos compostos só de dígitos e pontuação de máscara são tratados como CPF/telefone
+DIGITS_TERM = re.compile(r'^[\d\s().\-/+]+$')
+
+SQLITE_FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS patients_fts USING fts5(
+        name_normalized, phone_digits,
+        content='patients', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS patients_fts_ai AFTER INSERT ON patients BEGIN
+        INSERT INTO patients_fts(rowid, name_normalized, phone_digits)
+        VALUES (new.id, new.name_normalized, new.phone_digits);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patients_fts_ad AFTER DELETE ON patients BEGIN
+        INSERT INTO patients_fts(patients_fts, rowid, name_normalized, phone_digits)
+        VALUES ('delete', old.id, old.name_normalized, old.phone_digits);
+    END""",
+    # Só as colunas indexadas: editar observações ou datas não mexe no índice
+    """CREATE TRIGGER IF NOT EXISTS patients_fts_au AFTER UPDATE OF name_normalized, phone_digits ON patients BEGIN
+        INSERT INTO patients_fts(patients_fts, rowid, name_normalized, phone_digits)
+        VALUES ('delete', old.id, old.name_normalized, old.phone_digits);
+        INSERT INTO patients_fts(rowid, name_normalized, phone_digits)
+        VALUES (new.id, new.name_normalized, new.phone_digits);
+    END""",
+    # Trechos do meio do telefone: o tokenizer trigram atende LIKE '%...%' pelo índice
+    """CREATE VIRTUAL TABLE IF NOT EXISTS patients_phone_fts USING fts5(
+        phone_digits, content='patients', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS patients_phone_fts_ai AFTER INSERT ON patients BEGIN
+        INSERT INTO patients_phone_fts(rowid, phone_digits) VALUES (new.id, new.phone_digits);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patients_phone_fts_ad AFTER DELETE ON patients BEGIN
+        INSERT INTO patients_phone_fts(patients_phone_fts, rowid, phone_digits)
+        VALUES ('delete', old.id, old.phone_digits);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patients_phone_fts_au AFTER UPDATE OF phone_digits ON patients BEGIN
+        INSERT INTO patients_phone_fts(patients_phone_fts, rowid, phone_digits)
+        VALUES ('delete', old.id, old.phone_digits);
+        INSERT INTO patients_phone_fts(rowid, phone_digits) VALUES (new.id, new.phone_digits);
+    END""",
+]
+SQLITE_FTS_TABLES = ('patients_fts', 'patients_phone_fts')
+
+# Criados com CONCURRENTLY (fora de transação) para não bloquear escritas em produção
+POSTGRES_INDEXES = {
+    'ix_patients_name_trgm': "ON patients USING gin (name_normalized gin_trgm_ops)",
+    'ix_patients_name_tsv': "ON patients USING gin (to_tsvector('simple', name_normalized))",
+    'ix_patients_phone_trgm': "ON patients USING gin (phone_digits gin_trgm_ops)",
+}
+
+fts_table = db.table('patients_fts', db.column('rowid'), db.column('rank'))
+phone_fts_table = db.table('patients_phone_fts', db.column('rowid'), db.column('phone_digits'))
+
+# Backend detectado por engine (a tabela FTS só muda em setup_patient_search)
+_backends = {}
+
+
+def backend_name():
+    """Retorna o backend de busca em uso: 'postgresql', 'fts5' ou 'like'"""
+    engine = db.engine
+    if engine.url not in _backends:
+        if engine.dialect.name == 'postgresql':
+            _backends[engine.url] = 'postgresql'
+        elif engine.dialect.name == 'sqlite' and not _missing_fts_tables():
+            _backends[engine.url] = 'fts5'
+        else:
+            _backends[engine.url] = 'like'
+    return _backends[engine.url]
+
+
+def _missing_fts_tables():
+    existing = set(db.session.execute(
+        db.text("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN :names")
+        .bindparams(db.bindparam('names', SQLITE_FTS_TABLES, expanding=True))
+    ).scalars())
+    return [name for name in SQLITE_FTS_TABLES if name not in existing]
+
+
+def setup_patient_search():
+    """Cria os índices (PostgreSQL) ou a tabela FTS5 (SQLite) da busca de pacientes (idempotente)"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(db.text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+            for name, definition in POSTGRES_INDEXES.items():
+                conn.execute(db.text(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}'))
+    elif dialect == 'sqlite':
+        created = _missing_fts_tables()
+        try:
+            with db.engine.begin() as conn:
+                for statement in SQLITE_FTS_SCHEMA:
+                    conn.execute(db.text(statement))
+                for name in created:
+                    conn.execute(db.text(f"INSERT INTO {name}({name}) VALUES ('rebuild')"))
+        except Exception:
+            # SQLite sem FTS5 (ou sem o tokenizer trigram, < 3.34): a busca cai para LIKE
+            db.session.rollback()
+
+    _backends.pop(db.engine.url, None)
+
+
+def missing_search_structures():
+    """Lista índices/tabelas da busca que deveriam existir no banco atual e não existem"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        existing = {i['name'] for i in db.inspect(db.engine).get_indexes('patients')}
+        return [name for name in POSTGRES_INDEXES if name not in existing]
+    if dialect == 'sqlite':
+        return _missing_fts_tables()
+    return []
+
+
+def reindex_patients(batch_size=1000):
+    """Recalcula as colunas normalizadas de todos os pacientes"""
+    # Migrações antigas reindexam antes de as colunas mais novas existirem no banco
+    existing = {c['name'] for c in db.inspect(db.engine).get_columns('patients')}
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Patient.id, Patient.full_name, Patient.cpf_number, Patient.phone, Patient.updated_at)
+            .where(Patient.id > last_id).order_by(Patient.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        # updated_at vai junto: sem ele o onupdate carimbaria a hora da migração em todos
+        # os pacientes (e invalidaria ETag/Last-Modified e a ordem das exportações)
+        db.session.execute(db.update(Patient), [
+            {column: value for column, value in {
+                'id': row.id,
+                'updated_at': row.updated_at,
+                'name_normalized': normalize_name(row.full_name),
+                'phone_digits': only_digits(row.phone),
+                'phone_suffix': phone_suffix(row.phone)
+            }.items() if column in existing}
+            for row in rows
+        ])
+        last_id = rows[-1].id
+    db.session.commit()
+
+
+def _fts_match(term):
+    tokens = normalize_name(term).split()
+    return ' '.join('"%s"*' % token.replace('"', '""') for token in tokens)
+
+
+def _prefix_tsquery(name):
+    tokens = [re.sub(r'[^0-9a-z]', '', token) for token in name.split()]
+    return ' & '.join(f'{token}:*' for token in tokens if token)
+
+
+def _cpf_prefix(digits):
+    """CPFs que começam com os dígitos: faixa de inteiros no índice único de cpf_number"""
+    bounds = cpf_prefix_range(digits)
+    if bounds is None:
+        return db.false()
+    return Patient.cpf_number.between(*bounds)
+
+
+def apply_patient_search(query, term):
+    """Filtra a query de pacientes pelo termo e devolve (query, ordenação por relevância)"""
+    backend = backend_name()
+    digits = only_digits(term) if DIGITS_TERM.match(term) else None
+    name = normalize_name(term)
+
+    if digits == '' or (digits is None and not name):
+        return query.filter(db.false()), None
+
+    if digits and backend in ('fts5', 'postgresql'):
+        # Mesma regra nos dois bancos: prefixo do CPF ou qualquer trecho do telefone
+        cpf_prefix = _cpf_prefix(digits)
+        if backend == 'fts5':
+            phone = Patient.id.in_(
+                db.select(phone_fts_table.c.rowid).where(phone_fts_table.c.phone_digits.like(f'%{digits}%'))
+            )
+        else:
+            phone = Patient.phone_digits.like(f'%{digits}%')
+        return query.filter(db.or_(cpf_prefix, phone)), db.case((cpf_prefix, 0), else_=1).asc()
+
+    if backend == 'fts5':
+        query = query.join(fts_table, fts_table.c.rowid == Patient.id).filter(
+            db.text('patients_fts MATCH :match').bindparams(match=_fts_match(term))
+        )
+        return query, fts_table.c.rank.asc()
+
+    if backend == 'postgresql':
+        # LIKE com curinga inicial é servido pelo índice trigram; o tsvector cobre prefixos de palavras
+        similarity = db.func.similarity(Patient.name_normalized, name)
+        condition = Patient.name_normalized.like(f'%{name}%')
+        prefix_query = _prefix_tsquery(name)
+        if not prefix_query:
+            return query.filter(condition), similarity.desc()
+
+        tsvector = db.func.to_tsvector('simple', Patient.name_normalized)
+        tsquery = db.func.to_tsquery('simple', prefix_query)
+        query = query.filter(db.or_(tsvector.op('@@')(tsquery), condition))
+        return query, (db.func.ts_rank(tsvector, tsquery) + similarity).desc()
+
+    if digits:
+        return query.filter(db.or_(_cpf_prefix(digits), Patient.phone_digits.like(f'%{digits}%'))), None
+    return query.filter(Patient.name_normalized.like(f'%{name}%')), None
@@ -3,30 +3,6 @@ from flask import request, jsonify
 from flask_login import current_user
 import re
 
-def validate_cpf(cpf):
-    """Valida CPF brasileiro"""
-    # Remove caracteres não numéricos
-    cpf = re.sub(r'[^0-9]', '', cpf)
-    
-    # Verifica se tem 11 dígitos
-    if len(cpf) != 11:
-        return False
-    
-    # Verifica se todos os dígitos são iguais
-    if cpf == cpf[0] * 11:
-        return False
-    
-    # Calcula o primeiro dígito verificador
-    sum_1 = sum(int(cpf[i]) * (10 - i) for i in range(9))
-    digit_1 = (sum_1 * 10 % 11) % 10
-    
-    # Calcula o segundo dígito verificador
-    sum_2 = sum(int(cpf[i]) * (11 - i) for i in range(10))
-    digit_2 = (sum_2 * 10 % 11) % 10
-    
-    # Verifica se os dígitos verificadores estão corretos
-    return cpf[-2:] == f'{digit_1}{digit_2}'
-
 def validate_phone(phone):
     """Valida telefone brasileiro"""
     # Pattern para (XX) XXXXX-XXXX ou (XX) XXXX-XXXX
@@ -84,13 +60,20 @@ def validate_password(password):
     
     return True, "Senha válida"
 
-def rate_limit(max_requests=60, window=60):
-    """Decorator para limitar taxa de requisições"""
+def rate_limit(max_requests=60, window=60, per='user'):
+    """Decorator para limitar taxa de requisições da rota (token bucket).
+    
+    Cada rota tem seu orçamento de max_requests por window segundos, por usuário
+    autenticado (per='user') ou por IP (per='ip'); acima dele responde 429 com
+    Retry-After. Os baldes ficam no armazenamento de utils.ratelimit.
+    """
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            # Implementação básica - em produção, use Redis ou similar
-            # Por enquanto, apenas retorna a função
+            from utils.ratelimit import hit
+            limited = hit(request.endpoint, max_requests, window, per)
+            if limited is not None:
+                return limited
             return f(*args, **kwargs)
         return decorated_function
     return decorator
\ No newline at end of file
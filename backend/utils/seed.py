@@ -0,0 +1,237 @@
+import os
+import random
+from datetime import datetime, timedelta
+
+from models import db, User, Patient, Professional, Servico, Atendimento, professional_services, atendimento_servicos
+from utils.normalize import normalize_name, only_digits
+from utils.cpf import cpf_number
+from utils.phone import phone_suffix
+
+FIRST_NAMES = [
+    'Ana', 'Beatriz', 'Camila', 'Carla', 'Daniela', 'Fernanda', 'Gabriela', 'Helena', 'Isabela', 'Juliana',
+    'Larissa', 'Letícia', 'Mariana', 'Natália', 'Patrícia', 'Renata', 'Sofia', 'Tatiane', 'Vanessa', 'Yasmin',
+    'André', 'Bruno', 'Carlos', 'Diego', 'Eduardo', 'Felipe', 'Gustavo', 'João', 'Lucas', 'Marcelo',
+    'Paulo', 'Rafael', 'Rodrigo', 'Thiago', 'Vinícius',
+]
+LAST_NAMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima', 'Gomes',
+    'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa',
+    'Rocha', 'Dias', 'Nascimento', 'Andrade', 'Moreira', 'Nunes', 'Marques', 'Machado', 'Mendes', 'Freitas',
+    'Cardoso', 'Ramos', 'Gonçalves', 'Santana', 'Teixeira', 'Araújo', 'Pinto', 'Correia', 'Cavalcanti', 'Moura',
+]
+AREA_CODES = [11, 12, 13, 19, 21, 24, 27, 31, 34, 41, 43, 47, 48, 51, 54, 61, 62, 71, 81, 85, 91, 92]
+MUSIC = ['MPB', 'Jazz', 'Clássica', 'Bossa nova', 'Pop', 'Sertanejo', 'Instrumental', 'Samba', '']
+SERVICES = [
+    ('Limpeza de pele', 'Facial', 60, 180.0),
+    ('Peeling químico', 'Facial', 45, 250.0),
+    ('Microagulhamento', 'Facial', 60, 350.0),
+    ('Hidratação facial', 'Facial', 40, 150.0),
+    ('Toxina botulínica', 'Injetáveis', 30, 900.0),
+    ('Preenchimento labial', 'Injetáveis', 45, 1200.0),
+    ('Drenagem linfática', 'Corporal', 60, 140.0),
+    ('Massagem modeladora', 'Corporal', 50, 160.0),
+    ('Radiofrequência', 'Corporal', 40, 220.0),
+    ('Criolipólise', 'Corporal', 60, 700.0),
+    ('Depilação a laser', 'Laser', 30, 200.0),
+    ('Remoção de manchas', 'Laser', 30, 300.0),
+]
+
+# Multiplicador coprimo com 900.000.000: números de sequência distintos geram bases de
+# CPF distintas e espalhadas, sem consultar o banco a cada linha
+_CPF_STRIDE = 7654321
+_PROFESSIONAL_CPF_OFFSET = 500_000_000
+
+
+def cpf_from_number(n):
+    """CPF formatado e válido (dígitos verificadores calculados) para o número de sequência n"""
+    base = 100_000_000 + (n * _CPF_STRIDE) % 900_000_000
+    if len(set(str(base))) == 1:
+        base += 1  # 111.111.111-11 e afins são rejeitados por validate_cpf
+    digits = [int(d) for d in str(base)]
+    for size in (9, 10):
+        total = sum(d * (size + 1 - i) for i, d in enumerate(digits[:size]))
+        digits.append(total * 10 % 11 % 10)
+    text = ''.join(map(str, digits))
+    return f'{text[:3]}.{text[3:6]}.{text[6:9]}-{text[9:]}'
+
+
+def fake_phone(rng):
+    return f'({rng.choice(AREA_CODES)}) 9{rng.randint(6000, 9999)}-{rng.randint(0, 9999):04d}'
+
+
+def fake_name(rng):
+    return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+
+def _max_id(model):
+    return db.session.execute(db.select(db.func.max(model.id))).scalar() or 0
+
+
+def _random_moment(rng, start, span_seconds):
+    return start + timedelta(seconds=rng.randrange(span_seconds))
+
+
+def seed_admin(password=None, log=print):
+    """Cria o usuário admin padrão se não existir; devolve True quando cria.
+
+    Sem senha explícita usa ADMIN_DEFAULT_PASSWORD (padrão admin123).
+    """
+    if db.session.execute(db.select(User.id).filter_by(username='admin')).first():
+        return False
+    password = password or os.environ.get('ADMIN_DEFAULT_PASSWORD', 'admin123')
+    admin = User(username='admin', email='admin@clinica.com', full_name='Administrador', role='admin')
+    admin.set_password(password)
+    db.session.add(admin)
+    db.session.commit()
+    log('✅ Usuário admin criado com sucesso!')
+    log('   Username: admin')
+    log(f'   Password: {password}')
+    if password == 'admin123':
+        log('   ⚠️  ALTERE ESTA SENHA EM PRODUÇÃO!')
+    return True
+
+
+def seed_services():
+    """Cria o catálogo de serviços padrão se estiver vazio; devolve [(id, preço)]"""
+    if not db.session.execute(db.select(Servico.id).limit(1)).first():
+        from utils.catalog import bump_version
+        db.session.add_all(Servico(name=name, category=category, duration_minutes=duration, price=price)
+                           for name, category, duration, price in SERVICES)
+        bump_version()
+        db.session.commit()
+    return db.session.execute(db.select(Servico.id, Servico.price).where(Servico.is_active.is_(True))).all()
+
+
+def seed_professionals(count, services, rng, created_by=None):
+    """Profissionais com 3 a 6 serviços cada; devolve {id: [ids dos serviços]}"""
+    first = _max_id(Professional) + 1
+    now = datetime.utcnow()
+    rows = [{
+        'full_name': fake_name(rng),
+        'cpf_number': cpf_number(cpf_from_number(_PROFESSIONAL_CPF_OFFSET + first + i)),
+        'registro_prof': f'CRBM-{first + i:06d}',
+        'phone': fake_phone(rng),
+        'email': f'profissional{first + i}@clinica.test',
+        'is_active': True,
+        'created_at': now,
+        'updated_at': now,
+        'created_by': created_by,
+    } for i in range(count)]
+    ids = db.session.execute(
+        db.insert(Professional).returning(Professional.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+
+    links, service_ids = {}, [service_id for service_id, _ in services]
+    for professional_id in ids:
+        links[professional_id] = rng.sample(service_ids, min(len(service_ids), rng.randint(3, 6)))
+    if links:
+        db.session.execute(db.insert(professional_services), [
+            {'professional_id': pid, 'service_id': sid} for pid, sids in links.items() for sid in sids
+        ])
+    db.session.commit()
+    return links
+
+
+def seed_patients(count, rng, years=3, batch_size=5000, created_by=None, log=print):
+    """Pacientes em lotes (insert executemany); devolve o intervalo de ids criados"""
+    first_number = _max_id(Patient) + 1
+    start = datetime.utcnow() - timedelta(days=365 * years)
+    span = 365 * years * 86400
+    first_id = last_id = None
+    for offset in range(0, count, batch_size):
+        rows = []
+        for i in range(offset, min(offset + batch_size, count)):
+            full_name = fake_name(rng)
+            cpf = cpf_number(cpf_from_number(first_number + i))
+            phone = fake_phone(rng)
+            created_at = _random_moment(rng, start, span)
+            rows.append({
+                'full_name': full_name,
+                'cpf_number': cpf,
+                'phone': phone,
+                'birth_date': (start - timedelta(days=rng.randint(18 * 365, 70 * 365))).date(),
+                'musical_preference': rng.choice(MUSIC),
+                'observations': '',
+                'created_at': created_at,
+                'updated_at': created_at,
+                'created_by': created_by,
+                'name_normalized': normalize_name(full_name),
+                'phone_digits': only_digits(phone),
+                'phone_suffix': phone_suffix(phone),
+            })
+        ids = db.session.execute(
+            db.insert(Patient).returning(Patient.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+        db.session.commit()
+        first_id = ids[0] if first_id is None else first_id
+        last_id = ids[-1]
+        log(f'  pacientes: {offset + len(rows)}/{count}')
+    return first_id, last_id
+
+
+def seed_atendimentos(count, patient_range, links, prices, rng, years=3, batch_size=5000, log=print):
+    """Atendimentos de 1 a 3 serviços, espalhados por `years` anos até hoje"""
+    first_patient, last_patient = patient_range
+    professional_ids = list(links)
+    start = datetime.utcnow() - timedelta(days=365 * years)
+    span = 365 * years * 86400
+    for offset in range(0, count, batch_size):
+        rows, chosen = [], []
+        for _ in range(offset, min(offset + batch_size, count)):
+            professional_id = rng.choice(professional_ids)
+            services = rng.sample(links[professional_id], rng.randint(1, min(3, len(links[professional_id]))))
+            moment = _random_moment(rng, start, span)
+            rows.append({
+                'patient_id': rng.randint(first_patient, last_patient),
+                'professional_id': professional_id,
+                'data_atendimento': moment,
+                'anotacoes': '',
+                'valor_cobrado': sum(prices[s] for s in services),
+                'created_at': moment,
+            })
+            chosen.append(services)
+        ids = db.session.execute(
+            db.insert(Atendimento).returning(Atendimento.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+        db.session.execute(db.insert(atendimento_servicos), [
+            {'atendimento_id': atendimento_id, 'servico_id': service_id}
+            for atendimento_id, services in zip(ids, chosen) for service_id in services
+        ])
+        db.session.commit()
+        log(f'  atendimentos: {offset + len(rows)}/{count}')
+
+
+def seed_database(patients=0, atendimentos=0, professionals=None, years=3, batch_size=5000,
+                  random_seed=None, created_by=None, log=print):
+    """Gera dados sintéticos em lote e recalcula os agregados do dashboard.
+
+    Inserts em lote não passam pelos eventos do ORM: colunas normalizadas são
+    preenchidas aqui, a busca FTS5 do SQLite é mantida pelos gatilhos e os
+    agregados são recalculados ao final.
+    """
+    from utils.rollups import rebuild_rollups
+
+    rng = random.Random(random_seed)
+    services = seed_services()
+    prices = dict(services)
+
+    if professionals is None:
+        professionals = max(5, patients // 2000)
+    log(f'→ {professionals} profissionais')
+    links = seed_professionals(professionals, services, rng, created_by)
+
+    patient_range = None
+    if patients:
+        log(f'→ {patients} pacientes')
+        patient_range = seed_patients(patients, rng, years, batch_size, created_by, log)
+    if atendimentos:
+        if patient_range is None:
+            patient_range = (db.session.execute(db.select(db.func.min(Patient.id))).scalar(), _max_id(Patient))
+            if patient_range[0] is None:
+                raise ValueError('Não há pacientes para os atendimentos (use --patients)')
+        log(f'→ {atendimentos} atendimentos')
+        seed_atendimentos(atendimentos, patient_range, links, prices, rng, years, batch_size, log)
+
+    log('→ Recalculando agregados do dashboard')
+    rebuild_rollups()
+    return {'professionals': professionals, 'patients': patients, 'atendimentos': atendimentos}
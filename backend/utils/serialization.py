@@ -0,0 +1,94 @@
+from datetime import datetime, date, time
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.orm import load_only
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional: sem ele, json da biblioteca padrão
+    orjson = None
+
+
+class InvalidFields(ValueError):
+    """Parâmetro ?fields= com campos que o recurso não expõe"""
+
+
+# ===== PROJEÇÃO (?fields=) =====
+
+def requested_fields(allowed):
+    """Campos pedidos em ?fields=a,b na ordem dada (None = todos); o id sempre vem"""
+    raw = request.args.get('fields', '').strip()
+    if not raw:
+        return None
+    fields = [f.strip() for f in raw.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise InvalidFields(f'Campos desconhecidos: {", ".join(unknown)}')
+    return list(dict.fromkeys(['id'] + fields))
+
+
+def load_only_options(model, fields, keyset=()):
+    """Opções load_only() com as colunas dos campos pedidos (e as do cursor de paginação)"""
+    if fields is None:
+        return []
+    table_columns = model.__table__.columns
+    field_columns = getattr(model, 'FIELD_COLUMNS', {})
+    names = [field_columns.get(f, f) for f in fields]
+    names = [name for name in names if name in table_columns]
+    names += [column.key for column, _ in keyset if column.key not in names]
+    return [load_only(*(getattr(model, name) for name in names))]
+
+
+# ===== ENCODER JSON =====
+
+# Formato das respostas desde antes do encoder plugável (o frontend faz new Date() dele)
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _default(value):
+    # Os dois encoders passam por aqui (orjson com OPT_PASSTHROUGH_DATETIME): mesma saída
+    if isinstance(value, datetime):
+        return value.strftime(DATETIME_FORMAT)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, time):
+        return value.isoformat(timespec='seconds')
+    return DefaultJSONProvider.default(value)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Provider JSON do Flask com orjson quando instalado (JSON_ENCODER=auto|orjson|stdlib).
+
+    Os to_dict() devolvem date/datetime; o encoder os escreve como
+    'YYYY-MM-DD HH:MM:SS' e 'YYYY-MM-DD', com orjson ou com a biblioteca padrão.
+    """
+
+    default = staticmethod(_default)
+    ensure_ascii = False
+    sort_keys = False
+
+    def __init__(self, app, backend='auto'):
+        super().__init__(app)
+        if backend == 'orjson' and orjson is None:
+            raise RuntimeError('JSON_ENCODER=orjson, mas o pacote orjson não está instalado')
+        self.use_orjson = orjson is not None and backend != 'stdlib'
+        if self.use_orjson:
+            self._orjson_options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(self, obj, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options).decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if not self.use_orjson:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        options = self._orjson_options | (orjson.OPT_INDENT_2 if self._app.debug else 0)
+        data = orjson.dumps(obj, default=self.default, option=options)
+        return self._app.response_class(data, mimetype=self.mimetype)
+
+
+def init_json(app):
+    app.json = FastJSONProvider(app, app.config['JSON_ENCODER'])
@@ -0,0 +1,43 @@
+"""Ponto de entrada WSGI de produção.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Com preload (gunicorn.conf.py), a aplicação é criada uma vez no processo mestre
+e os workers herdam o código já importado por fork; `reset_after_fork` descarta
+no worker as conexões herdadas do mestre.
+"""
+from app import create_app
+from models import db
+
+app = create_app()
+
+
+def dispose_engines(close=True):
+    """Esvazia o pool de conexões de todos os binds (primário e réplica).
+
+    Com close=False (no worker, após o fork) as conexões herdadas são só
+    esquecidas, sem fechar os sockets que ainda pertencem ao mestre.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+
+
+def reset_after_fork():
+    """Chamado no worker logo após o fork: cada worker abre as próprias conexões"""
+    dispose_engines(close=False)
+
+
+def reset_metrics():
+    """Zera os valores de /metrics deixados por execuções anteriores (no mestre)"""
+    store = app.extensions.get('metrics')
+    if store is not None:
+        from utils.metrics import reset
+        reset(store.directory)
+
+
+def shutdown_worker():
+    """Saída do worker depois de drenar as requisições: grava os logs pendentes e fecha as conexões"""
+    from utils.logs import stop_logging
+    stop_logging()
+    dispose_engines()